@@ -0,0 +1,101 @@
+"""Vectorized ledger analytics (requires NumPy)"""
+
+import threading
+from datetime import date as Date, timedelta
+import numpy as np
+from storage import StorageEngine
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DEFAULT_PERCENTILES = (25, 50, 75, 90, 95, 99)
+EPOCH = Date(1970, 1, 1)
+
+class LedgerAnalytics:
+    """Answers aggregate queries with NumPy over column arrays built from storage.
+
+    The arrays are built once and reused until any connection, in this process or
+    another worker, commits a write, so repeated queries between writes cost one
+    read of the ledger stamp.
+    """
+    def __init__(self, storage: StorageEngine) -> None:
+        self._storage = storage
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._amounts = np.empty(0, dtype=np.float64)
+        self._category_codes = np.empty(0, dtype=np.int16)
+        self._days = np.empty(0, dtype=np.int32)
+        self._category_names: list[str] = []
+
+    def _columns(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with self._lock:
+            # generation only counts this engine's commits; the stamp also moves on other workers' writes
+            stamp = self._storage.ledger_stamp()
+            if self._stamp != stamp:
+                # The stamp is read first: a write landing mid-build just triggers another rebuild
+                amounts, codes, days = [], [], []
+                lookup: dict[str, int] = {}
+                for amount, category, day in self._storage.iter_analytics_rows():
+                    amounts.append(amount)
+                    codes.append(lookup.setdefault(category, len(lookup)))
+                    days.append(day)
+                self._amounts = np.array(amounts, dtype=np.float64)
+                self._category_codes = np.array(codes, dtype=np.int16)
+                self._days = np.array(days, dtype=np.int32)
+                self._category_names = list(lookup)
+                self._stamp = stamp
+            return self._amounts, self._category_codes, self._days
+
+    def amount_stats(self, category: str | None = None, percentiles: tuple = DEFAULT_PERCENTILES) -> dict:
+        """Count, total, mean, median, min, max and percentiles of expense amounts"""
+        amounts, codes, _ = self._columns()
+        if category is not None:
+            if category not in self._category_names:
+                amounts = amounts[:0]
+            else:
+                amounts = amounts[codes == self._category_names.index(category)]
+        if amounts.size == 0:
+            return {"count": 0, "total": 0.0, "mean": None, "median": None, "min": None, "max": None,
+                    "percentiles": {str(p): None for p in percentiles}}
+        values = np.percentile(amounts, percentiles)
+        return {
+            "count": int(amounts.size),
+            "total": float(amounts.sum()),
+            "mean": float(amounts.mean()),
+            "median": float(np.median(amounts)),
+            "min": float(amounts.min()),
+            "max": float(amounts.max()),
+            "percentiles": {str(p): float(value) for p, value in zip(percentiles, values)},
+        }
+
+    def rolling_spend(self, window_days: int = 30, start: Date | None = None, end: Date | None = None) -> list[dict]:
+        """Total spent in the `window_days` days ending on each day, one entry per calendar day"""
+        amounts, _, days = self._columns()
+        if days.size == 0:
+            return []
+        first = int(days.min())
+        daily = np.bincount(days - first, weights=amounts)
+        cumulative = np.concatenate(([0.0], np.cumsum(daily)))
+        ends = np.arange(1, daily.size + 1)
+        rolling = cumulative[ends] - cumulative[np.maximum(ends - window_days, 0)]
+        low = 0 if start is None else max((start - EPOCH).days - first, 0)
+        high = daily.size if end is None else min((end - EPOCH).days - first + 1, daily.size)
+        origin = EPOCH + timedelta(days=first)
+        return [
+            {"date": (origin + timedelta(days=offset)).isoformat(), "total": float(rolling[offset])}
+            for offset in range(low, high)
+        ]
+
+    def weekday_breakdown(self) -> dict:
+        """Total, count and mean amount per day of the week"""
+        amounts, _, days = self._columns()
+        # 1970-01-01 was a Thursday (weekday 3)
+        weekdays = (days + 3) % 7
+        totals = np.bincount(weekdays, weights=amounts, minlength=7)
+        counts = np.bincount(weekdays, minlength=7)
+        return {
+            name: {
+                "total": float(totals[index]),
+                "count": int(counts[index]),
+                "mean": float(totals[index] / counts[index]) if counts[index] else None,
+            }
+            for index, name in enumerate(WEEKDAYS)
+        }
@@ -1,21 +1,106 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import io
+import tempfile
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from datetime import date as Date
+from typing import Literal
 from pydantic import BaseModel, PositiveFloat
-from expense import Expense
+from expense import ExpensePatch
+from export import csv_chunks, ndjson_chunks, json_array_chunks
+from serialization import dumps, join_array
 
+from api.caching import ResponseCache, etag_for, is_not_modified, not_modified
 from api.dependencies import get_expense_service
-from expense_service import ExpenseService
-from exceptions import ExpenseNotFoundError, InvalidExpenseDataError, InvalidExpenseDescriptionError, InvalidCategoryError, InvalidDateError
-app = FastAPI()
+from api.middleware import MetricsMiddleware
+from api.responses import FastJSONResponse, choose_encoding, compress
+from async_service import AsyncExpenseService
+from exceptions import ChangeLogExpiredError, ExpenseNotFoundError, InvalidExpenseDataError, InvalidExpenseDescriptionError, InvalidCategoryError, InvalidDateError, BulkExpenseError, InvalidCursorError, InvalidSearchQueryError, CorruptedDataError
+from metrics import REGISTRY
+from config import COMPRESSION_MIN_BYTES, METRICS_ENABLED
+app = FastAPI(default_response_class=FastJSONResponse)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Encoded bodies of list pages, summaries and analytics for the current ledger version
+response_cache = ResponseCache()
+
+async def versioned_json(request: Request, tag: str, build) -> Response:
+    """Answer 304 if the client holds `tag`, else return cached or freshly built JSON with its ETag.
+
+    `build` returns the content, or its JSON already encoded as bytes. Take the tag
+    before reading the data, so a write racing the read can only make the body newer
+    than its tag, never older. Compressed variants are cached next to the plain body.
+    """
+    etag = etag_for(tag)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    key = f"{request.url.path}?{request.url.query}"
+    body = response_cache.get(tag, key)
+    if body is None:
+        content = await build()
+        body = content if isinstance(content, bytes) else dumps(content)
+        response_cache.put(tag, key, body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    if encoding is not None and len(body) >= COMPRESSION_MIN_BYTES:
+        compressed_key = f"{key}#{encoding}"
+        compressed = response_cache.get(tag, compressed_key)
+        if compressed is None:
+            compressed = compress(body, encoding)
+            response_cache.put(tag, compressed_key, compressed)
+        body = compressed
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
 
 @app.get("/")
-def home():
+async def home():
     return {"message": "Hello world!"}
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
+if METRICS_ENABLED:
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        """Prometheus scrape endpoint"""
+        # Rendered off the event loop: gauges such as the ledger size may query SQLite
+        text = await asyncio.get_running_loop().run_in_executor(None, REGISTRY.render)
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+@app.get("/summary")
+async def period_summary(
+    request: Request,
+    granularity: Literal["month", "week"] = "month",
+    start: Date | None = Query(None, alias="from"),
+    end: Date | None = Query(None, alias="to"),
+    service: AsyncExpenseService = Depends(get_expense_service)
+):
+    async def build():
+        return {"granularity": granularity, "periods": await service.get_period_summary(granularity, start, end)}
+    return await versioned_json(request, await service.get_version_tag(), build)
+
+@app.get("/analytics/stats")
+async def amount_stats(request: Request, category: str | None = None, service: AsyncExpenseService = Depends(get_expense_service)):
+    return await versioned_json(request, await service.get_version_tag(), lambda: service.get_amount_stats(category))
+
+@app.get("/analytics/rolling")
+async def rolling_spend(
+    request: Request,
+    window: int = Query(30, ge=1, le=3660),
+    start: Date | None = Query(None, alias="from"),
+    end: Date | None = Query(None, alias="to"),
+    service: AsyncExpenseService = Depends(get_expense_service)
+):
+    async def build():
+        return {"window": window, "days": await service.get_rolling_spend(window, start, end)}
+    return await versioned_json(request, await service.get_version_tag(), build)
+
+@app.get("/analytics/weekdays")
+async def weekday_breakdown(request: Request, service: AsyncExpenseService = Depends(get_expense_service)):
+    return await versioned_json(request, await service.get_version_tag(), service.get_weekday_breakdown)
+
 class ExpenseCreateDTO(BaseModel):
     amount: float
     category: str
@@ -23,11 +108,11 @@ class ExpenseCreateDTO(BaseModel):
     date: Date | None = None
 
 @app.post("/expenses")
-def create_expense(
+async def create_expense(
     dto: ExpenseCreateDTO,
-    service: ExpenseService = Depends(get_expense_service)
+    service: AsyncExpenseService = Depends(get_expense_service)
 ):
-    new_expense_id = service.add_expense(
+    new_expense_id = await service.add_expense(
         dto.amount,
         dto.category,
         dto.description,
@@ -35,18 +120,123 @@ def create_expense(
     )
     return {"id": new_expense_id}
 
+@app.post("/expenses/bulk")
+async def create_expenses(
+    dtos: list[ExpenseCreateDTO],
+    service: AsyncExpenseService = Depends(get_expense_service)
+):
+    try:
+        new_expense_ids = await service.add_expenses(
+            [(dto.amount, dto.category, dto.description, dto.date) for dto in dtos]
+        )
+    except BulkExpenseError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={"errors": [{"index": index, "error": message} for index, message in e.errors.items()]}
+        )
+    return {"ids": new_expense_ids}
+
 @app.get("/expenses")
-def list_expenses(service: ExpenseService = Depends(get_expense_service)):
-    expenses: list[Expense] = service.list_expenses()
-    return [expense.to_dict() for expense in expenses]
+async def list_expenses(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    order: Literal["id", "date"] = "id",
+    service: AsyncExpenseService = Depends(get_expense_service)
+):
+    async def build():
+        try:
+            expenses, next_cursor = await service.list_expenses_page(limit, cursor, order)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Stitched from each expense's cached encoding instead of building and walking dicts
+        return b'{"expenses":' + join_array(expense.to_json() for expense in expenses) + b',"next_cursor":' + dumps(next_cursor) + b"}"
+    return await versioned_json(request, await service.get_version_tag(), build)
+
+@app.get("/expenses/search")
+async def search_expenses(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=1000),
+    cursor: str | None = None,
+    order: Literal["rank", "recent"] = "rank",
+    service: AsyncExpenseService = Depends(get_expense_service)
+):
+    """Expenses whose description contains every word of `q` (as a prefix), best matches first"""
+    async def build():
+        try:
+            expenses, next_cursor = await service.search_expenses(q, limit, cursor, order)
+        except (InvalidSearchQueryError, InvalidCursorError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return b'{"expenses":' + join_array(expense.to_json() for expense in expenses) + b',"next_cursor":' + dumps(next_cursor) + b"}"
+    return await versioned_json(request, await service.get_version_tag(), build)
+
+@app.get("/expenses/changes")
+async def list_changes(
+    request: Request,
+    since: int = Query(0, ge=0),
+    after_id: int | None = Query(None, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    service: AsyncExpenseService = Depends(get_expense_service)
+):
+    """Upserts (current expense) and tombstones after change-log position `since`, oldest first.
+
+    since=0 starts a full resync that lists every expense; while `next_after_id` is set,
+    pass it back as `after_id` along with `next_since`. Afterwards keep passing back
+    `next_since`. 410 Gone means the log was compacted past `since`: resync from since=0.
+    """
+    async def build():
+        try:
+            changes, next_since, next_after_id = await service.list_changes(since, limit, after_id)
+        except ChangeLogExpiredError as e:
+            raise HTTPException(status_code=410, detail=f"{e}; resync from since=0")
+        entries = (
+            b'{"seq":%d,"op":"upsert","expense":%b}' % (seq, expense.to_json()) if expense is not None
+            else b'{"seq":%d,"op":"delete","id":%d}' % (seq, expense_id)
+            for seq, expense_id, expense in changes
+        )
+        return (b'{"changes":' + join_array(entries) + b',"next_since":' + dumps(next_since)
+                + b',"next_after_id":' + dumps(next_after_id) + b"}")
+    return await versioned_json(request, await service.get_version_tag(), build)
+
+@app.get("/expenses/export")
+async def export_expenses(
+    format: Literal["ndjson", "json", "csv"] = "ndjson",
+    service: AsyncExpenseService = Depends(get_expense_service)
+):
+    rows = await service.iter_expense_rows()
+    if format == "json":
+        return StreamingResponse(json_array_chunks(rows), media_type="application/json")
+    if format == "csv":
+        return StreamingResponse(csv_chunks(rows), media_type="text/csv")
+    return StreamingResponse(ndjson_chunks(rows), media_type="application/x-ndjson")
+
+@app.post("/expenses/import")
+async def import_expenses(request: Request, service: AsyncExpenseService = Depends(get_expense_service)):
+    """Import a CSV sent as the raw request body (text/csv); invalid rows are skipped and reported"""
+    # Spool the upload to disk so memory stays flat; parsing then streams from the file
+    with tempfile.TemporaryFile() as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        lines = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        try:
+            return await service.import_csv(lines)
+        except CorruptedDataError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
 
 @app.get("/expenses/{expense_id}")
-def get_expense(expense_id: int, service: ExpenseService = Depends(get_expense_service)):
+async def get_expense(request: Request, expense_id: int, service: AsyncExpenseService = Depends(get_expense_service)):
     try:
-        expense = service.get_expense(expense_id)
-        return expense.to_dict()
+        etag = etag_for(await service.get_version_tag(expense_id))
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        expense = await service.get_expense(expense_id)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
+    return Response(expense.to_json(), media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
     
 class ExpensePatchDTO(BaseModel):
     amount: PositiveFloat | None = None
@@ -55,18 +245,19 @@ class ExpensePatchDTO(BaseModel):
     date: Date | None = None
 
 @app.patch("/expenses/{expense_id}")
-def patch_expense(
+async def patch_expense(
     expense_id: int,
     dto: ExpensePatchDTO,
-    service: ExpenseService = Depends(get_expense_service),
+    service: AsyncExpenseService = Depends(get_expense_service),
 ):
-    if dto.amount is None and dto.category is None and dto.description is None and dto.date is None:
+    patch = ExpensePatch(dto.amount, dto.category, dto.description, dto.date)
+    if patch.is_empty():
         raise HTTPException(status_code=400, detail="Found nothing to update")
     
     try:
-        service.apply_patch(expense_id, dto)
-        updated_expense = service.get_expense(expense_id)
-        return updated_expense.to_dict()
+        await service.apply_patch(expense_id, patch)
+        updated_expense = await service.get_expense(expense_id)
+        return Response(updated_expense.to_json(), media_type="application/json")
     except ExpenseNotFoundError:
         raise HTTPException(status_code=404, detail="Expense not found")
     except InvalidExpenseDataError:
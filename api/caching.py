@@ -0,0 +1,50 @@
+from collections import OrderedDict
+from fastapi import Request, Response
+
+# Conditional GET helpers and a small cache of encoded JSON bodies, both keyed by
+# the ledger version tags from ExpenseManager.version_tag().
+
+def etag_for(tag: str) -> str:
+    return f'"{tag}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    return header.strip() == "*" or etag in (candidate.strip() for candidate in header.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+class ResponseCache:
+    """LRU of encoded response bodies for the current ledger version.
+
+    Entries are keyed by request URL and only valid for the tag they were stored
+    under; storing under a newer tag drops everything older at once.
+    """
+    def __init__(self, max_entries: int = 256) -> None:
+        self._max_entries = max_entries
+        self._tag: str | None = None
+        self._bodies: OrderedDict[str, bytes] = OrderedDict()
+
+    def get(self, tag: str, key: str) -> bytes | None:
+        if tag != self._tag:
+            return None
+        body = self._bodies.get(key)
+        if body is not None:
+            self._bodies.move_to_end(key)
+        return body
+
+    def put(self, tag: str, key: str, body: bytes) -> None:
+        if tag != self._tag:
+            self._tag = tag
+            self._bodies.clear()
+        self._bodies[key] = body
+        self._bodies.move_to_end(key)
+        if len(self._bodies) > self._max_entries:
+            self._bodies.popitem(last=False)
+
+    def clear(self) -> None:
+        self._tag = None
+        self._bodies.clear()
@@ -1,13 +1,41 @@
-from fastapi import Depends
-from expense_manager import ExpenseManager
-from expense_service import ExpenseService
-from storage import load_expenses
-from config import STORAGE_PATH
+from expense_manager import create_manager
+from async_service import AsyncExpenseService
+from metrics import instrument_storage, register_ledger_gauges
+from snapshot import SnapshotWriter
+from storage import ChangeLogCompactor, GroupCommitWriter, StorageEngine
+from config import (
+    STORAGE_PATH, PARTITION_BY, SQLITE_SYNCHRONOUS, MANAGER_MODE, MANAGER_CACHE_SIZE, WRITE_BEHIND, WRITE_BATCH_SIZE, WRITE_MAX_DELAY_MS,
+    SNAPSHOT_PATH, SNAPSHOT_SETTLE_SECONDS, METRICS_ENABLED, WORKER_SYNC,
+    CHANGE_LOG_RETENTION, CHANGE_LOG_COMPACT_SECONDS
+)
 
-# Singleton-style: create one manager and service for the app
-_expense_list = load_expenses(STORAGE_PATH)
-_manager = ExpenseManager(_expense_list)
-_service = ExpenseService(_manager, STORAGE_PATH)
+# Singleton-style: one storage engine, manager and service for the app,
+# built on first use rather than at import time. The dependency is async so
+# FastAPI resolves it on the event loop instead of a threadpool worker. With
+# WORKER_SYNC every request first applies writes other worker processes committed.
+_service: AsyncExpenseService | None = None
+_snapshots: SnapshotWriter | None = None
+_compactor: ChangeLogCompactor | None = None
 
-def get_expense_service() -> ExpenseService:
+async def get_expense_service() -> AsyncExpenseService:
+    global _service, _snapshots, _compactor
+    if _service is None:
+        # Group commit acknowledges each insert once its batch commits, which only means durable under FULL
+        synchronous = "FULL" if WRITE_BEHIND else SQLITE_SYNCHRONOUS
+        engine = StorageEngine(STORAGE_PATH, synchronous=synchronous, partition_by=PARTITION_BY)
+        if METRICS_ENABLED:
+            instrument_storage(engine)
+        engine.create_table()
+        # Taken before the ledger is loaded: changes in between are replayed, which is harmless
+        change_seq = engine.follow_changes() if WORKER_SYNC else None
+        snapshot_path = SNAPSHOT_PATH if MANAGER_MODE != "sql" else None
+        manager = create_manager(engine, MANAGER_MODE, MANAGER_CACHE_SIZE, snapshot_path)
+        if snapshot_path is not None:
+            _snapshots = SnapshotWriter(engine, snapshot_path, SNAPSHOT_SETTLE_SECONDS)
+        _compactor = ChangeLogCompactor(engine, CHANGE_LOG_RETENTION, CHANGE_LOG_COMPACT_SECONDS)
+        writer = GroupCommitWriter(engine, WRITE_BATCH_SIZE, WRITE_MAX_DELAY_MS / 1000) if WRITE_BEHIND else None
+        _service = AsyncExpenseService(manager, engine, writer, change_seq=change_seq)
+        if METRICS_ENABLED:
+            register_ledger_gauges(manager)
+    await _service.sync()
     return _service
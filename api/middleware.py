@@ -0,0 +1,43 @@
+from time import perf_counter
+from metrics import REGISTRY, Registry
+
+class MetricsMiddleware:
+    """Records latency and status of every HTTP request, labelled by route template.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so responses are not re-wrapped and
+    streaming bodies pass straight through. Latency runs until the last body chunk
+    is sent. Paths that match no route share one "unmatched" label, which keeps
+    scanners from creating a series per URL.
+    """
+    def __init__(self, app, registry: Registry = REGISTRY) -> None:
+        self.app = app
+        self._seconds = registry.histogram(
+            "expense_http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+        self._requests = registry.counter(
+            "expense_http_requests_total", "HTTP requests by response status", ("method", "route", "status"))
+        self._in_flight = 0
+        registry.gauge("expense_http_requests_in_flight", "HTTP requests being served", lambda: self._in_flight)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self._in_flight += 1
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            self._in_flight -= 1
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            self._seconds.labels(scope["method"], path).observe(elapsed)
+            self._requests.labels(scope["method"], path, str(status)).inc()
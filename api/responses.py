@@ -0,0 +1,33 @@
+import gzip
+from fastapi.responses import JSONResponse
+from serialization import dumps
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with serialization.dumps (orjson when installed, else stdlib json)"""
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """Best content coding the client accepts: br (if brotli is installed), then gzip"""
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
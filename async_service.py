@@ -0,0 +1,227 @@
+"""Async service layer for the API"""
+
+import asyncio
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from datetime import date as Date
+from expense import Expense, ExpensePatch
+from expense_manager import ExpenseManager
+from csv_io import ImportReport, iter_parsed_chunks
+from expense_service import ExpenseService
+from storage import GroupCommitWriter, StorageEngine
+
+
+class AsyncExpenseService(ExpenseService):
+    """ExpenseService with non-blocking, event-loop friendly methods.
+
+    Validation and every change to the in-memory manager run on the event loop
+    thread, so the manager is never touched concurrently. SQLite writes go to one
+    dedicated writer thread and SQL reads to a small reader pool, so requests wait
+    on I/O without occupying a worker. That includes the expenses a SqlExpenseManager
+    would load on a cache miss and the change log sync() reads; only the full
+    reconciliation after the log was compacted past this worker still reads on the
+    loop. With a GroupCommitWriter, single inserts are awaited on its futures instead
+    and committed in batches. The CLI keeps using the sync ExpenseService.
+    """
+    def __init__(
+        self,
+        manager: ExpenseManager,
+        storage: StorageEngine,
+        writer: GroupCommitWriter | None = None,
+        reader_threads: int = 4,
+        change_seq: int | None = None
+    ) -> None:
+        super().__init__(manager, storage, writer, change_seq)
+        self._write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="expense-writer")
+        self._readers = ThreadPoolExecutor(max_workers=reader_threads, thread_name_prefix="expense-reader")
+        self._writes_in_flight = 0
+        self._writes_started = 0
+        # data_version is tracked per connection, so sync() always reads on this one thread
+        self._sync_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="expense-sync")
+        self._syncing = False
+        # Per-expense locks and how many requests hold or await each one
+        self._expense_locks: dict[int, list] = {}
+
+    @contextmanager
+    def _writing(self):
+        self._writes_in_flight += 1
+        self._writes_started += 1
+        try:
+            yield
+        finally:
+            self._writes_in_flight -= 1
+
+    async def sync(self) -> int:
+        # A write that has committed but not yet reached the manager must land first, or it
+        # could overwrite a newer foreign change to the same expense; a later request syncs.
+        if self._change_seq is None or self._writes_in_flight or self._syncing:
+            return 0
+        writes_started = self._writes_started
+        self._syncing = True
+        try:
+            read = await asyncio.get_running_loop().run_in_executor(self._sync_pool, self._read_changes)
+        finally:
+            self._syncing = False
+        # A local write that ran meanwhile may be newer than the rows just read: drop them
+        if self._writes_started != writes_started:
+            return 0
+        return self._apply_changes(read)
+
+    @asynccontextmanager
+    async def _expense_lock(self, expense_id: int):
+        """Serialize lookup, write and manager update of one expense, so an update is never
+        diffed against a state that a queued write is about to replace"""
+        entry = self._expense_locks.get(expense_id)
+        if entry is None:
+            entry = self._expense_locks[expense_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._expense_locks[expense_id]
+
+    async def _write(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._write_pool, function, *args)
+
+    async def _read(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._readers, function, *args)
+
+    async def _load(self, expense_id: int) -> None:
+        """Read an expense the manager does not hold on a reader thread, so the lookup after it stays on the loop"""
+        if self._manager.needs_storage(expense_id):
+            self._manager.adopt_expense(expense_id, await self._read(self._storage.load_expense, expense_id))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._write_pool.shutdown()
+        self._readers.shutdown()
+        self._sync_pool.shutdown()
+
+    async def add_expense(
+        self,
+        amount: float,
+        category: str,
+        description: str,
+        date: Date | None = None
+    ) -> int:
+        draft = self._manager.create_draft(amount, category, description, date)
+        with self._writing():
+            if self._writer is not None:
+                new_expense = await asyncio.wrap_future(self._writer.submit(draft))
+            else:
+                new_expense = await self._write(self._storage.insert_expense, draft)
+            return self._manager.attach_expense(new_expense)
+
+    async def add_expenses(self, entries: list[tuple]) -> list[int]:
+        drafts = self._manager.create_drafts(entries)
+        with self._writing():
+            new_expenses = await self._write(self._storage.insert_expenses, drafts)
+            return self._manager.attach_expenses(new_expenses)
+
+    async def delete_expense(self, expense_id: int) -> None:
+        async with self._expense_lock(expense_id):
+            await self._load(expense_id)
+            self._manager.get_expense(expense_id)
+            with self._writing():
+                await self._write(self._storage.delete_expense, expense_id)
+                self._manager.delete_expense(expense_id)
+
+    async def _update_fields(
+        self,
+        expense_id: int,
+        amount: float | None = None,
+        category: str | None = None,
+        description: str | None = None,
+        date: Date | None = None
+    ) -> None:
+        async with self._expense_lock(expense_id):
+            await self._load(expense_id)
+            changes = self._prepare_update(expense_id, amount, category, description, date)
+            if changes:
+                with self._writing():
+                    await self._write(self._storage.update_expense_fields, expense_id, changes)
+                    # The LRU may have dropped the expense while the write was queued
+                    await self._load(expense_id)
+                    self._apply_update(expense_id, changes)
+
+    async def correct_expense_amount(self, expense_id: int, new_amount: float) -> None:
+        await self._update_fields(expense_id, amount=new_amount)
+
+    async def recategorize_expense(self, expense_id: int, new_category: str) -> None:
+        await self._update_fields(expense_id, category=new_category)
+
+    async def correct_expense_date(self, expense_id: int, new_date: Date) -> None:
+        await self._update_fields(expense_id, date=new_date)
+
+    async def correct_expense_description(self, expense_id: int, new_description: str) -> None:
+        await self._update_fields(expense_id, description=new_description)
+
+    async def apply_patch(self, expense_id: int, patch: ExpensePatch) -> None:
+        await self._update_fields(expense_id, patch.amount, patch.category, patch.description, patch.date)
+
+    async def list_expenses_page(
+        self,
+        limit: int,
+        cursor: str | None = None,
+        order: str = "id",
+        category: str | None = None,
+        start: Date | None = None
+    ) -> tuple[list[Expense], str | None]:
+        return await self._read(super().list_expenses_page, limit, cursor, order, category, start)
+
+    async def search_expenses(self, query: str, limit: int, cursor: str | None = None, order: str = "rank") -> tuple[list[Expense], str | None]:
+        return await self._read(super().search_expenses, query, limit, cursor, order)
+
+    async def list_changes(
+        self,
+        since: int,
+        limit: int,
+        after_id: int | None = None
+    ) -> tuple[list[tuple[int, int, Expense | None]], int, int | None]:
+        return await self._read(super().list_changes, since, limit, after_id)
+
+    async def iter_expense_rows(self) -> Iterator[tuple]:
+        # Rows are fetched lazily on a dedicated connection as the response is streamed
+        return super().iter_expense_rows()
+
+    async def import_csv(self, lines: Iterable[str], chunk_rows: int = 10_000, workers: int | None = None) -> dict:
+        report = ImportReport()
+        chunks = iter_parsed_chunks(lines, self._manager.categories, chunk_rows, workers)
+        try:
+            # Reading the file and waiting on the process pool happen off the loop
+            while (chunk := await self._read(next, chunks, None)) is not None:
+                rows, errors = chunk
+                with self._writing():
+                    ids = await self._write(self._storage.insert_rows, rows)
+                    self._manager.attach_rows(ids, rows)
+                report.add(len(rows), errors)
+        finally:
+            await self._read(chunks.close)
+        return report.to_dict()
+
+    async def get_period_summary(self, granularity: str = "month", start: Date | None = None, end: Date | None = None) -> list[dict]:
+        return await self._read(super().get_period_summary, granularity, start, end)
+
+    async def get_amount_stats(self, category: str | None = None) -> dict:
+        return await self._read(super().get_amount_stats, category)
+
+    async def get_rolling_spend(self, window_days: int = 30, start: Date | None = None, end: Date | None = None) -> list[dict]:
+        return await self._read(super().get_rolling_spend, window_days, start, end)
+
+    async def get_weekday_breakdown(self) -> dict:
+        return await self._read(super().get_weekday_breakdown)
+
+    async def get_expense(self, expense_id: int) -> Expense:
+        await self._load(expense_id)
+        return super().get_expense(expense_id)
+
+    async def get_version_tag(self, expense_id: int | None = None) -> str:
+        if expense_id is None:
+            return await self._read(super().get_version_tag)
+        await self._load(expense_id)
+        return super().get_version_tag(expense_id)
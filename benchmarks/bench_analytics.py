@@ -0,0 +1,73 @@
+"""LedgerAnalytics (NumPy) vs the pure-Python loops it replaces
+
+Run from the repository root:
+    python -m benchmarks.bench_analytics [rows]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import timedelta
+from analytics import LedgerAnalytics
+from benchmarks.synthetic import synthetic_rows
+from storage import StorageEngine
+
+def python_stats(expenses) -> dict:
+    amounts = [expense.amount for expense in expenses]
+    return {
+        "mean": statistics.fmean(amounts),
+        "median": statistics.median(amounts),
+        "percentiles": statistics.quantiles(amounts, n=100, method="inclusive"),
+    }
+
+def python_rolling(expenses, window_days: int = 30) -> dict:
+    daily = defaultdict(float)
+    for expense in expenses:
+        daily[expense.date] += expense.amount
+    first, last = min(daily), max(daily)
+    rolling, day = {}, first
+    while day <= last:
+        rolling[day] = sum(daily.get(day - timedelta(days=offset), 0.0) for offset in range(window_days))
+        day += timedelta(days=1)
+    return rolling
+
+def python_weekdays(expenses) -> dict:
+    totals = defaultdict(float)
+    for expense in expenses:
+        totals[expense.date.weekday()] += expense.amount
+    return totals
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def main(rows: int = 200_000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = StorageEngine(os.path.join(directory, "bench.db"))
+        engine.create_table()
+        with engine._transaction() as conn:
+            conn.executemany(
+                'INSERT INTO expenses(amount, category, description, date) VALUES(?, ?, ?, ?)',
+                synthetic_rows(rows)
+            )
+        # The loops being replaced ran over service.list_expenses(), so load that first
+        expenses = engine.load_expenses()
+        analytics = LedgerAnalytics(engine)
+        build = timed(analytics.amount_stats)
+
+        print(f"rows: {rows} (NumPy column build: {build * 1000:.0f} ms, reused until the next write)")
+        for name, python, vectorized in (
+            ("stats", lambda: python_stats(expenses), analytics.amount_stats),
+            ("rolling 30d", lambda: python_rolling(expenses), analytics.rolling_spend),
+            ("weekdays", lambda: python_weekdays(expenses), analytics.weekday_breakdown),
+        ):
+            python_time, numpy_time = timed(python), timed(vectorized)
+            print(f"{name:<12} python {python_time * 1000:9.1f} ms | numpy {numpy_time * 1000:7.1f} ms | {python_time / numpy_time:6.1f}x")
+        engine.close()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
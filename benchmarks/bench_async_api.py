@@ -0,0 +1,98 @@
+"""Requests per second: sync threadpool handlers vs the async API
+
+Run from the repository root:
+    python -m benchmarks.bench_async_api [requests_per_client]
+
+Both apps are driven in-process through httpx's ASGI transport with a mixed
+workload (one write per four reads). This isolates the handler model from
+network overhead; for absolute numbers, serve api.api:app with uvicorn and
+point an external load generator at it.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import httpx
+from fastapi import Depends, FastAPI
+from api.api import ExpenseCreateDTO, app as async_app
+from api.dependencies import get_expense_service
+from async_service import AsyncExpenseService
+from expense_manager import ExpenseManager
+from expense_service import ExpenseService
+from storage import StorageEngine
+
+CONCURRENCY = (50, 100, 250, 500)
+
+def build_sync_app(service: ExpenseService) -> FastAPI:
+    """The API before the async rewrite: plain `def` handlers run in FastAPI's threadpool"""
+    app = FastAPI()
+
+    def get_service() -> ExpenseService:
+        return service
+
+    @app.get("/expenses/{expense_id}")
+    def get_expense(expense_id: int, service: ExpenseService = Depends(get_service)):
+        return service.get_expense(expense_id).to_dict()
+
+    @app.get("/summary")
+    def period_summary(service: ExpenseService = Depends(get_service)):
+        return {"granularity": "month", "periods": service.get_period_summary()}
+
+    @app.post("/expenses")
+    def create_expense(dto: ExpenseCreateDTO, service: ExpenseService = Depends(get_service)):
+        return {"id": service.add_expense(dto.amount, dto.category, dto.description, dto.date)}
+
+    return app
+
+async def client(http: httpx.AsyncClient, worker: int, requests: int) -> None:
+    for i in range(requests):
+        kind = (worker + i) % 5
+        if kind == 0:
+            response = await http.post("/expenses", json={"amount": 9.5, "category": "Groceries", "description": "Bench"})
+        elif kind == 1:
+            response = await http.get("/summary")
+        else:
+            response = await http.get(f"/expenses/{1 + (worker * 31 + i) % 100}")
+        response.raise_for_status()
+
+async def measure(app: FastAPI, clients: int, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http, worker, requests) for worker in range(clients)))
+        return clients * requests / (time.perf_counter() - start)
+
+def seeded_engine(filepath: str) -> StorageEngine:
+    engine = StorageEngine(filepath)
+    engine.create_table()
+    ExpenseService(ExpenseManager(None), engine).add_expenses(
+        [(float(i % 50 + 1), "Groceries", f"Seed {i}", None) for i in range(100)]
+    )
+    return engine
+
+def main(requests: int = 20) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        sync_engine = seeded_engine(os.path.join(directory, "sync.db"))
+        sync_app = build_sync_app(ExpenseService(ExpenseManager(sync_engine.load_expenses()), sync_engine))
+        async_engine = seeded_engine(os.path.join(directory, "async.db"))
+        async_service = AsyncExpenseService(ExpenseManager(async_engine.load_expenses()), async_engine)
+
+        async def override() -> AsyncExpenseService:
+            return async_service
+        async_app.dependency_overrides[get_expense_service] = override
+        try:
+            print(f"{requests} requests per client, 20% writes")
+            for clients in CONCURRENCY:
+                sync_rps = asyncio.run(measure(sync_app, clients, requests))
+                async_rps = asyncio.run(measure(async_app, clients, requests))
+                print(f"{clients:>4} clients: sync {sync_rps:8.0f} req/s | async {async_rps:8.0f} req/s | {async_rps / sync_rps:5.2f}x")
+        finally:
+            async_app.dependency_overrides.clear()
+            async_service.close()
+            sync_engine.close()
+            async_engine.close()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,45 @@
+"""Change feed: reading GET /expenses/changes pages and compacting the log
+
+Run from the repository root:
+    python -m benchmarks.bench_change_feed [rows] [updates]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from benchmarks.synthetic import synthetic_rows
+from storage import StorageEngine
+
+def timed(label: str, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{label:<44} {(time.perf_counter() - start) * 1000:9.2f} ms")
+    return result
+
+def main(rows: int = 200_000, updates: int = 50_000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = StorageEngine(os.path.join(directory, "bench.db"))
+        engine.create_table()
+        engine.insert_rows(list(synthetic_rows(rows)))
+        rng = random.Random(1)
+        with engine._transaction() as conn:
+            conn.executemany("UPDATE expenses SET amount = amount + 1 WHERE id = ?",
+                             [(rng.randint(1, rows),) for _ in range(updates)])
+            conn.executemany("DELETE FROM expenses WHERE id = ?", [(rng.randint(1, rows),) for _ in range(updates // 10)])
+        print(f"{rows} rows, {updates} updates, {updates // 10} deletes: {engine.change_seq()} log entries")
+
+        latest = engine.change_seq()
+        timed("read_changes: 1000 entries near the head", lambda: engine.read_changes(latest - 1000, 1000))
+        timed("read_changes: full-resync page of 1000", lambda: engine.read_changes(0, 1000))
+        dropped = timed("compact_changes(retain=10000): first run", lambda: engine.compact_changes(10_000))
+        print(f"  dropped {dropped}, {engine.connection().execute('SELECT count(*) FROM expense_changes').fetchone()[0]} entries left")
+        with engine._transaction() as conn:
+            conn.executemany("UPDATE expenses SET amount = amount + 1 WHERE id = ?",
+                             [(rng.randint(1, rows),) for _ in range(1000)])
+        timed("compact_changes after 1000 more updates", lambda: engine.compact_changes(10_000))
+        engine.close()
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,39 @@
+"""Time to first screen of the TUI expense list: whole ledger vs one page
+
+Run from the repository root:
+    python -m benchmarks.bench_cli_paging [rows ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import cli_view
+from benchmarks.synthetic import synthetic_rows
+from config import CLI_PAGE_SIZE
+from expense_manager import create_manager
+from expense_service import ExpenseService
+from storage import StorageEngine
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def main(sizes: list[int]) -> None:
+    print(f"{'rows':>9} {'whole list ms':>14} {'first page ms':>14} {'Groceries page ms':>18}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            engine = StorageEngine(os.path.join(directory, f"bench-{rows}.db"))
+            engine.create_table()
+            engine.insert_rows(list(synthetic_rows(rows)))
+            service = ExpenseService(create_manager(engine, "memory"), engine)
+            whole = timed(lambda: cli_view.show_expense_list(service.list_expenses()))
+            first = timed(lambda: cli_view.show_expense_list(service.list_expenses_page(CLI_PAGE_SIZE, None, "date")[0]))
+            narrowed = timed(lambda: cli_view.show_expense_list(
+                service.list_expenses_page(CLI_PAGE_SIZE, None, "date", "Groceries")[0]))
+            print(f"{rows:>9} {whole * 1000:14.1f} {first * 1000:14.2f} {narrowed * 1000:18.2f}")
+            engine.close()
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [1_000, 100_000, 1_000_000])
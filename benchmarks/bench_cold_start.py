@@ -0,0 +1,49 @@
+"""Cold start: building the manager from SQLite vs from a binary snapshot
+
+Run from the repository root:
+    python -m benchmarks.bench_cold_start [rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from expense_manager import create_manager
+from snapshot import write_snapshot
+from storage import StorageEngine
+
+def timed(function) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def main(rows: int = 1_000_000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = StorageEngine(os.path.join(directory, "bench.db"))
+        engine.create_table()
+        with engine._transaction() as conn:
+            conn.execute('''
+                WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+                INSERT INTO expenses(amount, category, description, date)
+                SELECT (i % 50000) / 100.0 + 1,
+                       CASE i % 3 WHEN 0 THEN 'Groceries' WHEN 1 THEN 'Utilities' ELSE 'Savings' END,
+                       'Synthetic expense #' || i, date('2015-01-01', '+' || (i % 3650) || ' days')
+                FROM n
+            ''', (rows,))
+        path = os.path.join(directory, "bench.snapshot")
+        write_time, _ = timed(lambda: write_snapshot(engine, path))
+        print(f"{rows} rows; snapshot written in {write_time:.2f} s, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        for label, mode, snapshot_path in (
+            ("memory (Expense objects)", "memory", None),
+            ("memory from snapshot", "memory", path),
+            ("columnar from SQLite", "columnar", None),
+            ("columnar from snapshot", "columnar", path),
+        ):
+            elapsed, manager = timed(lambda: create_manager(engine, mode, snapshot_path=snapshot_path))
+            print(f"{label:<26} {elapsed * 1000:10.1f} ms")
+            del manager
+        engine.close()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,59 @@
+"""CSV import/export throughput in rows per second
+
+Run from the repository root:
+    python -m benchmarks.bench_csv [rows]
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+from benchmarks.synthetic import synthetic_rows
+from expense_manager import SqlExpenseManager
+from expense_service import ExpenseService
+from export import csv_chunks
+from storage import StorageEngine
+
+def write_csv(path: str, rows: int) -> None:
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["amount", "category", "description", "date"])
+        writer.writerows(synthetic_rows(rows))
+
+def bench_import(directory: str, path: str, workers: int, chunk_rows: int) -> float:
+    engine = StorageEngine(os.path.join(directory, f"import-{workers}-{chunk_rows}.db"))
+    engine.create_table()
+    service = ExpenseService(SqlExpenseManager(engine), engine)
+    start = time.perf_counter()
+    with open(path, newline="") as file:
+        report = service.import_csv(file, chunk_rows, workers)
+    elapsed = time.perf_counter() - start
+    engine.close()
+    return report["imported"] / elapsed
+
+def bench_export(directory: str, path: str) -> float:
+    engine = StorageEngine(os.path.join(directory, "import-1-10000.db"))
+    start = time.perf_counter()
+    rows = 0
+    with open(path, "wb") as file:
+        for chunk in csv_chunks(engine.iter_expense_rows()):
+            rows += chunk.count(b"\n")
+            file.write(chunk)
+    elapsed = time.perf_counter() - start
+    engine.close()
+    return (rows - 1) / elapsed
+
+def main(rows: int = 500_000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source.csv")
+        write_csv(source, rows)
+        print(f"{rows} rows, {os.path.getsize(source) / 1e6:.1f} MB, {os.cpu_count()} CPU(s)")
+        for workers in sorted({1, 2, os.cpu_count() or 1}):
+            for chunk_rows in (2_000, 10_000):
+                rate = bench_import(directory, source, workers, chunk_rows)
+                print(f"import  workers={workers:<2} chunk={chunk_rows:<6} {rate:10.0f} rows/s")
+        print(f"export                          {bench_export(directory, os.path.join(directory, 'out.csv')):10.0f} rows/s")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,61 @@
+"""Write throughput vs fsync count: one transaction per insert vs group commit
+
+Run from the repository root:
+    python -m benchmarks.bench_group_commit [rows]
+
+Concurrent writer threads each insert their share of `rows` and wait for the
+acknowledgement, like POST /expenses handlers. The database runs with
+synchronous=FULL, as the API does whenever WRITE_BEHIND is on, so every commit
+is one fsync of the WAL; commits are counted through StorageEngine.generation.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from benchmarks.synthetic import synthetic_drafts
+from storage import GroupCommitWriter, StorageEngine
+
+CLIENTS = 32
+SETTINGS = ((500, 0.005), (500, 0.001), (50, 0.005), (500, 0.0))
+
+def run_clients(insert, drafts: list) -> float:
+    shares = [drafts[client::CLIENTS] for client in range(CLIENTS)]
+
+    def client(share):
+        for draft in share:
+            insert(draft)
+
+    threads = [threading.Thread(target=client, args=(share,)) for share in shares]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+def bench(filepath: str, name: str, drafts: list, max_batch: int | None = None, max_delay: float = 0.0) -> None:
+    engine = StorageEngine(filepath, synchronous="FULL")
+    engine.create_table()
+    generation = engine.generation
+    if max_batch is None:
+        elapsed = run_clients(engine.insert_expense, drafts)
+    else:
+        writer = GroupCommitWriter(engine, max_batch, max_delay)
+        elapsed = run_clients(lambda draft: writer.submit(draft).result(), drafts)
+        writer.close()
+    commits = engine.generation - generation
+    engine.close()
+    print(f"{name:<28} {len(drafts) / elapsed:9.0f} rows/s | {commits:6d} fsyncs | {len(drafts) / commits:6.1f} rows/fsync")
+
+def main(rows: int = 5000) -> None:
+    drafts = list(synthetic_drafts(rows))
+    print(f"{rows} inserts from {CLIENTS} threads, synchronous=FULL")
+    with tempfile.TemporaryDirectory() as directory:
+        bench(os.path.join(directory, "single.db"), "transaction per insert", drafts)
+        for index, (max_batch, max_delay) in enumerate(SETTINGS):
+            bench(os.path.join(directory, f"group{index}.db"), f"group {max_batch} rows / {max_delay * 1000:g} ms", drafts, max_batch, max_delay)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
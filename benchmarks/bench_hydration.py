@@ -0,0 +1,55 @@
+"""Hydration: Expense objects from stored rows, validating vs trusted
+
+Run from the repository root:
+    python -m benchmarks.bench_hydration [rows]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+from datetime import date as Date
+from expense import Expense
+from storage import EXPENSE_COLUMNS, StorageEngine
+
+def load_validating(engine: StorageEngine) -> list[Expense]:
+    """The load path before the trusted constructor: full __init__ validation and a date parse per row"""
+    rows = engine.connection().execute(f"SELECT {EXPENSE_COLUMNS} FROM expenses").fetchall()
+    return [Expense(row[0], row[1], row[2], row[3], Date.fromisoformat(row[4])) for row in rows]
+
+def best_of(function, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+        del result
+    return min(timings)
+
+def main(rows: int = 1_000_000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = StorageEngine(os.path.join(directory, "bench.db"))
+        engine.create_table()
+        with engine._transaction() as conn:
+            conn.execute('''
+                WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+                INSERT INTO expenses(amount, category, description, date)
+                SELECT (i % 50000) / 100.0 + 1,
+                       CASE i % 3 WHEN 0 THEN 'Groceries' WHEN 1 THEN 'Utilities' ELSE 'Savings' END,
+                       'Synthetic expense #' || i, date('2015-01-01', '+' || (i % 3650) || ' days')
+                FROM n
+            ''', (rows,))
+        per_million = 1_000_000 / rows
+        for label, function in (
+            ("validating __init__", lambda: load_validating(engine)),
+            ("load_expenses(verify=True)", lambda: engine.load_expenses(verify=True)),
+            ("load_expenses()", engine.load_expenses),
+        ):
+            elapsed = best_of(function)
+            print(f"{label:<28} {elapsed:7.2f} s  ({elapsed * per_million:.2f} s per million rows)")
+        engine.close()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,59 @@
+"""CLI cold start: time to `import main`, measured with python -X importtime
+
+Run from the repository root:
+    python -m benchmarks.bench_import_time [git-ref] [runs]
+
+With a git ref (e.g. HEAD~1), that revision is exported to a temporary directory
+and measured next to the working tree, for a before/after comparison.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+HEAVY_MODULES = ("fastapi", "pydantic", "starlette", "inquirer", "multiprocessing", "numpy")
+
+def import_profile(directory: str) -> tuple[int, dict[str, int]]:
+    """Cumulative microseconds for `import main`, and the top-level imports it triggered"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=directory, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        if total.strip().isdigit():
+            cumulative[name.strip()] = int(total)
+    return cumulative["main"], cumulative
+
+def measure(directory: str, runs: int) -> None:
+    timings, profile = [], {}
+    for _ in range(runs):
+        total, profile = import_profile(directory)
+        timings.append(total)
+    heavy = [name for name in HEAVY_MODULES if name in profile]
+    print(f"  import main: median {statistics.median(timings) / 1000:.1f} ms, best {min(timings) / 1000:.1f} ms over {runs} runs")
+    print(f"  heavy modules loaded: {', '.join(heavy) or 'none'}")
+
+def export_revision(ref: str, directory: str) -> None:
+    archive = os.path.join(directory, "tree.tar")
+    subprocess.run(["git", "archive", "--output", archive, ref], check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(directory, filter="data")
+
+def main(ref: str | None = None, runs: int = 10) -> None:
+    if ref is not None:
+        with tempfile.TemporaryDirectory() as directory:
+            export_revision(ref, directory)
+            print(f"{ref}:")
+            measure(directory, runs)
+    print("working tree:")
+    measure(os.getcwd(), runs)
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else 10)
@@ -0,0 +1,41 @@
+"""Ledger memory: dict of Expense objects vs ColumnarLedger
+
+Run from the repository root:
+    python -m benchmarks.bench_ledger_memory [rows]
+"""
+
+import sys
+import tracemalloc
+from datetime import date as Date
+from benchmarks.synthetic import synthetic_rows
+from expense import Expense
+from expense_manager import ColumnarLedger
+
+def numbered_rows(count: int):
+    for expense_id, (amount, category, description, date) in enumerate(synthetic_rows(count), start=1):
+        yield expense_id, amount, category, description, date
+
+def measure(build) -> int:
+    tracemalloc.start()
+    ledger = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del ledger
+    return size
+
+def build_dict(rows: int) -> dict:
+    return {
+        row[0]: Expense(row[0], row[1], row[2], row[3], Date.fromisoformat(row[4]))
+        for row in numbered_rows(rows)
+    }
+
+def main(rows: int = 200_000) -> None:
+    dict_bytes = measure(lambda: build_dict(rows))
+    columnar_bytes = measure(lambda: ColumnarLedger.from_rows(numbered_rows(rows)))
+    print(f"rows: {rows}")
+    print(f"dict of Expense objects: {dict_bytes / 2**20:8.1f} MiB ({dict_bytes / rows:6.0f} B/row)")
+    print(f"ColumnarLedger:          {columnar_bytes / 2**20:8.1f} MiB ({columnar_bytes / rows:6.0f} B/row)")
+    print(f"reduction: {dict_bytes / columnar_bytes:.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,48 @@
+"""Date-partitioned vs single-table storage: queries, writes and per-partition maintenance
+
+Run from the repository root:
+    python -m benchmarks.bench_partitions [rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date as Date
+from benchmarks.synthetic import synthetic_rows
+from storage import StorageEngine
+
+def timed(label: str, function, repeat: int = 1) -> None:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    print(f"  {label:<44} {(time.perf_counter() - start) / repeat * 1000:9.3f} ms")
+
+def main(rows: int = 1_000_000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for partition_by in (None, "year", "month"):
+            engine = StorageEngine(os.path.join(directory, f"{partition_by}.db"), partition_by=partition_by)
+            engine.create_table()
+            data = list(synthetic_rows(rows))
+            print(f"partition_by={partition_by} ({rows} rows over ten years)")
+            timed(f"insert_rows({rows})", lambda: engine.insert_rows(data))
+            # Synthetic dates run 2015-2024: the newest year stands in for the current one
+            recent = Date(2024, 6, 1)
+            timed("page of 50 by date from the latest year", lambda: engine.page_expenses(50, order="date", start=recent), 200)
+            timed("page of 50 by id", lambda: engine.page_expenses(50), 200)
+            timed("load_expense", lambda: engine.load_expense(rows // 2), 2000)
+            timed("search, 20 best matches", lambda: engine.search_expenses("coffee 12", 20), 50)
+            timed("update_expense_date within a year", lambda: engine.update_expense_date(rows // 3, Date(2016, 2, 2)), 100)
+            timed("update_expense_date across years", lambda: engine.update_expense_date(
+                rows // 3, Date(2016 + time.perf_counter_ns() % 2, 3, 3)), 100)
+            if partition_by is None:
+                timed("VACUUM (whole ledger)", lambda: engine.connection().execute("VACUUM"))
+            else:
+                key = "2016" if partition_by == "year" else "2016-03"
+                timed(f"compact_partition({key!r})", lambda: engine.compact_partition(key))
+                path = os.path.join(directory, f"archive-{partition_by}.db")
+                timed(f"archive_partition({key!r})", lambda: engine.archive_partition(key, path))
+            engine.close()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
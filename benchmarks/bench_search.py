@@ -0,0 +1,63 @@
+"""Description search: FTS5 index vs a LIKE scan
+
+Run from the repository root:
+    python -m benchmarks.bench_search [rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from storage import StorageEngine
+
+WORDS = ("coffee", "uber", "rent", "pizza", "groceries", "cinema", "electricity", "gym", "book", "train")
+QUERIES = (
+    ("rare word", "zanzibar"),
+    ("common word", "coffee"),
+    ("prefix", "elec"),
+    ("two words", "coffee train"),
+    ("typing", "coffee tr"),
+)
+
+def best_of(function, repeat: int = 20) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(rows: int = 1_000_000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = StorageEngine(os.path.join(directory, "bench.db"))
+        engine.create_table()
+        words = ", ".join(f"'{word}'" for word in WORDS)
+        start = time.perf_counter()
+        with engine._transaction() as conn:
+            conn.execute(f'''
+                WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?),
+                words(k, word) AS (SELECT key, value FROM json_each(json_array({words})))
+                INSERT INTO expenses(amount, category, description, date)
+                SELECT (i % 50000) / 100.0 + 1, 'Groceries',
+                       (SELECT word FROM words WHERE k = i % 10) || ' ' ||
+                       (SELECT word FROM words WHERE k = (i / 10) % 10) || ' #' || i ||
+                       CASE WHEN i % 100000 = 0 THEN ' zanzibar' ELSE '' END,
+                       date('2015-01-01', '+' || (i % 3650) || ' days')
+                FROM n
+            ''', (rows,))
+        print(f"{rows} rows inserted and indexed in {time.perf_counter() - start:.1f} s")
+
+        conn = engine.connection()
+        print(f"{'query':<12} {'order':<7} {'fts5 ms':>9} {'LIKE ms':>9}")
+        for label, query in QUERIES:
+            like = " AND ".join("description LIKE ?" for _ in query.split())
+            patterns = [f"%{word}%" for word in query.split()]
+            scan = best_of(lambda: conn.execute(
+                f"SELECT * FROM expenses WHERE {like} ORDER BY id DESC LIMIT 20", patterns).fetchall(), repeat=3)
+            for order in ("recent", "rank"):
+                elapsed = best_of(lambda: engine.search_expenses(query, 20, order=order))
+                print(f"{label:<12} {order:<7} {elapsed * 1000:9.3f} {scan * 1000:9.1f}")
+        engine.close()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
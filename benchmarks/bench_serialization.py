@@ -0,0 +1,46 @@
+"""Encoding an expense list: to_dict + jsonable_encoder + json vs cached per-expense bytes
+
+Run from the repository root:
+    python -m benchmarks.bench_serialization [rows ...]   (default: 10000 1000000)
+"""
+
+import gzip
+import json
+import sys
+import time
+from fastapi.encoders import jsonable_encoder
+from benchmarks.synthetic import synthetic_drafts
+from expense import Expense
+from serialization import dumps, join_array, orjson
+
+def timed(function) -> tuple[float, bytes]:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def encode_before(expenses: list[Expense]) -> bytes:
+    """What a dict-returning FastAPI handler did: build dicts, walk them, then json.dumps"""
+    content = jsonable_encoder({"expenses": [expense.to_dict() for expense in expenses], "next_cursor": None})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+def encode_after(expenses: list[Expense]) -> bytes:
+    return b'{"expenses":' + join_array(expense.to_json() for expense in expenses) + b',"next_cursor":' + dumps(None) + b"}"
+
+def main(sizes: list[int]) -> None:
+    print(f"encoder: {'orjson' if orjson is not None else 'stdlib json'}")
+    for rows in sizes:
+        expenses = [
+            Expense(index + 1, draft.amount, draft.category, draft.description, draft.date)
+            for index, draft in enumerate(synthetic_drafts(rows))
+        ]
+        before, expected = timed(lambda: encode_before(expenses))
+        cold, body = timed(lambda: encode_after(expenses))
+        warm, _ = timed(lambda: encode_after(expenses))
+        assert json.loads(body) == json.loads(expected)
+        gzip_time, compressed = timed(lambda: gzip.compress(body, compresslevel=6))
+        print(f"{rows:>9} rows: before {before * 1000:8.1f} ms | cold cache {cold * 1000:8.1f} ms "
+              f"| warm cache {warm * 1000:7.1f} ms ({before / warm:5.1f}x)")
+        print(f"{'':>15} gzip {gzip_time * 1000:8.1f} ms: {len(body) / 1e6:.1f} MB -> {len(compressed) / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 1_000_000])
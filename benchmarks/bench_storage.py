@@ -0,0 +1,66 @@
+"""Writes per second: connect-per-call storage vs the pooled StorageEngine
+
+Run from the repository root:
+    python -m benchmarks.bench_storage [rows]
+
+Both sides run in WAL mode at the same `synchronous` setting, so the difference
+is what pooling saves (connecting, applying pragmas, re-preparing statements)
+rather than fewer fsyncs.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from benchmarks.synthetic import synthetic_drafts
+from storage import StorageEngine
+
+def insert_connect_per_call(filepath: str, synchronous: str, draft) -> int:
+    """The storage layer before StorageEngine: connect, insert, commit, close"""
+    conn = sqlite3.connect(filepath)
+    try:
+        conn.execute(f"PRAGMA synchronous = {synchronous}")
+        cursor = conn.execute(
+            'INSERT INTO expenses(amount, category, description, date) VALUES(?, ?, ?, ?)',
+            (draft.amount, draft.category, draft.description, draft.date.isoformat()),
+        )
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+def bench_connect_per_call(directory: str, synchronous: str, drafts: list) -> float:
+    filepath = os.path.join(directory, f"before-{synchronous}.db")
+    # create_table leaves the file in WAL mode, which persists for later connections
+    engine = StorageEngine(filepath)
+    engine.create_table()
+    engine.close()
+    start = time.perf_counter()
+    for draft in drafts:
+        insert_connect_per_call(filepath, synchronous, draft)
+    return len(drafts) / (time.perf_counter() - start)
+
+def bench_engine(directory: str, synchronous: str, drafts: list) -> float:
+    engine = StorageEngine(os.path.join(directory, f"after-{synchronous}.db"), synchronous=synchronous)
+    engine.create_table()
+    start = time.perf_counter()
+    for draft in drafts:
+        engine.insert_expense(draft)
+    elapsed = time.perf_counter() - start
+    engine.close()
+    return len(drafts) / elapsed
+
+def main(rows: int = 2000) -> None:
+    drafts = list(synthetic_drafts(rows))
+    print(f"rows: {rows}, WAL mode")
+    with tempfile.TemporaryDirectory() as directory:
+        for synchronous in ("NORMAL", "FULL"):
+            before = bench_connect_per_call(directory, synchronous, drafts)
+            after = bench_engine(directory, synchronous, drafts)
+            print(f"synchronous={synchronous}")
+            print(f"  connect-per-call: {before:>10.0f} writes/s")
+            print(f"  StorageEngine:    {after:>10.0f} writes/s ({after / before:.1f}x)")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,45 @@
+"""Cross-worker sync: applying another process's writes vs reloading the ledger
+
+Run from the repository root:
+    python -m benchmarks.bench_worker_sync [rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from benchmarks.synthetic import synthetic_rows
+from expense_manager import create_manager
+from expense_service import ExpenseService
+from storage import StorageEngine
+
+def main(rows: int = 100_000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        engine = StorageEngine(path)
+        engine.create_table()
+        engine.insert_rows(list(synthetic_rows(rows)))
+        change_seq = engine.follow_changes()
+        service = ExpenseService(create_manager(engine, "memory"), engine, change_seq=change_seq)
+        service.sync()
+
+        calls = 100_000
+        start = time.perf_counter()
+        for _ in range(calls):
+            service.sync()
+        print(f"sync() with no foreign writes: {(time.perf_counter() - start) / calls * 1e6:.1f} us per request")
+
+        other = StorageEngine(path)
+        for changed in (1, 100, 10_000):
+            other.insert_rows(list(synthetic_rows(changed)))
+            start = time.perf_counter()
+            applied = service.sync()
+            print(f"sync() after {changed:>6} foreign inserts: {(time.perf_counter() - start) * 1000:8.2f} ms ({applied} applied)")
+        start = time.perf_counter()
+        create_manager(engine, "memory")
+        print(f"full ledger reload ({rows + 10_101} rows):  {(time.perf_counter() - start) * 1000:8.2f} ms")
+        other.close()
+        engine.close()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,252 @@
+"""Microbenchmark suite over the storage, domain, view and API layers
+
+Run from the repository root:
+    python -m benchmarks.suite run [--sizes 1000,100000,1000000] [--only TEXT] [--output FILE]
+    python -m benchmarks.suite compare BASELINE CURRENT [--threshold 0.20]
+
+`run` builds a synthetic ledger of each size, times every case against it and
+writes the results as JSON. `compare` prints the change per case and exits with
+status 1 if any case slowed down by more than the threshold. Cases are compared
+on their best sample, which is the least sensitive to background noise.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date as Date, datetime, timezone
+from fastapi.testclient import TestClient
+import cli_view
+from api.api import app, response_cache
+from api.dependencies import get_expense_service
+from async_service import AsyncExpenseService
+from benchmarks.synthetic import synthetic_rows
+from expense import Expense, ExpenseDraft
+from expense_manager import create_manager
+from storage import StorageEngine
+
+SIZES = (1_000, 100_000, 1_000_000)
+# One sample runs the case in a loop for at least this long, so fast cases are not timer noise
+SAMPLE_SECONDS = 0.05
+MIN_SAMPLES = 3
+MAX_SAMPLES = 15
+CASE_BUDGET_SECONDS = 1.0
+
+class Ledger:
+    """A populated database plus the manager, service and API client built on it"""
+    def __init__(self, directory: str, rows: int) -> None:
+        self.rows = rows
+        self.engine = StorageEngine(os.path.join(directory, f"ledger-{rows}.db"))
+        self.engine.create_table()
+        batch = []
+        for row in synthetic_rows(rows):
+            batch.append(row)
+            if len(batch) == 50_000:
+                self.engine.insert_rows(batch)
+                batch = []
+        self.engine.insert_rows(batch)
+        self.manager = create_manager(self.engine, "memory")
+        self.service = AsyncExpenseService(self.manager, self.engine)
+        app.dependency_overrides[get_expense_service] = lambda: self.service
+        self.client = TestClient(app)
+
+    def ids(self):
+        """Endless, reproducible stream of existing expense IDs"""
+        step = max(1, self.rows // 997)
+        return itertools.cycle(range(1, self.rows + 1, step))
+
+    def close(self) -> None:
+        app.dependency_overrides.clear()
+        response_cache.clear()
+        self.service.close()
+        self.engine.close()
+
+# (name, sized, factory): a factory takes a Ledger and returns the callable to time.
+# Unsized cases do not depend on the ledger and only run against the smallest one.
+CASES = []
+
+def case(name: str, sized: bool = True):
+    def register(factory):
+        CASES.append((name, sized, factory))
+        return factory
+    return register
+
+@case("storage.load_expenses")
+def load_expenses(ledger: Ledger):
+    return ledger.engine.load_expenses
+
+@case("storage.insert_expense")
+def insert_expense(ledger: Ledger):
+    draft = ExpenseDraft(12.5, "Groceries", "Benchmark insert", Date(2026, 1, 1))
+    return lambda: ledger.engine.insert_expense(draft)
+
+@case("storage.update_expense_amount")
+def update_amount(ledger: Ledger):
+    ids, amounts = ledger.ids(), itertools.cycle((10.0, 20.0))
+    return lambda: ledger.engine.update_expense_amount(next(ids), next(amounts))
+
+@case("storage.update_expense_category")
+def update_category(ledger: Ledger):
+    ids, categories = ledger.ids(), itertools.cycle(("Groceries", "Savings"))
+    return lambda: ledger.engine.update_expense_category(next(ids), next(categories))
+
+@case("storage.update_expense_description")
+def update_description(ledger: Ledger):
+    ids, descriptions = ledger.ids(), itertools.cycle(("Coffee", "Train ticket"))
+    return lambda: ledger.engine.update_expense_description(next(ids), next(descriptions))
+
+@case("storage.update_expense_date")
+def update_date(ledger: Ledger):
+    ids, dates = ledger.ids(), itertools.cycle((Date(2020, 1, 1), Date(2021, 6, 30)))
+    return lambda: ledger.engine.update_expense_date(next(ids), next(dates))
+
+@case("manager.get_category_summary")
+def category_summary(ledger: Ledger):
+    return ledger.manager.get_category_summary
+
+@case("expense.construct", sized=False)
+def construct_expense(ledger: Ledger):
+    return lambda: Expense(1, 12.5, "Groceries", "Coffee", Date(2026, 1, 1))
+
+@case("cli_view.show_expense_list")
+def show_expense_list(ledger: Ledger):
+    expenses = ledger.manager.export_expense_list()
+    return lambda: cli_view.show_expense_list(expenses)
+
+def _get(ledger: Ledger, url_or_urls) -> callable:
+    urls = itertools.cycle([url_or_urls] if isinstance(url_or_urls, str) else url_or_urls)
+    def request():
+        # Measure building the response, not a hit in the versioned response cache
+        response_cache.clear()
+        ledger.client.get(next(urls)).raise_for_status()
+    return request
+
+@case("api.get_expenses_page")
+def api_list(ledger: Ledger):
+    return _get(ledger, "/expenses?limit=100")
+
+@case("api.get_expense")
+def api_get(ledger: Ledger):
+    return _get(ledger, [f"/expenses/{expense_id}" for expense_id in itertools.islice(ledger.ids(), 997)])
+
+@case("api.get_summary")
+def api_summary(ledger: Ledger):
+    return _get(ledger, "/summary")
+
+@case("api.create_expense")
+def api_create(ledger: Ledger):
+    body = {"amount": 12.5, "category": "Groceries", "description": "Benchmark insert", "date": "2026-01-01"}
+    return lambda: ledger.client.post("/expenses", json=body).raise_for_status()
+
+def measure(function) -> dict:
+    """Time `function` in samples of `loops` calls; report seconds per call"""
+    start = time.perf_counter()
+    function()
+    first = time.perf_counter() - start
+    loops = max(1, int(SAMPLE_SECONDS / first)) if first > 0 else 1000
+    samples = []
+    deadline = time.perf_counter() + CASE_BUDGET_SECONDS
+    while len(samples) < MIN_SAMPLES or (len(samples) < MAX_SAMPLES and time.perf_counter() < deadline):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        samples.append((time.perf_counter() - start) / loops)
+    return {"best": min(samples), "median": statistics.median(samples), "samples": len(samples), "loops": loops}
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(sizes: list[int], only: str | None = None) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            start = time.perf_counter()
+            ledger = Ledger(directory, size)
+            print(f"ledger of {size} rows built in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+            try:
+                for name, sized, factory in CASES:
+                    if (not sized and size != min(sizes)) or (only and only not in name):
+                        continue
+                    key = f"{name}[{size}]" if sized else name
+                    results[key] = measure(factory(ledger))
+                    print(f"{key:<48} {results[key]['best'] * 1e6:14.1f} µs", file=sys.stderr)
+            finally:
+                ledger.close()
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.platform(),
+        },
+        "results": results,
+    }
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Print a change table and return the cases that slowed down beyond `threshold`"""
+    regressions = []
+    before, after = baseline["results"], current["results"]
+    print(f"{'case':<48} {'baseline µs':>14} {'current µs':>14} {'change':>8}")
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key]["best"], after[key]["best"]
+        change = new / old - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<48} {old * 1e6:14.1f} {new * 1e6:14.1f} {change:+8.1%}{flag}")
+    for key in sorted(before.keys() - after.keys()):
+        print(f"{key:<48} missing from current results")
+    for key in sorted(after.keys() - before.keys()):
+        print(f"{key:<48} new, no baseline")
+    return regressions
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Run the suite and write results as JSON")
+    run_parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                            type=lambda text: [int(size) for size in text.split(",")],
+                            help="Comma-separated ledger sizes (default: %(default)s)")
+    run_parser.add_argument("--only", help="Only run cases whose name contains this text")
+    run_parser.add_argument("--output", default="benchmark-results.json", help="Results file (default: %(default)s)")
+    compare_parser = commands.add_parser("compare", help="Compare two results files and flag regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.20,
+                                help="Allowed slowdown as a fraction of the baseline (default: %(default)s)")
+    return parser.parse_args(argv)
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.command == "run":
+        results = run(args.sizes, args.only)
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"{len(results['results'])} results written to {args.output}")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
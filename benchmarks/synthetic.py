@@ -0,0 +1,30 @@
+"""Synthetic ledger generation shared by the benchmarks"""
+
+import random
+from datetime import date as Date, timedelta
+from expense import ExpenseDraft
+from expense_manager import categories
+
+DESCRIPTIONS = ["Uber", "Pizza", "Coffee", "Electricity bill", "Haircut", "Cinema", "Rent", "Train ticket", "Groceries run", "Savings transfer"]
+
+def synthetic_drafts(count: int, seed: int = 42, start: Date = Date(2015, 1, 1)):
+    """Yield `count` reproducible ExpenseDrafts spread over roughly ten years"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield ExpenseDraft(
+            round(rng.uniform(1, 500), 2),
+            rng.choice(categories),
+            f"{rng.choice(DESCRIPTIONS)} #{rng.randint(1, 9999)}",
+            start + timedelta(days=rng.randint(0, 3650)),
+        )
+
+def synthetic_rows(count: int, seed: int = 42, start: Date = Date(2015, 1, 1)):
+    """Yield raw (amount, category, description, date) tuples, skipping ExpenseDraft validation"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield (
+            round(rng.uniform(1, 500), 2),
+            rng.choice(categories),
+            f"{rng.choice(DESCRIPTIONS)} #{rng.randint(1, 9999)}",
+            (start + timedelta(days=rng.randint(0, 3650))).isoformat(),
+        )
@@ -56,21 +56,26 @@ def show_expense_delete_cancelled() -> str:
     return f"Deletion cancelled\n"
 
 def show_expense_list(expenses: list[Expense]) -> str:
-    """Format list of expenses as ASCII table"""
+    """Format list of expenses as ASCII table
+
+    Column widths fit the expenses given, so pass one page at a time for large ledgers.
+    """
     if not expenses:
         return show_empty_list()
 
     max_width_category = 9
     max_width_description = 11
+    max_id = 0
     for expense in expenses:
         if len(expense.category) > max_width_category:
             max_width_category = len(expense.category)
         if len(expense.description) > max_width_description:
             max_width_description = len(expense.description)
+        max_id = max(max_id, expense.id)
 
     max_width_description += 2
     max_width_category += 2
-    mw_id = 4
+    mw_id = max(4, len(str(max_id)))
     mw_amount = 10
     mw_date = 10
 
@@ -83,6 +88,10 @@ def show_expense_list(expenses: list[Expense]) -> str:
     expenses_table_data = "\n".join([format_table_row(expense) for expense in expenses])
     return header_row + "\n" + separator_row + "\n" + expenses_table_data + "\n"
 
+def show_page_position(page_number: int, has_next: bool) -> str:
+    """Footer under a page of the expense list"""
+    return f"Page {page_number}" + (" - more below" if has_next else " (end)") + "\n"
+
 def show_total(total: float) -> str:
     """Format total spending message"""
     return f"💰 Total spending: ${total:.2f}"
@@ -114,9 +123,34 @@ def show_empty_list() -> str:
     """Message for empty expense list"""
     return "📭 No expenses yet!\n"
 
+def show_no_search_results(query: str) -> str:
+    """Message for a search that matched nothing"""
+    return f"🔍 No expenses match '{query}'\n"
+
 def format_expense_row(expense: Expense) -> str:
     return f"[{expense.id}] ${expense.amount:.2f} - {expense.category} - {expense.description}"
 
+def show_import_report(report: dict) -> str:
+    """Summary of a CSV import, listing the rejected rows that were reported"""
+    lines = [f"✅ Imported {report['imported']} expense(s), skipped {report['skipped']}"]
+    for error in report["errors"]:
+        lines.append(f"  row {error['row']}: {error['error']}")
+    if report["skipped"] > len(report["errors"]):
+        lines.append(f"  ... and {report['skipped'] - len(report['errors'])} more")
+    return "\n".join(lines) + "\n"
+
+def show_partitions(partitions: list[tuple[str, int]]) -> str:
+    """One line per date partition with its row count"""
+    if not partitions:
+        return "The ledger is not partitioned (set PARTITION_BY in config.py)\n"
+    return "\n".join(f"  {key:<8} {rows:>10} expense(s)" for key, rows in partitions) + "\n"
+
+def show_partition_archived(key: str, rows: int, path: str) -> str:
+    return f"✅ Archived {rows} expense(s) from partition {key} to {path}\n"
+
+def show_partition_compacted(key: str) -> str:
+    return f"✅ Compacted partition {key}\n"
+
 
 # print(show_expense_list(None))
 
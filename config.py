@@ -1 +1,55 @@
-STORAGE_PATH = "expenses.db"
\ No newline at end of file
+STORAGE_PATH = "expenses.db"
+
+# "memory" keeps the whole ledger in ExpenseManager as Expense objects, "columnar" keeps
+# it in compact typed arrays, and "sql" queries SQLite on demand
+MANAGER_MODE = "memory"
+# Number of recently used expenses the "sql" manager keeps in memory
+MANAGER_CACHE_SIZE = 1024
+
+# SQLite `synchronous` mode. In WAL mode "NORMAL" fsyncs only at checkpoints, so the last
+# commits before a power loss can be lost (never corrupted); "FULL" fsyncs every commit.
+SQLITE_SYNCHRONOUS = "NORMAL"
+
+# Write-behind mode: when True, single inserts are queued and committed in batches of
+# up to WRITE_BATCH_SIZE rows, waiting at most WRITE_MAX_DELAY_MS for a batch to fill.
+# The API then runs SQLite with synchronous "FULL", so a batch is on disk before it is acknowledged.
+WRITE_BEHIND = False
+WRITE_BATCH_SIZE = 500
+WRITE_MAX_DELAY_MS = 5
+
+# JSON responses at least this large are sent gzip/brotli-compressed when the client accepts it
+COMPRESSION_MIN_BYTES = 1024
+
+# Binary snapshot of the ledger that "memory" and "columnar" mode load at startup instead of
+# reading every row from SQLite (None disables it). Columnar mode uses its arrays directly;
+# memory mode still builds one Expense object per row from them. It is rewritten in the
+# background once no write has landed for SNAPSHOT_SETTLE_SECONDS, and ignored when out of date.
+SNAPSHOT_PATH = "expenses.snapshot"
+SNAPSHOT_SETTLE_SECONDS = 2.0
+
+# Number of best-ranked matches the TUI shows for a description search
+SEARCH_RESULT_LIMIT = 50
+
+# Request latency, storage timings and ledger gauges served at GET /metrics in the
+# Prometheus text format. Cheap enough to leave on; False removes the instrumentation.
+METRICS_ENABLED = True
+
+# Expenses per page when the TUI lists or picks expenses
+CLI_PAGE_SIZE = 20
+
+# Lets the API run as several worker processes (uvicorn --workers N) on one database: each
+# worker checks PRAGMA data_version before every request and reloads only the expenses
+# other workers changed, found through the expense_changes log
+WORKER_SYNC = True
+
+# The change log behind GET /expenses/changes keeps at least the newest CHANGE_LOG_RETENTION
+# entries. Older ones are compacted every CHANGE_LOG_COMPACT_SECONDS; clients positioned
+# before what was dropped get 410 Gone and resync from since=0.
+CHANGE_LOG_RETENTION = 100_000
+CHANGE_LOG_COMPACT_SECONDS = 60
+
+# Optional date partitioning of the ledger: "year" or "month" keeps each period's expenses in
+# its own table, so date-bounded pages read only the recent ones and old periods can be
+# archived or compacted on their own. None keeps one table; set it before the database grows
+# large, as an existing ledger is split once, in one transaction, on the next start.
+PARTITION_BY = None
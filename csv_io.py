@@ -0,0 +1,110 @@
+"""Streaming CSV import
+
+Records are read with csv.reader in chunks of `chunk_rows`, parsed and validated
+in a process pool, and handed back in file order so each chunk can be inserted in
+one transaction. At most `max_pending` chunks are in flight at a time, so memory
+stays flat however large the file is. Exports use export.csv_chunks.
+"""
+
+import csv
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+from datetime import date as Date
+from itertools import islice
+from expense import ExpenseDraft
+from exceptions import (
+    CorruptedDataError,
+    InvalidCategoryError,
+    InvalidDateError,
+    InvalidExpenseDataError,
+    InvalidExpenseDescriptionError,
+)
+
+REQUIRED_COLUMNS = ("amount", "category", "description")
+# Reports list at most this many rejected rows; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+def _column_indexes(header: list[str]) -> dict[str, int]:
+    """Map required (and optional date) columns to their positions; `id` and unknown columns are ignored"""
+    names = [name.strip().lower() for name in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in names]
+    if missing:
+        raise CorruptedDataError(f"CSV header is missing column(s): {', '.join(missing)}")
+    return {column: names.index(column) for column in (*REQUIRED_COLUMNS, "date") if column in names}
+
+def parse_chunk(records: list[list[str]], columns: dict[str, int], first_row: int, categories: list[str]) -> tuple[list[tuple], list[tuple[int, str]]]:
+    """Validate raw CSV records (runs in a worker process).
+
+    Returns insertable (amount, category, description, iso_date) rows and a
+    (row number, message) pair for every rejected record. A blank date means today.
+    """
+    width = max(columns.values()) + 1
+    date_index = columns.get("date")
+    rows, errors = [], []
+    for row_number, record in enumerate(records, first_row):
+        try:
+            if len(record) < width:
+                raise InvalidExpenseDataError(f"Expected at least {width} columns, got {len(record)}")
+            raw_date = record[date_index].strip() if date_index is not None else ""
+            try:
+                date = Date.fromisoformat(raw_date) if raw_date else None
+            except ValueError:
+                raise InvalidDateError(f"Date must be YYYY-MM-DD. Got {raw_date}")
+            draft = ExpenseDraft(record[columns["amount"]], record[columns["category"]], record[columns["description"]], date)
+            if draft.category not in categories:
+                raise InvalidCategoryError(f"Given category: {draft.category} is not in predefined categories")
+        except (InvalidExpenseDataError, InvalidCategoryError, InvalidExpenseDescriptionError, InvalidDateError) as e:
+            errors.append((row_number, str(e)))
+            continue
+        rows.append((draft.amount, draft.category, draft.description, draft.date.isoformat()))
+    return rows, errors
+
+def iter_parsed_chunks(
+    lines: Iterable[str],
+    categories: list[str],
+    chunk_rows: int = 10_000,
+    workers: int | None = None,
+    max_pending: int | None = None
+) -> Iterator[tuple[list[tuple], list[tuple[int, str]]]]:
+    """Yield (rows, errors) per chunk of a CSV, in file order. `lines` is an open text file or any line iterable."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        raise CorruptedDataError("CSV file is empty")
+    columns = _column_indexes(header)
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    pending = deque()
+    next_row = 1
+    # Imported here so that every process importing the services does not load multiprocessing
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    # spawn, not fork: the API process runs writer and reader threads
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        while records := list(islice(reader, chunk_rows)):
+            pending.append(pool.submit(parse_chunk, records, columns, next_row, categories))
+            next_row += len(records)
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class ImportReport:
+    """Running totals of an import, with the first MAX_REPORTED_ERRORS rejected rows"""
+    def __init__(self) -> None:
+        self.imported = 0
+        self.skipped = 0
+        self.errors: list[tuple[int, str]] = []
+
+    def add(self, imported: int, errors: list[tuple[int, str]]) -> None:
+        self.imported += imported
+        self.skipped += len(errors)
+        self.errors.extend(errors[:MAX_REPORTED_ERRORS - len(self.errors)])
+
+    def to_dict(self) -> dict:
+        return {
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "errors": [{"row": row, "error": message} for row, message in self.errors],
+        }
@@ -26,4 +26,25 @@ class ExpenseNotFoundError(Exception):
 
 class CorruptedDataError(Exception):
     """Raised when trying to load a corrupted file"""
-    pass
\ No newline at end of file
+    pass
+
+class InvalidCursorError(Exception):
+    """Raised when a pagination cursor or order is malformed"""
+    pass
+
+class InvalidSearchQueryError(Exception):
+    """Raised when a search query contains no searchable words"""
+    pass
+
+class BulkExpenseError(Exception):
+    """Raised when one or more rows of a bulk insert are invalid
+
+    `errors` maps the position of each rejected row to its error message.
+    """
+    def __init__(self, errors: dict[int, str]) -> None:
+        super().__init__(f"{len(errors)} invalid expense(s) in batch")
+        self.errors = errors
+
+class ChangeLogExpiredError(Exception):
+    """Raised when a change-log position is older than what compaction has kept"""
+    pass
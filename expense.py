@@ -1,6 +1,9 @@
 """Expense entity representing an expense."""
 
+import math
+from dataclasses import dataclass
 from datetime import date as Date
+from serialization import dumps
 from exceptions import (
     InvalidExpenseIdError,
     InvalidExpenseDataError,
@@ -18,6 +21,8 @@ def normalize_amount(amount: float|int) -> float:
             amount = float(amount)
         except (ValueError, TypeError):
             raise InvalidExpenseDataError(f"Amount must be a number. Got {type(amount).__name__}: {amount} instead")
+    if not math.isfinite(amount):
+        raise InvalidExpenseDataError(f"Amount must be a finite number. Got {amount} instead")
     if amount <= 0:
         raise InvalidExpenseDataError(f"Amount must be positive. Got {amount} instead")
     return amount
@@ -47,8 +52,25 @@ class ExpenseDraft:
         self.description = description.strip()
         self.date = date or Date.today()
 
+@dataclass(frozen=True)
+class ExpensePatch:
+    """Partial correction of an expense; fields left as None stay unchanged.
+
+    Validated when applied, by ExpenseService.apply_patch.
+    """
+    amount: float | None = None
+    category: str | None = None
+    description: str | None = None
+    date: Date | None = None
+
+    def is_empty(self) -> bool:
+        return self.amount is None and self.category is None and self.description is None and self.date is None
+
 class Expense:
     """Main entity"""
+    # _encoded holds the JSON of to_dict(), built on first use and cleared by every correction
+    __slots__ = ("_id", "_amount", "_category", "_description", "_date", "_encoded")
+
     def __init__(
             self,
             expense_id: int,
@@ -73,6 +95,23 @@ class Expense:
         self._category = category.strip()
         self._description = description.strip()
         self._date = date or Date.today()
+        self._encoded = None
+
+    @classmethod
+    def trusted(cls, expense_id: int, amount: float, category: str, description: str, date: Date) -> "Expense":
+        """Build an expense from values that were validated before they were stored.
+
+        Skips every check __init__ makes, so only use it for rows read back from the
+        database or drafts that already passed validation.
+        """
+        expense = object.__new__(cls)
+        expense._id = expense_id
+        expense._amount = amount
+        expense._category = category
+        expense._description = description
+        expense._date = date
+        expense._encoded = None
+        return expense
 
     @property
     def id(self) -> int:
@@ -87,6 +126,7 @@ class Expense:
         if validated_amount == self.amount:
             return
         self._amount = validated_amount
+        self._encoded = None
     
     @property
     def category(self) -> str:
@@ -98,6 +138,7 @@ class Expense:
         if new_category == self.category:
             return
         self._category = new_category
+        self._encoded = None
 
     @property
     def description(self) -> str:
@@ -109,6 +150,7 @@ class Expense:
         if new_description == self.description:
             return
         self._description = new_description
+        self._encoded = None
 
     @property
     def date(self) -> Date:
@@ -119,6 +161,7 @@ class Expense:
         if new_date == self.date:
             return
         self._date = new_date
+        self._encoded = None
 
     def to_csv_row(self) -> list:
         """Return expense as a list for CSV writing"""
@@ -149,4 +192,10 @@ class Expense:
             "category": self.category,
             "description": self.description,
             "date": self.date.isoformat()
-        }
\ No newline at end of file
+        }
+
+    def to_json(self) -> bytes:
+        """to_dict() encoded as JSON bytes, cached until the expense is corrected"""
+        if self._encoded is None:
+            self._encoded = dumps(self.to_dict())
+        return self._encoded
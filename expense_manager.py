@@ -1,27 +1,373 @@
 """Domain logic"""
+import secrets
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, MutableMapping
 from expense import Expense, ExpenseDraft
+from storage import StorageEngine
 from datetime import date as Date
-from exceptions import InvalidCategoryError, InvalidExpenseIdError, ExpenseNotFoundError
+from exceptions import (
+    InvalidCategoryError,
+    InvalidExpenseIdError,
+    ExpenseNotFoundError,
+    InvalidExpenseDataError,
+    InvalidExpenseDescriptionError,
+    InvalidDateError,
+    BulkExpenseError
+)
 
 categories = ["Groceries", "Transportation", "Utilities", "Personal Care", "Savings", "Entertainment"]
 
+class _RunningTotal:
+    """Per-category running total and count, updated in O(1).
+
+    Uses Neumaier (compensated) summation so that long runs of additions and
+    removals do not accumulate float drift.
+    """
+    __slots__ = ("_sum", "_compensation", "count")
+
+    def __init__(self) -> None:
+        self._sum = 0.0
+        self._compensation = 0.0
+        self.count = 0
+
+    def _accumulate(self, value: float) -> None:
+        total = self._sum + value
+        if abs(self._sum) >= abs(value):
+            self._compensation += (self._sum - total) + value
+        else:
+            self._compensation += (value - total) + self._sum
+        self._sum = total
+
+    def add(self, amount: float) -> None:
+        self._accumulate(amount)
+        self.count += 1
+
+    def remove(self, amount: float) -> None:
+        self.count -= 1
+        if self.count == 0:
+            self._sum = self._compensation = 0.0
+        else:
+            self._accumulate(-amount)
+
+    @property
+    def value(self) -> float:
+        return self._sum + self._compensation
+
+    @classmethod
+    def restore(cls, total: float, count: int) -> "_RunningTotal":
+        """Resume from a previously computed total, e.g. one stored in a snapshot"""
+        running = cls()
+        running._sum = float(total)
+        running.count = count
+        return running
+
+class _ExpenseView(Expense):
+    """Expense whose fields live in a ColumnarLedger rather than on the object.
+
+    The private attributes Expense reads and writes are redirected to the ledger's
+    columns, so properties and correct_* methods work unchanged on a view.
+    """
+    __slots__ = ("_columns", "_view_id")
+
+    def __init__(self, columns: "ColumnarLedger", expense_id: int) -> None:
+        self._columns = columns
+        self._view_id = expense_id
+        self._encoded = None
+
+    def _column(name: str) -> property:
+        return property(
+            lambda self: self._columns._read(self._view_id, name),
+            lambda self, value: self._columns._write(self._view_id, name, value),
+        )
+
+    _id = property(lambda self: self._view_id)
+    _amount = _column("amount")
+    _category = _column("category")
+    _description = _column("description")
+    _date = _column("date")
+    del _column
+
+class ColumnarLedger(MutableMapping):
+    """Compact id -> Expense mapping for very large ledgers.
+
+    Rows are stored column-wise in typed arrays sorted by id: amounts as doubles,
+    categories as one-byte codes, dates as day ordinals and descriptions as UTF-8
+    slices of a single shared buffer. Lookups bisect the id column and return
+    lightweight _ExpenseView objects created on demand.
+    """
+    def __init__(self) -> None:
+        self._ids = array("q")
+        self._amounts = array("d")
+        self._category_codes = array("B")
+        self._ordinals = array("i")
+        self._description_offsets = array("Q")
+        self._description_lengths = array("I")
+        self._descriptions = bytearray()
+        self._garbage = 0
+        self._category_names = list(categories)
+        self._category_lookup = {name: code for code, name in enumerate(self._category_names)}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple], ordinal_dates: bool = False) -> "ColumnarLedger":
+        """Build from raw (id, amount, category, description, date) storage rows in id order.
+
+        Dates are ISO strings, or day ordinals already when `ordinal_dates` is set.
+        """
+        ledger = cls()
+        for expense_id, amount, category, description, date in rows:
+            ledger._append(expense_id, amount, category, description, date if ordinal_dates else Date.fromisoformat(date).toordinal())
+        return ledger
+
+    # Column order for to_buffers/from_buffers: widest items first keeps every column aligned
+    BUFFER_COLUMNS = ("_ids", "_amounts", "_description_offsets", "_ordinals", "_description_lengths", "_category_codes")
+
+    def to_buffers(self) -> tuple[list[str], list[array], bytes]:
+        """Category names, the typed columns in BUFFER_COLUMNS order, and the description bytes"""
+        self._compact_descriptions(force=True)
+        return list(self._category_names), [getattr(self, name) for name in self.BUFFER_COLUMNS], bytes(self._descriptions)
+
+    @classmethod
+    def from_buffers(cls, category_names: list[str], columns: list[array], descriptions: bytearray) -> "ColumnarLedger":
+        """Inverse of to_buffers; the arrays are adopted, not copied"""
+        ledger = cls()
+        for name, column in zip(cls.BUFFER_COLUMNS, columns, strict=True):
+            if column.typecode != getattr(ledger, name).typecode:
+                raise ValueError(f"Column {name} has typecode {column.typecode}")
+            setattr(ledger, name, column)
+        ledger._descriptions = descriptions
+        ledger._category_names = list(category_names)
+        ledger._category_lookup = {name: code for code, name in enumerate(ledger._category_names)}
+        return ledger
+
+    def to_expenses(self) -> dict[int, Expense]:
+        """Plain id -> Expense dict of every row, e.g. for "memory" mode started from a snapshot"""
+        names = self._category_names
+        descriptions = self._descriptions
+        return {
+            expense_id: Expense.trusted(expense_id, amount, names[code], descriptions[offset:offset + length].decode(), Date.fromordinal(ordinal))
+            for expense_id, amount, code, ordinal, offset, length in zip(
+                self._ids, self._amounts, self._category_codes, self._ordinals, self._description_offsets, self._description_lengths)
+        }
+
+    def _category_code(self, category: str) -> int:
+        code = self._category_lookup.get(category)
+        if code is None:
+            code = len(self._category_names)
+            self._category_names.append(category)
+            self._category_lookup[category] = code
+        return code
+
+    def _store_description(self, description: str) -> tuple[int, int]:
+        encoded = description.encode()
+        offset = len(self._descriptions)
+        self._descriptions += encoded
+        return offset, len(encoded)
+
+    def _append(self, expense_id: int, amount: float, category: str, description: str, ordinal: int) -> None:
+        if self._ids and expense_id <= self._ids[-1]:
+            raise ValueError("Rows must be appended in increasing id order")
+        offset, length = self._store_description(description)
+        self._ids.append(expense_id)
+        self._amounts.append(amount)
+        self._category_codes.append(self._category_code(category))
+        self._ordinals.append(ordinal)
+        self._description_offsets.append(offset)
+        self._description_lengths.append(length)
+
+    def _row(self, expense_id: int) -> int:
+        row = bisect_left(self._ids, expense_id)
+        if row == len(self._ids) or self._ids[row] != expense_id:
+            raise KeyError(expense_id)
+        return row
+
+    def _read(self, expense_id: int, column: str):
+        row = self._row(expense_id)
+        if column == "amount":
+            return self._amounts[row]
+        if column == "category":
+            return self._category_names[self._category_codes[row]]
+        if column == "date":
+            return Date.fromordinal(self._ordinals[row])
+        offset = self._description_offsets[row]
+        return self._descriptions[offset:offset + self._description_lengths[row]].decode()
+
+    def _write(self, expense_id: int, column: str, value) -> None:
+        row = self._row(expense_id)
+        if column == "amount":
+            self._amounts[row] = value
+        elif column == "category":
+            self._category_codes[row] = self._category_code(value)
+        elif column == "date":
+            self._ordinals[row] = value.toordinal()
+        else:
+            self._garbage += self._description_lengths[row]
+            self._description_offsets[row], self._description_lengths[row] = self._store_description(value)
+            self._compact_descriptions()
+
+    def _compact_descriptions(self, force: bool = False) -> None:
+        # Rewritten and deleted descriptions leave dead bytes behind; reclaim them once they dominate
+        if not self._garbage or (not force and (self._garbage < 1 << 20 or self._garbage * 2 < len(self._descriptions))):
+            return
+        compacted = bytearray()
+        for row, (offset, length) in enumerate(zip(self._description_offsets, self._description_lengths)):
+            self._description_offsets[row] = len(compacted)
+            compacted += self._descriptions[offset:offset + length]
+        self._descriptions = compacted
+        self._garbage = 0
+
+    def __getitem__(self, expense_id: int) -> Expense:
+        self._row(expense_id)
+        return _ExpenseView(self, expense_id)
+
+    def __setitem__(self, expense_id: int, expense: Expense) -> None:
+        row = bisect_left(self._ids, expense_id)
+        if row < len(self._ids) and self._ids[row] == expense_id:
+            for column in ("amount", "category", "description", "date"):
+                self._write(expense_id, column, getattr(expense, column))
+            return
+        offset, length = self._store_description(expense.description)
+        self._ids.insert(row, expense_id)
+        self._amounts.insert(row, expense.amount)
+        self._category_codes.insert(row, self._category_code(expense.category))
+        self._ordinals.insert(row, expense.date.toordinal())
+        self._description_offsets.insert(row, offset)
+        self._description_lengths.insert(row, length)
+
+    def __delitem__(self, expense_id: int) -> None:
+        row = self._row(expense_id)
+        self._garbage += self._description_lengths[row]
+        for column in (self._ids, self._amounts, self._category_codes, self._ordinals,
+                       self._description_offsets, self._description_lengths):
+            del column[row]
+        self._compact_descriptions()
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, expense_id: object) -> bool:
+        row = bisect_left(self._ids, expense_id)
+        return row < len(self._ids) and self._ids[row] == expense_id
+
 class ExpenseManager:
-    def __init__(self, expense_list: list[Expense] | None) -> None:
-        if expense_list is None:
+    def __init__(
+        self,
+        expense_list: list[Expense] | None,
+        ledger: MutableMapping[int, Expense] | None = None,
+        totals: Iterable[tuple[str, float, int]] | None = None
+    ) -> None:
+        if ledger is not None:
+            self._ledger = ledger
+        elif expense_list is None:
             self._ledger = {}
         else:
             self._ledger = {expense.id: expense for expense in expense_list}
         self._categories = categories
+        self._totals = {category: _RunningTotal() for category in self._categories}
+        if totals is not None:
+            # Precomputed (category, total, count) rows, e.g. from a snapshot, save a pass over the ledger
+            for category, total, count in totals:
+                self._totals[category] = _RunningTotal.restore(total, count)
+        else:
+            for expense in self._ledger.values():
+                self._total_for(expense.category).add(expense.amount)
+        self._init_versions()
+
+    def _init_versions(self) -> None:
+        # The epoch tells ledger instances apart, so version numbers never repeat across restarts
+        self._epoch = secrets.token_hex(4)
+        self._version = 0
+        self._expense_versions: dict[int, int] = {}
+
+    def _touch(self, expense_id: int | None = None) -> None:
+        """Record a mutation: bump the ledger version and stamp it on the changed expense.
+
+        New expenses are not stamped: ids are never reused, so version 0 already
+        identifies their first state, and bulk inserts do not grow the version map.
+        """
+        self._version += 1
+        if expense_id is not None:
+            self._expense_versions[expense_id] = self._version
+
+    @property
+    def version(self) -> int:
+        """Ledger version, bumped on every mutation"""
+        return self._version
+
+    def expense_version(self, expense_id: int) -> int:
+        """Ledger version at the expense's last change (0 if unchanged since load)"""
+        self._get_existing_expense(expense_id)
+        return self._expense_versions.get(expense_id, 0)
+
+    def version_tag(self, expense_id: int | None = None) -> str:
+        """Opaque tag for the whole ledger, or one expense, at its current version"""
+        if expense_id is None:
+            return f"{self._epoch}-{self._version}"
+        return f"{self._epoch}-{expense_id}-{self.expense_version(expense_id)}"
+
+    def _total_for(self, category: str) -> _RunningTotal:
+        # Rows stored before a category was retired still need somewhere to be counted
+        total = self._totals.get(category)
+        if total is None:
+            total = self._totals[category] = _RunningTotal()
+        return total
     
     def create_draft(self, amount: float, category: str, description: str, date: Date | None) -> ExpenseDraft:
         if category not in self._categories:
             raise InvalidCategoryError(f"Given category: {category} is not in predefined categories")
         return ExpenseDraft(amount, category, description, date)
 
+    def create_drafts(self, entries: list[tuple]) -> list[ExpenseDraft]:
+        """Validate a batch of (amount, category, description, date) entries.
+
+        Every entry is checked before anything is raised, so a BulkExpenseError
+        reports all invalid rows at once.
+        """
+        drafts = []
+        errors = {}
+        for index, (amount, category, description, date) in enumerate(entries):
+            try:
+                drafts.append(self.create_draft(amount, category, description, date))
+            except (InvalidCategoryError, InvalidExpenseDataError, InvalidExpenseDescriptionError, InvalidDateError) as e:
+                errors[index] = str(e)
+        if errors:
+            raise BulkExpenseError(errors)
+        return drafts
+
     def attach_expense(self, new_expense: Expense) -> int:
+        previous = self._ledger.get(new_expense.id)
+        if previous is not None:
+            self._total_for(previous.category).remove(previous.amount)
         self._ledger[new_expense.id] = new_expense
+        self._total_for(new_expense.category).add(new_expense.amount)
+        self._touch(new_expense.id if previous is not None else None)
         return new_expense.id
 
+    def attach_expenses(self, new_expenses: list[Expense]) -> list[int]:
+        return [self.attach_expense(expense) for expense in new_expenses]
+
+    def attach_rows(self, ids: range, rows: list[tuple]) -> None:
+        """Attach freshly inserted (amount, category, description, iso_date) rows, e.g. from a CSV import"""
+        for expense_id, (amount, category, description, day) in zip(ids, rows):
+            self.attach_expense(Expense.trusted(expense_id, amount, category, description, Date.fromisoformat(day)))
+
+    @property
+    def categories(self) -> list[str]:
+        return list(self._categories)
+
+    def needs_storage(self, expense_id: int) -> bool:
+        """Whether looking up `expense_id` would read SQLite (never: the whole ledger is in memory)"""
+        return False
+
+    def adopt_expense(self, expense_id: int, expense: Expense | None) -> None:
+        """Take the stored state of an expense the caller read itself, so the next lookup stays in memory"""
+        if expense is None:
+            raise ExpenseNotFoundError(f"Expense #{expense_id} not found")
+
     def _get_existing_expense(self, expense_id: int) -> Expense:
         if not isinstance(expense_id, int):
             raise InvalidExpenseIdError(f"Expense ID must be an integer. Got {type(expense_id).__name__}")
@@ -31,23 +377,62 @@ class ExpenseManager:
             raise ExpenseNotFoundError(f"Expense #{expense_id} not found")
         
     def delete_expense(self, expense_id: int) -> None:
-        self._get_existing_expense(expense_id)
+        expense = self._get_existing_expense(expense_id)
+        self._total_for(expense.category).remove(expense.amount)
         del self._ledger[expense_id]
+        self._touch()
+        self._expense_versions.pop(expense_id, None)
     
+    def sync_expenses(self, changed: dict[int, Expense | None]) -> int:
+        """Bring expenses another process changed in line with their stored state (None: deleted).
+
+        Expenses that already match are left alone, so their versions do not move.
+        Returns how many were actually changed.
+        """
+        applied = 0
+        for expense_id, expense in changed.items():
+            current = self._ledger.get(expense_id)
+            if expense is None:
+                if current is None:
+                    continue
+                self.delete_expense(expense_id)
+            elif current is not None and (
+                (current.amount, current.category, current.description, current.date)
+                == (expense.amount, expense.category, expense.description, expense.date)
+            ):
+                continue
+            else:
+                self.attach_expense(expense)
+            applied += 1
+        return applied
+
+    def resync(self, storage: StorageEngine) -> int:
+        """Reconcile the whole ledger with storage, for when the change log can no longer say what changed"""
+        changed: dict[int, Expense | None] = dict.fromkeys(self._ledger)
+        changed.update((expense.id, expense) for expense in storage.load_expenses())
+        return self.sync_expenses(changed)
+
     def export_expense_list(self) -> list[Expense]:
         return list(self._ledger.values())
-    
+
     def correct_expense_amount(self, expense_id: int, new_amount: float) -> None:
         expense = self._get_existing_expense(expense_id)
+        old_amount = expense.amount
         expense.correct_amount(new_amount)
+        total = self._total_for(expense.category)
+        total.remove(old_amount)
+        total.add(expense.amount)
+        self._touch(expense_id)
 
     def correct_expense_date(self, expense_id: int, new_date: Date) -> None:
         expense = self._get_existing_expense(expense_id)
         expense.correct_date(new_date)
+        self._touch(expense_id)
 
     def correct_expense_description(self, expense_id: int, new_description: str) -> None:
         expense = self._get_existing_expense(expense_id)
         expense.correct_description(new_description)
+        self._touch(expense_id)
 
     def validate_category(self, new_category: str) -> None:
         if new_category.strip() not in self._categories:
@@ -57,14 +442,154 @@ class ExpenseManager:
         expense = self._get_existing_expense(expense_id)
         new_category = new_category.strip()
         self.validate_category(new_category)
+        old_category = expense.category
         expense.recategorize(new_category)
+        self._total_for(old_category).remove(expense.amount)
+        self._total_for(expense.category).add(expense.amount)
+        self._touch(expense_id)
     
     def get_category_summary(self) -> dict:
-        category_totals = {category: float(0) for category in self._categories}
-        for expense in self.export_expense_list():
-                category_totals[expense.category] += expense.amount
-        return category_totals
+        return {category: total.value for category, total in self._totals.items()}
+
+    def get_category_counts(self) -> dict:
+        return {category: total.count for category, total in self._totals.items()}
+
+    @property
+    def expense_count(self) -> int:
+        """Number of expenses in the ledger; safe to read from another thread, e.g. a metrics scrape"""
+        return len(self._ledger)
     
     def get_expense(self, expense_id: int) -> Expense:
         expense = self._get_existing_expense(expense_id)
-        return expense
\ No newline at end of file
+        return expense
+
+class SqlExpenseManager(ExpenseManager):
+    """ExpenseManager that queries SQLite on demand instead of hydrating the whole ledger.
+
+    Up to `cache_size` recently used expenses are kept in an LRU, so startup time and
+    memory no longer grow with the history.
+    """
+    def __init__(self, storage: StorageEngine, cache_size: int = 1024) -> None:
+        self._storage = storage
+        self._categories = categories
+        self._cache: OrderedDict[int, Expense] = OrderedDict()
+        self._cache_size = cache_size
+        self._init_versions()
+
+    def _remember(self, expense: Expense) -> None:
+        self._cache[expense.id] = expense
+        self._cache.move_to_end(expense.id)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def needs_storage(self, expense_id: int) -> bool:
+        return isinstance(expense_id, int) and expense_id not in self._cache
+
+    def adopt_expense(self, expense_id: int, expense: Expense | None) -> None:
+        super().adopt_expense(expense_id, expense)
+        # A copy cached while the caller was reading may already carry a newer update
+        if expense_id not in self._cache:
+            self._remember(expense)
+
+    def attach_expense(self, new_expense: Expense) -> int:
+        self._remember(new_expense)
+        self._touch()
+        return new_expense.id
+
+    def attach_rows(self, ids: range, rows: list[tuple]) -> None:
+        # Nothing to hydrate: imported rows are read from SQLite when first used
+        if rows:
+            self._touch()
+
+    def _get_existing_expense(self, expense_id: int) -> Expense:
+        if not isinstance(expense_id, int):
+            raise InvalidExpenseIdError(f"Expense ID must be an integer. Got {type(expense_id).__name__}")
+        expense = self._cache.get(expense_id)
+        if expense is None:
+            expense = self._storage.load_expense(expense_id)
+            if expense is None:
+                raise ExpenseNotFoundError(f"Expense #{expense_id} not found")
+        self._remember(expense)
+        return expense
+
+    def delete_expense(self, expense_id: int) -> None:
+        # The service has already deleted the row, so reloading it here would find nothing
+        self._cache.pop(expense_id, None)
+        self._touch()
+        self._expense_versions.pop(expense_id, None)
+
+    def sync_expenses(self, changed: dict[int, Expense | None]) -> int:
+        # Totals are read from SQLite, so only cached expenses can be stale. Uncached ones
+        # still need new version tags; a fresh epoch moves every tag without stamping each id.
+        for expense_id, expense in changed.items():
+            if expense is None:
+                self._cache.pop(expense_id, None)
+            elif expense_id in self._cache:
+                self._cache[expense_id] = expense
+        if changed:
+            self._init_versions()
+        return len(changed)
+
+    def resync(self, storage: StorageEngine) -> int:
+        dropped = len(self._cache)
+        self._cache.clear()
+        self._init_versions()
+        return dropped
+
+    def export_expense_list(self) -> list[Expense]:
+        return self._storage.load_expenses()
+
+    def correct_expense_amount(self, expense_id: int, new_amount: float) -> None:
+        self._get_existing_expense(expense_id).correct_amount(new_amount)
+        self._touch(expense_id)
+
+    def recategorize_expense(self, expense_id: int, new_category: str) -> None:
+        expense = self._get_existing_expense(expense_id)
+        new_category = new_category.strip()
+        self.validate_category(new_category)
+        expense.recategorize(new_category)
+        self._touch(expense_id)
+
+    def get_category_summary(self) -> dict:
+        summary = {category: float(0) for category in self._categories}
+        for category, total, _ in self._storage.load_category_totals():
+            summary[category] = total
+        return summary
+
+    def get_category_counts(self) -> dict:
+        counts = {category: 0 for category in self._categories}
+        for category, _, count in self._storage.load_category_totals():
+            counts[category] = count
+        return counts
+
+    @property
+    def expense_count(self) -> int:
+        # Reads the rollups, so callers on the event loop should go through a thread
+        return sum(count for _, _, count in self._storage.load_category_totals())
+
+def create_manager(storage: StorageEngine, mode: str = "memory", cache_size: int = 1024, snapshot_path: str | None = None) -> ExpenseManager:
+    """Build the manager selected by config.MANAGER_MODE.
+
+    In "memory" and "columnar" mode a current snapshot at `snapshot_path` is loaded
+    instead of reading every row from SQLite. Columnar mode uses its arrays as they
+    are; memory mode still builds one Expense per row from them, but skips the SQL
+    reads and date parsing.
+    """
+    snapshot = None
+    if snapshot_path is not None and mode in ("memory", "columnar"):
+        # Imported here because snapshot builds on this module
+        from snapshot import load_snapshot
+        snapshot = load_snapshot(storage, snapshot_path)
+    if mode == "memory":
+        if snapshot is not None:
+            ledger, totals = snapshot
+            return ExpenseManager(None, ledger.to_expenses(), totals)
+        return ExpenseManager(storage.load_expenses())
+    if mode == "columnar":
+        if snapshot is not None:
+            ledger, totals = snapshot
+            return ExpenseManager(None, ledger, totals)
+        return ExpenseManager(None, ColumnarLedger.from_rows(storage.iter_expense_rows()))
+    if mode == "sql":
+        return SqlExpenseManager(storage, cache_size)
+    raise ValueError(f"Unknown manager mode: {mode}")
@@ -1,18 +1,68 @@
 """Service Layer"""
 
-from expense import Expense, ExpenseDraft, normalize_amount, validate_date, validate_description
+import hashlib
+from expense import Expense, ExpenseDraft, ExpensePatch, normalize_amount, validate_date, validate_description
 from expense_manager import ExpenseManager
+from collections.abc import Iterable, Iterator
+from csv_io import ImportReport, iter_parsed_chunks
 from datetime import date as Date
-import storage
-from api.api import ExpensePatchDTO
+from exceptions import ChangeLogExpiredError
+from storage import GroupCommitWriter, StorageEngine
+
 
 class ExpenseService:
-    def __init__(self, manager: ExpenseManager, storage_path: str) -> None:
+    def __init__(
+        self,
+        manager: ExpenseManager,
+        storage: StorageEngine,
+        writer: GroupCommitWriter | None = None,
+        change_seq: int | None = None
+    ) -> None:
         self._manager = manager
-        self._storage_path = storage_path
+        self._storage = storage
+        # Optional write-behind mode: single inserts are batched by the writer's thread
+        self._writer = writer
+        self._analytics = None
+        # Change-log position from StorageEngine.follow_changes(), taken before the manager
+        # was loaded; None when this process is the only writer and sync() is a no-op
+        self._change_seq = change_seq
+        self._data_version = None
+
+    def sync(self) -> int:
+        """Apply expenses other processes changed since the last sync; return how many differed.
+
+        Costs one PRAGMA when nothing was committed since. Must always be called
+        from the same thread, as data_version is tracked per connection. If the log
+        was compacted past this service's position, the whole ledger is reconciled.
+        """
+        if self._change_seq is None:
+            return 0
+        return self._apply_changes(self._read_changes())
+
+    def _read_changes(self) -> tuple[int, int, dict[int, Expense | None] | None] | None:
+        """The storage half of sync(): None when nothing was committed since the last sync, else
+        the data_version, the new log position and the changed expenses (None if the log expired)"""
+        version = self._storage.data_version()
+        if version == self._data_version:
+            return None
+        try:
+            change_seq, changed = self._storage.foreign_changes(self._change_seq)
+        except ChangeLogExpiredError:
+            change_seq, changed = self._storage.change_seq(), None
+        return version, change_seq, changed
+
+    def _apply_changes(self, read: tuple[int, int, dict[int, Expense | None] | None] | None) -> int:
+        if read is None:
+            return 0
+        self._data_version, self._change_seq, changed = read
+        if changed is None:
+            return self._manager.resync(self._storage)
+        return self._manager.sync_expenses(changed)
     
     def _save_draft(self, draft: ExpenseDraft) -> Expense:
-        return storage.insert_expense(self._storage_path, draft)
+        if self._writer is not None:
+            return self._writer.submit(draft).result()
+        return self._storage.insert_expense(draft)
 
     def add_expense(
         self,
@@ -24,56 +74,173 @@ class ExpenseService:
         draft= self._manager.create_draft(amount, category, description, date)
         new_expense = self._save_draft(draft)
         return self._manager.attach_expense(new_expense)
+
+    def add_expenses(self, entries: list[tuple]) -> list[int]:
+        """Validate and persist a batch of (amount, category, description, date) entries in one transaction"""
+        drafts = self._manager.create_drafts(entries)
+        new_expenses = self._storage.insert_expenses(drafts)
+        return self._manager.attach_expenses(new_expenses)
     
     def delete_expense(self, expense_id: int) -> None:
-        storage.delete_expense(self._storage_path, expense_id)
+        self._manager.get_expense(expense_id)
+        self._storage.delete_expense(expense_id)
         self._manager.delete_expense(expense_id)
 
-    def correct_expense_amount(self, expense_id: int, new_amount: float) -> None:
+    def _prepare_update(
+        self,
+        expense_id: int,
+        amount: float | None = None,
+        category: str | None = None,
+        description: str | None = None,
+        date: Date | None = None
+    ) -> dict:
+        """Validate and normalize every given field; return only those that differ from the stored values.
+
+        The diff is taken against the in-memory expense, so no other write to this
+        expense may be in flight until the changes are applied; AsyncExpenseService
+        holds a per-expense lock for that.
+        """
         expense = self._manager.get_expense(expense_id)
-        expense.correct_amount(new_amount)
-        storage.update_expense_amount(self._storage_path, expense_id, new_amount)
+        changes = {}
+        if amount is not None:
+            changes["amount"] = normalize_amount(amount)
+        if category is not None:
+            category = category.strip()
+            self._manager.validate_category(category)
+            changes["category"] = category
+        if description is not None:
+            description = description.strip()
+            validate_description(description)
+            changes["description"] = description
+        if date is not None:
+            validate_date(date)
+            changes["date"] = date
+        return {field: value for field, value in changes.items() if getattr(expense, field) != value}
+
+    def _apply_update(self, expense_id: int, changes: dict) -> None:
+        if "amount" in changes:
+            self._manager.correct_expense_amount(expense_id, changes["amount"])
+        if "category" in changes:
+            self._manager.recategorize_expense(expense_id, changes["category"])
+        if "description" in changes:
+            self._manager.correct_expense_description(expense_id, changes["description"])
+        if "date" in changes:
+            self._manager.correct_expense_date(expense_id, changes["date"])
+
+    def _update_fields(
+        self,
+        expense_id: int,
+        amount: float | None = None,
+        category: str | None = None,
+        description: str | None = None,
+        date: Date | None = None
+    ) -> None:
+        """Validate every given field, persist the changed ones in one UPDATE, then apply them in memory.
+
+        Memory is only touched after the commit succeeds, so a failed write leaves
+        both the database row and the in-memory expense as they were.
+        """
+        changes = self._prepare_update(expense_id, amount, category, description, date)
+        if changes:
+            self._storage.update_expense_fields(expense_id, changes)
+            self._apply_update(expense_id, changes)
+
+    def correct_expense_amount(self, expense_id: int, new_amount: float) -> None:
+        self._update_fields(expense_id, amount=new_amount)
 
     def recategorize_expense(self, expense_id: int, new_category: str) -> None:
-        self._manager.recategorize_expense(expense_id, new_category)
-        storage.update_expense_category(self._storage_path, expense_id, new_category)
+        self._update_fields(expense_id, category=new_category)
 
     def correct_expense_date(self, expense_id: int, new_date: Date) -> None:
-        expense = self._manager.get_expense(expense_id)
-        expense.correct_date(new_date)
-        storage.update_expense_date(self._storage_path, expense_id, new_date)
+        self._update_fields(expense_id, date=new_date)
 
     def correct_expense_description(self, expense_id: int, new_description: str) -> None:
-        expense = self._manager.get_expense(expense_id)
-        expense.correct_description(new_description)
-        storage.update_expense_description(self._storage_path, expense_id, new_description)
+        self._update_fields(expense_id, description=new_description)
 
     def list_expenses(self) -> list[Expense]:
         return self._manager.export_expense_list()
+
+    def list_expenses_page(
+        self,
+        limit: int,
+        cursor: str | None = None,
+        order: str = "id",
+        category: str | None = None,
+        start: Date | None = None
+    ) -> tuple[list[Expense], str | None]:
+        return self._storage.page_expenses(limit, cursor, order, category, start)
+
+    def search_expenses(self, query: str, limit: int, cursor: str | None = None, order: str = "rank") -> tuple[list[Expense], str | None]:
+        """Page of expenses whose description matches every word of `query`"""
+        return self._storage.search_expenses(query, limit, cursor, order)
+
+    def list_changes(
+        self,
+        since: int,
+        limit: int,
+        after_id: int | None = None
+    ) -> tuple[list[tuple[int, int, Expense | None]], int, int | None]:
+        """Upserts and tombstones after change-log position `since`, for incremental client sync"""
+        return self._storage.read_changes(since, limit, after_id)
+
+    def iter_expense_rows(self) -> Iterator[tuple]:
+        """Stream every stored row straight from a SQLite cursor, for full exports"""
+        return self._storage.iter_expense_rows()
+
+    def import_csv(self, lines: Iterable[str], chunk_rows: int = 10_000, workers: int | None = None) -> dict:
+        """Stream a CSV into storage, one transaction per chunk; invalid rows are skipped and reported"""
+        report = ImportReport()
+        for rows, errors in iter_parsed_chunks(lines, self._manager.categories, chunk_rows, workers):
+            ids = self._storage.insert_rows(rows)
+            self._manager.attach_rows(ids, rows)
+            report.add(len(rows), errors)
+        return report.to_dict()
     
-    def get_category_summary(self):
+    def get_category_summary(self) -> dict:
         return self._manager.get_category_summary()
+
+    def get_category_counts(self) -> dict:
+        return self._manager.get_category_counts()
+
+    def get_period_summary(self, granularity: str = "month", start: Date | None = None, end: Date | None = None) -> list[dict]:
+        """Per-period, per-category totals read from the rollup table instead of the ledger"""
+        return [
+            {"period": period, "category": category, "total": total, "count": count}
+            for period, category, total, count in self._storage.load_rollups(granularity, start, end)
+        ]
     
+    def _get_analytics(self):
+        # Imported on first use so NumPy is only needed by deployments that serve analytics
+        if self._analytics is None:
+            from analytics import LedgerAnalytics
+            self._analytics = LedgerAnalytics(self._storage)
+        return self._analytics
+
+    def get_amount_stats(self, category: str | None = None) -> dict:
+        return self._get_analytics().amount_stats(category)
+
+    def get_rolling_spend(self, window_days: int = 30, start: Date | None = None, end: Date | None = None) -> list[dict]:
+        return self._get_analytics().rolling_spend(window_days, start, end)
+
+    def get_weekday_breakdown(self) -> dict:
+        return self._get_analytics().weekday_breakdown()
+
     def get_expense(self, expense_id: int) -> Expense:
         return self._manager.get_expense(expense_id)
-    
-    def apply_patch(self, expense_id: int, dto:ExpensePatchDTO) -> None:
-        expense = self._manager.get_expense(expense_id)
 
-        if dto.amount is not None:
-            normalize_amount(dto.amount)
-        if dto.category is not None:
-            self._manager.validate_category(dto.category)
-        if dto.description is not None:
-            validate_description(dto.description)
-        if dto.date is not None:
-            validate_date(dto.date)
-
-        if dto.amount is not None:
-            self.correct_expense_amount(expense_id, dto.amount)
-        if dto.category is not None:
-            self.recategorize_expense(expense_id, dto.category)
-        if dto.description is not None:
-            self.correct_expense_description(expense_id, dto.description)
-        if dto.date is not None:
-            self.correct_expense_date(expense_id, dto.date)
\ No newline at end of file
+    def get_version_tag(self, expense_id: int | None = None) -> str:
+        """Tag that changes whenever the ledger (or the given expense) changes, for HTTP ETags.
+
+        Lists and summaries are read from SQLite, so the ledger tag is the database's
+        (ledger_id, write_seq) stamp rather than the manager's version: a commit from
+        another process moves it before any sync, and every worker reads the same one.
+        An expense is tagged by a digest of the JSON it is served as, so every worker
+        holding the same state of it hands out the same tag.
+        """
+        if expense_id is None:
+            return "{}.{}".format(*self._storage.ledger_stamp())
+        return hashlib.blake2b(self._manager.get_expense(expense_id).to_json(), digest_size=8).hexdigest()
+    
+    def apply_patch(self, expense_id: int, patch: ExpensePatch) -> None:
+        """Apply every field of a patch as one single-statement, single-transaction update"""
+        self._update_fields(expense_id, patch.amount, patch.category, patch.description, patch.date)
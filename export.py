@@ -0,0 +1,54 @@
+"""Streaming encoders for full-ledger exports
+
+Each encoder consumes raw storage rows lazily and yields one bytes chunk per
+`chunk_rows` rows, so memory stays constant however large the ledger is.
+"""
+
+import csv
+import io
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from serialization import dumps
+
+def _encode_row(row: tuple) -> bytes:
+    # Same shape as Expense.to_dict; dates are already ISO strings in storage
+    return dumps({
+        "id": row[0],
+        "amount": row[1],
+        "category": row[2],
+        "description": row[3],
+        "date": row[4]
+    })
+
+def _batches(rows: Iterable[tuple], size: int) -> Iterator[list[tuple]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+def ndjson_chunks(rows: Iterable[tuple], chunk_rows: int = 1000) -> Iterator[bytes]:
+    """One JSON object per line"""
+    for batch in _batches(rows, chunk_rows):
+        yield b"".join(_encode_row(row) + b"\n" for row in batch)
+
+def json_array_chunks(rows: Iterable[tuple], chunk_rows: int = 1000) -> Iterator[bytes]:
+    """A single JSON array, emitted incrementally"""
+    separator = b"["
+    for batch in _batches(rows, chunk_rows):
+        yield separator + b",".join(_encode_row(row) for row in batch)
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+CSV_HEADER = ("id", "amount", "category", "description", "date")
+
+def csv_chunks(rows: Iterable[tuple], chunk_rows: int = 1000) -> Iterator[bytes]:
+    """CSV with a header row, in the column order of Expense.to_csv_row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    for batch in _batches(rows, chunk_rows):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
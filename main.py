@@ -1,13 +1,16 @@
 """Main application controller"""
 
+import argparse
 from expense import Expense
-from expense_manager import ExpenseManager
+from export import csv_chunks
+from expense_manager import create_manager
 from expense_service import ExpenseService
-from storage import load_expenses, create_table
+from storage import StorageEngine
 import tui_input
 import cli_view
-from exceptions import ExpenseNotFoundError, InvalidExpenseIdError, InvalidExpenseDataError
-from config import STORAGE_PATH
+from exceptions import ExpenseNotFoundError, InvalidExpenseIdError, InvalidExpenseDataError, InvalidSearchQueryError
+from snapshot import refresh_snapshot
+from config import STORAGE_PATH, PARTITION_BY, SQLITE_SYNCHRONOUS, MANAGER_MODE, MANAGER_CACHE_SIZE, SNAPSHOT_PATH, SEARCH_RESULT_LIMIT, CLI_PAGE_SIZE
 
 def correct_amount(service: ExpenseService, expense_id: int, expense: Expense) -> None:
     print(cli_view.show_current_amount(expense.amount))
@@ -33,6 +36,34 @@ def correct_date(service: ExpenseService, expense_id: int, expense: Expense) ->
     if new_date is not None:
         service.correct_expense_date(expense_id, new_date)
         
+def browse_expenses(service: ExpenseService, action: str | None = None) -> int | None:
+    """Page through the ledger in date order after narrowing it by category and start date.
+
+    Only one page is fetched and rendered at a time, so the first screen appears as
+    fast for a million expenses as for ten. Lists pages when `action` is None;
+    otherwise lets the user pick an expense to `action` and returns its ID.
+    """
+    narrowing = tui_input.get_list_filter()
+    cursors = [None]  # cursor of every page visited so far; the last one is on screen
+    while True:
+        page, next_cursor = service.list_expenses_page(
+            CLI_PAGE_SIZE, cursors[-1], "date", narrowing["category"], narrowing["start"])
+        has_next, has_previous = next_cursor is not None, len(cursors) > 1
+        if action is None:
+            print(cli_view.show_expense_list(page))
+            if not (has_next or has_previous):
+                return None
+            print(cli_view.show_page_position(len(cursors), has_next))
+            choice = tui_input.get_page_action(has_next, has_previous)
+        else:
+            choice = tui_input.pick_expense(page, action, has_next, has_previous)
+        if choice == tui_input.NEXT_PAGE:
+            cursors.append(next_cursor)
+        elif choice == tui_input.PREVIOUS_PAGE:
+            cursors.pop()
+        else:
+            return choice
+
 CORRECTION_HANDLERS = {
     "amount": correct_amount,
     "description": correct_description,
@@ -40,11 +71,71 @@ CORRECTION_HANDLERS = {
     "date": correct_date,
 }
 
+def import_csv(path: str, chunk_rows: int, workers: int | None) -> None:
+    engine = StorageEngine(STORAGE_PATH, synchronous=SQLITE_SYNCHRONOUS, partition_by=PARTITION_BY)
+    engine.create_table()
+    # The "sql" manager never hydrates the ledger, so importing keeps memory flat
+    service = ExpenseService(create_manager(engine, "sql"), engine)
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        report = service.import_csv(file, chunk_rows, workers)
+    print(cli_view.show_import_report(report))
+    engine.close()
+
+def export_csv(path: str) -> None:
+    engine = StorageEngine(STORAGE_PATH, synchronous=SQLITE_SYNCHRONOUS, partition_by=PARTITION_BY)
+    engine.create_table()
+    with open(path, "wb") as file:
+        for chunk in csv_chunks(engine.iter_expense_rows()):
+            file.write(chunk)
+    engine.close()
+
+def manage_partitions(archive: list[str] | None, compact: str | None) -> None:
+    engine = StorageEngine(STORAGE_PATH, synchronous=SQLITE_SYNCHRONOUS, partition_by=PARTITION_BY)
+    engine.create_table()
+    try:
+        if archive is not None:
+            key, path = archive
+            print(cli_view.show_partition_archived(key, engine.archive_partition(key, path), path))
+        if compact is not None:
+            engine.compact_partition(compact)
+            print(cli_view.show_partition_compacted(compact))
+        print(cli_view.show_partitions(engine.partitions()))
+    except ValueError as e:
+        print(cli_view.show_error(str(e)))
+    finally:
+        engine.close()
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Expense tracker. Without a command, starts the interactive TUI.")
+    commands = parser.add_subparsers(dest="command")
+    importer = commands.add_parser("import", help="Stream a CSV file into the ledger")
+    importer.add_argument("path")
+    importer.add_argument("--chunk-rows", type=int, default=10_000, help="Rows parsed and committed per batch")
+    importer.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    exporter = commands.add_parser("export", help="Write the whole ledger to a CSV file")
+    exporter.add_argument("path")
+    partitions = commands.add_parser("partitions", help="List the ledger's date partitions, or archive or compact one")
+    partitions.add_argument("--archive", nargs=2, metavar=("KEY", "PATH"), help="Copy one partition (e.g. 2019) to its own database file")
+    partitions.add_argument("--compact", metavar="KEY", help="Rewrite one partition onto densely packed pages")
+    return parser.parse_args(argv)
+
 def main():
-    create_table(STORAGE_PATH)
-    (expense_list) = load_expenses(STORAGE_PATH)
-    manager = ExpenseManager(expense_list)
-    service = ExpenseService(manager, STORAGE_PATH)
+    args = parse_args()
+    if args.command == "import":
+        import_csv(args.path, args.chunk_rows, args.workers)
+        return
+    if args.command == "export":
+        export_csv(args.path)
+        return
+    if args.command == "partitions":
+        manage_partitions(args.archive, args.compact)
+        return
+
+    engine = StorageEngine(STORAGE_PATH, synchronous=SQLITE_SYNCHRONOUS, partition_by=PARTITION_BY)
+    engine.create_table()
+    snapshot_path = SNAPSHOT_PATH if MANAGER_MODE != "sql" else None
+    manager = create_manager(engine, MANAGER_MODE, MANAGER_CACHE_SIZE, snapshot_path)
+    service = ExpenseService(manager, engine)
 
     print(cli_view.show_welcome()) 
 
@@ -55,9 +146,18 @@ def main():
         
         # Handle "List Expenses"
         if action == "List Expenses":
-            expense_list = service.list_expenses()
-            print(cli_view.show_expense_list(expense_list))
+            browse_expenses(service)
         
+        # Handle "Search Expenses"
+        elif action == "Search Expenses":
+            query = tui_input.get_search_query()
+            if query is not None:
+                try:
+                    results, _ = service.search_expenses(query, SEARCH_RESULT_LIMIT)
+                    print(cli_view.show_expense_list(results) if results else cli_view.show_no_search_results(query))
+                except InvalidSearchQueryError as e:
+                    print(cli_view.show_error(str(e)))
+
         # Handle "Add an Expense"
         elif action == "Add an Expense":
             expense_details = tui_input.get_expense_details()
@@ -74,7 +174,7 @@ def main():
         
         # Handle "Delete an Expense"
         elif action == "Delete an Expense":
-            expense_id = tui_input.pick_expense(service.list_expenses(), "delete")
+            expense_id = browse_expenses(service, "delete")
             if expense_id is not None:
                 if tui_input.confirm_action(f"Delete expense #{expense_id}?"):
                     try:
@@ -87,7 +187,7 @@ def main():
         
         # Handle "Correct an Expense"
         elif action == "Correct an Expense":
-            expense_id = tui_input.pick_expense(service.list_expenses(), "correct")
+            expense_id = browse_expenses(service, "correct")
             if expense_id is None:
                 continue
             expense = service.get_expense(expense_id)
@@ -111,6 +211,8 @@ def main():
         
         # Handle "Exit"
         elif action == "Exit":
+            if snapshot_path is not None:
+                refresh_snapshot(engine, snapshot_path)
             print(cli_view.show_goodbye())
             break
 
@@ -0,0 +1,235 @@
+"""In-process metrics, rendered in the Prometheus text exposition format
+
+Counters and histograms are updated from any thread. Each labelled series has its
+own lock, held only for a couple of additions, so recording costs a dict lookup
+and an uncontended lock. Gauges are callbacks read at scrape time and cost nothing
+in between. Everything here is switched on by config.METRICS_ENABLED.
+"""
+
+import bisect
+import math
+import os
+import threading
+from time import perf_counter
+
+# Seconds; suited to both HTTP requests and single SQLite statements
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """The series for these label values, created on first use; keep it to skip the lookup"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class _CounterSeries:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+class Counter(_Metric):
+    """Monotonically increasing total, optionally split by labels"""
+    kind = "counter"
+
+    def _new_series(self) -> _CounterSeries:
+        return _CounterSeries()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(series.value)}"
+            for values, series in sorted(self._series.items())
+        ]
+
+class _HistogramSeries:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed upper bounds, optionally split by labels"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self) -> _HistogramSeries:
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for values, series in sorted(self._series.items()):
+            with series._lock:
+                counts, total = list(series.counts), series.sum
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Gauge(_Metric):
+    """Value read from a callback at scrape time; a None result omits the sample"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, function) -> None:
+        super().__init__(name, help)
+        self.function = function
+
+    def _samples(self) -> list[str]:
+        value = self.function()
+        return [] if value is None else [f"{self.name} {_format_value(value)}"]
+
+class Registry:
+    """Named metrics, rendered together for a scrape.
+
+    Registering a name again returns the existing counter or histogram, so code that
+    runs per storage engine or per app instance can share series. A gauge registered
+    again takes the new callback.
+    """
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric, replace: bool = False) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None or replace:
+                self._metrics[metric.name] = metric
+                return metric
+        if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+            raise ValueError(f"Metric {metric.name} is already registered with a different type or labels")
+        return existing
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, function) -> Gauge:
+        return self._register(Gauge(name, help, function), replace=True)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+REGISTRY = Registry()
+
+def resident_memory_bytes() -> int | None:
+    """Resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+# StorageEngine methods timed by instrument_storage. Generators such as
+# iter_expense_rows are left out: their cost lands wherever they are consumed.
+STORAGE_OPERATIONS = (
+    "insert_expense", "insert_expenses", "insert_rows", "load_expenses", "load_expense",
+    "page_expenses", "search_expenses", "load_rollups", "load_category_totals", "delete_expense",
+    "update_expense_fields", "rebuild_rollups", "ledger_stamp", "foreign_changes", "read_changes", "compact_changes",
+)
+
+def _timed(function, series: _HistogramSeries, errors: _CounterSeries):
+    def timed(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            series.observe(perf_counter() - start)
+    timed.__wrapped__ = function
+    return timed
+
+def instrument_storage(storage, registry: Registry = REGISTRY) -> None:
+    """Time every StorageEngine call in STORAGE_OPERATIONS and count the connections it opens.
+
+    The engine is instrumented in place by shadowing its methods on the instance,
+    so engines that are not instrumented pay nothing.
+    """
+    seconds = registry.histogram("expense_storage_operation_seconds", "Time spent in StorageEngine calls", ("operation",))
+    errors = registry.counter("expense_storage_errors_total", "StorageEngine calls that raised", ("operation",))
+    for name in STORAGE_OPERATIONS:
+        setattr(storage, name, _timed(getattr(storage, name), seconds.labels(name), errors.labels(name)))
+
+    opened = registry.counter("expense_storage_connections_opened_total", "SQLite connections opened").labels()
+    connect = storage._connect
+    def counted_connect():
+        opened.inc()
+        return connect()
+    storage._connect = counted_connect
+    registry.gauge("expense_storage_connections", "Open pooled SQLite connections", lambda: storage.connection_count)
+    registry.gauge("expense_storage_write_transactions", "Write transactions committed since startup", lambda: storage.generation)
+
+def register_ledger_gauges(manager, registry: Registry = REGISTRY) -> None:
+    """Ledger size and process memory, read when scraped (in sql mode the size is a SQLite query)"""
+    registry.gauge("expense_ledger_expenses", "Expenses in the ledger", lambda: manager.expense_count)
+    registry.gauge("expense_process_resident_memory_bytes", "Resident memory of the process", resident_memory_bytes)
@@ -0,0 +1,47 @@
+"""Keyset pagination shared by the SQL and in-memory listing paths"""
+
+import base64
+import binascii
+import json
+from expense import Expense
+from exceptions import InvalidCursorError
+
+# Listing orders and search orders, each mapped to the number of values in its cursor key
+ORDERS = {"id": 1, "date": 2}
+SEARCH_ORDERS = {"rank": 2, "recent": 1}
+
+def validate_order(order: str, orders: dict[str, int] = ORDERS) -> None:
+    if order not in orders:
+        raise InvalidCursorError(f"Order must be one of {', '.join(orders)}. Got {order} instead")
+
+def order_key(expense: Expense, order: str) -> tuple:
+    """Sort key of an expense; also the position a cursor points at"""
+    if order == "date":
+        return (expense.date.isoformat(), expense.id)
+    return (expense.id,)
+
+def encode_cursor(key: tuple, order: str) -> str:
+    raw = json.dumps([order, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str | None, order: str, orders: dict[str, int] = ORDERS) -> tuple | None:
+    """Return the key the page should start after, or None for the first page"""
+    validate_order(order, orders)
+    if cursor is None:
+        return None
+    try:
+        cursor_order, *key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursorError("Cursor is malformed")
+    if cursor_order != order:
+        raise InvalidCursorError(f"Cursor was issued for order={cursor_order}, not order={order}")
+    if len(key) != orders[order]:
+        raise InvalidCursorError("Cursor is malformed")
+    return tuple(key)
+
+def build_page(expenses: list[Expense], limit: int, order: str) -> tuple[list[Expense], str | None]:
+    """Trim a `limit + 1` lookahead fetch to a page and its next cursor"""
+    if len(expenses) <= limit:
+        return expenses, None
+    page = expenses[:limit]
+    return page, encode_cursor(order_key(page[-1], order), order)
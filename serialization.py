@@ -0,0 +1,23 @@
+"""JSON encoding to bytes, using orjson when it is installed"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(value) -> bytes:
+    """Compact UTF-8 JSON; dates are written as ISO strings"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+def _default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def join_array(items) -> bytes:
+    """Encode a JSON array from already-encoded items"""
+    return b"[" + b",".join(items) + b"]"
@@ -0,0 +1,140 @@
+"""Binary ledger snapshots for fast cold starts in "memory" and "columnar" mode
+
+File layout (little-endian):
+    header        magic, format version, ledger_id, write_seq, row count,
+                  description bytes, string table bytes
+    columns       ColumnarLedger.BUFFER_COLUMNS as fixed-width arrays, row by row
+    descriptions  UTF-8 description bytes the offset/length columns point into
+    string table  JSON: category names and per-category [total, count]
+
+The header's (ledger_id, write_seq) must equal StorageEngine.ledger_stamp() for the
+snapshot to be used; any write to the expenses table bumps write_seq. Loading maps
+the file and copies each column out with a single memcpy, with no per-row parsing
+or validation. The copy is deliberate: ColumnarLedger edits, inserts into and
+deletes from its arrays in place, which a read-only mapping cannot back.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from expense_manager import ColumnarLedger
+from storage import StorageEngine
+
+MAGIC = b"EXPSNAP\x00"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sI4xqqqqq")
+COLUMN_TYPECODES = ("q", "d", "Q", "i", "I", "B")
+
+logger = logging.getLogger(__name__)
+
+def _read_header(mapped) -> tuple | None:
+    if len(mapped) < HEADER.size:
+        return None
+    magic, version, *fields = HEADER.unpack_from(mapped)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    return tuple(fields)
+
+def snapshot_stamp(path: str) -> tuple[int, int] | None:
+    """(ledger_id, write_seq) recorded in a snapshot file, or None if there is no readable snapshot"""
+    try:
+        with open(path, "rb") as file:
+            header = _read_header(file.read(HEADER.size))
+    except OSError:
+        return None
+    return None if header is None else header[:2]
+
+def write_snapshot(storage: StorageEngine, path: str) -> None:
+    """Write a snapshot of the current ledger, atomically replacing any previous one"""
+    with storage.read_snapshot_source() as (stamp, totals, rows):
+        ledger = ColumnarLedger.from_rows(rows, ordinal_dates=True)
+    category_names, columns, descriptions = ledger.to_buffers()
+    table = json.dumps({
+        "categories": category_names,
+        "totals": [[category, total, count] for category, total, count in totals],
+    }).encode()
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, *stamp, len(ledger), len(descriptions), len(table)))
+        for column in columns:
+            if sys.byteorder == "big":
+                column = array(column.typecode, column)
+                column.byteswap()
+            column.tofile(file)
+        file.write(descriptions)
+        file.write(table)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+def load_snapshot(storage: StorageEngine, path: str) -> tuple[ColumnarLedger, list[tuple]] | None:
+    """Return (ledger, category totals) from a current snapshot, or None if it is missing or stale"""
+    try:
+        file = open(path, "rb")
+    except OSError:
+        return None
+    with file:
+        if os.fstat(file.fileno()).st_size < HEADER.size:
+            return None
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            header = _read_header(mapped)
+            if header is None or header[:2] != storage.ledger_stamp():
+                return None
+            _, _, rows, description_bytes, table_bytes = header
+            columns = [array(typecode) for typecode in COLUMN_TYPECODES]
+            expected = HEADER.size + sum(column.itemsize for column in columns) * rows + description_bytes + table_bytes
+            if len(mapped) != expected:
+                return None
+            with memoryview(mapped) as view:
+                offset = HEADER.size
+                for column in columns:
+                    size = column.itemsize * rows
+                    column.frombytes(view[offset:offset + size])
+                    if sys.byteorder == "big":
+                        column.byteswap()
+                    offset += size
+                descriptions = bytearray(view[offset:offset + description_bytes])
+                table = json.loads(bytes(view[offset + description_bytes:]))
+    ledger = ColumnarLedger.from_buffers(table["categories"], columns, descriptions)
+    return ledger, [tuple(entry) for entry in table["totals"]]
+
+def refresh_snapshot(storage: StorageEngine, path: str) -> bool:
+    """Rewrite the snapshot if it no longer matches the database; return whether it was written"""
+    if snapshot_stamp(path) == storage.ledger_stamp():
+        return False
+    write_snapshot(storage, path)
+    return True
+
+class SnapshotWriter:
+    """Keeps a snapshot current in the background.
+
+    Every `settle_seconds` it checks the storage engine's write generation; once a
+    full interval passes without a new write, a stale snapshot is rewritten.
+    """
+    def __init__(self, storage: StorageEngine, path: str, settle_seconds: float = 2.0) -> None:
+        self._storage = storage
+        self._path = path
+        self._settle_seconds = settle_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="expense-snapshot", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        previous = None
+        while not self._stop.wait(self._settle_seconds):
+            current = self._storage.generation
+            if current == previous:
+                try:
+                    refresh_snapshot(self._storage, self._path)
+                except Exception:
+                    logger.exception("Failed to write ledger snapshot to %s", self._path)
+            previous = current
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
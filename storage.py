@@ -1,96 +1,1064 @@
 # Persistence Layer
 from expense import Expense, ExpenseDraft
+import gc
+import logging
+import queue
+import re
 import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import date as Date
+from exceptions import (
+    ChangeLogExpiredError,
+    CorruptedDataError,
+    InvalidCategoryError,
+    InvalidExpenseDataError,
+    InvalidExpenseDescriptionError,
+    InvalidExpenseIdError,
+    InvalidSearchQueryError,
+)
+from pagination import SEARCH_ORDERS, build_page, decode_cursor, encode_cursor
 
-def create_table(filepath):
-    conn = sqlite3.connect(filepath)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS expenses(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        amount REAL NOT NULL,
-        category TEXT NOT NULL,
-        description TEXT NOT NULL,
-        date TEXT NOT NULL
-        )
-    ''')
-    conn.commit()
-    conn.close()
+logger = logging.getLogger(__name__)
 
-def insert_expense(filepath: str, expense: ExpenseDraft) -> Expense:
-    conn = sqlite3.connect(filepath)
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
-            INSERT INTO expenses(amount, category, description, date)
-            VALUES(?, ?, ?, ?)
-        ''',
-        (expense.amount, expense.category, expense.description, expense.date )
-        )
-        new_id = cursor.lastrowid
-        conn.commit()
-        if new_id is None:
-            raise RuntimeError(f"Failed to insert expense")
-        return Expense(new_id, expense.amount, expense.category, expense.description, expense.date)
-    except sqlite3.Error as e:
-        raise RuntimeError(f"Failed to insert expense: {e}") from e
-    finally:
-        conn.close()
+# Applied to every pooled connection. WAL lets readers run alongside the writer; the
+# engine's `synchronous` setting (NORMAL by default) decides whether every commit fsyncs.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+)
+
+EXPENSE_COLUMNS = "id, amount, category, description, date"
+UPDATABLE_COLUMNS = ("amount", "category", "description", "date")
+
+# Optional date partitioning: rows live in one expenses_<key> table per period, keyed by
+# the leading characters of their ISO date ('2025' by year, '2025_03' by month), and
+# `expenses` becomes a UNION ALL view over them. Values are the length of the key.
+PARTITION_WIDTHS = {"year": 4, "month": 7}
+
+def _partition_table(key: str) -> str:
+    return "expenses_" + key.replace("-", "_")
+
+# Rollup period keys as SQL over a date expression: months are 'YYYY-MM' and
+# weeks are keyed by the date of their (ISO) Monday
+ROLLUP_PERIODS = {
+    "month": "substr({date}, 1, 7)",
+    "week": "date({date}, 'weekday 0', '-6 days')",
+}
+
+def _rollup_match(row: str) -> str:
+    periods = " OR ".join(
+        f"(granularity = '{granularity}' AND period = {period.format(date=f'{row}.date')})"
+        for granularity, period in ROLLUP_PERIODS.items()
+    )
+    return f"category = {row}.category AND ({periods})"
+
+def _rollup_add(row: str) -> str:
+    values = ", ".join(
+        f"('{granularity}', {period.format(date=f'{row}.date')}, {row}.category, {row}.amount, 1)"
+        for granularity, period in ROLLUP_PERIODS.items()
+    )
+    return f'''
+        INSERT INTO expense_rollups(granularity, period, category, total, count) VALUES {values}
+        ON CONFLICT(granularity, period, category)
+        DO UPDATE SET total = total + excluded.total, count = count + excluded.count;'''
+
+def _rollup_remove(row: str) -> str:
+    return f'''
+        UPDATE expense_rollups SET total = total - {row}.amount, count = count - 1 WHERE {_rollup_match(row)};
+        DELETE FROM expense_rollups WHERE count = 0 AND {_rollup_match(row)};'''
+
+# Keep expense_rollups in step with expenses inside the same transaction as every write.
+# The trigger templates below take the table they watch: expenses, or each partition of it.
+ROLLUP_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS {{table}}_rollup_insert AFTER INSERT ON {{table}} BEGIN {_rollup_add('NEW')} END",
+    f"CREATE TRIGGER IF NOT EXISTS {{table}}_rollup_delete AFTER DELETE ON {{table}} BEGIN {_rollup_remove('OLD')} END",
+    f"""CREATE TRIGGER IF NOT EXISTS {{table}}_rollup_update AFTER UPDATE OF amount, category, date ON {{table}}
+        BEGIN {_rollup_remove('OLD')} {_rollup_add('NEW')} END""",
+)
+
+# Persistent change counter for files derived from the ledger (snapshots). Unlike
+# PRAGMA data_version it survives restarts; ledger_id tells recreated databases apart.
+WRITE_SEQ_TRIGGERS = tuple(
+    f"""CREATE TRIGGER IF NOT EXISTS {{table}}_write_seq_{event.lower()} AFTER {event} ON {{table}}
+        BEGIN UPDATE ledger_meta SET value = value + 1 WHERE key = 'write_seq'; END"""
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
 
-def load_expenses(filepath: str) -> list[Expense]:
-    conn = sqlite3.connect(filepath)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+# Append-only log of changed expense ids, written in the same transaction as the change.
+# API workers read it to apply writes committed by other processes, and clients to sync
+# incrementally; AUTOINCREMENT keeps sequence numbers from ever being reused.
+# compact_changes() drops old entries that no longer tell a reader anything new.
+CHANGE_LOG_TRIGGERS = tuple(
+    f"""CREATE TRIGGER IF NOT EXISTS {{table}}_change_log_{event.lower()} AFTER {event} ON {{table}}
+        BEGIN INSERT INTO expense_changes(expense_id) VALUES ({row}.id); END"""
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+)
+
+# Full-text index over descriptions. External content: the text is stored only in
+# expenses and triggers keep the index in step. The prefix indexes serve the
+# prefix queries search_expenses issues without scanning the term list.
+FTS_TABLE = """CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(
+    description, content = 'expenses', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+)"""
+_FTS_INSERT = "INSERT INTO expenses_fts(rowid, description) VALUES (NEW.id, NEW.description);"
+_FTS_DELETE = "INSERT INTO expenses_fts(expenses_fts, rowid, description) VALUES ('delete', OLD.id, OLD.description);"
+FTS_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS {{table}}_fts_insert AFTER INSERT ON {{table}} BEGIN {_FTS_INSERT} END",
+    f"CREATE TRIGGER IF NOT EXISTS {{table}}_fts_delete AFTER DELETE ON {{table}} BEGIN {_FTS_DELETE} END",
+    f"CREATE TRIGGER IF NOT EXISTS {{table}}_fts_update AFTER UPDATE OF description ON {{table}} BEGIN {_FTS_DELETE} {_FTS_INSERT} END",
+)
+
+def _expense_triggers(table: str) -> list[str]:
+    return [
+        trigger.format(table=table)
+        for trigger in (*ROLLUP_TRIGGERS, *FTS_TRIGGERS, *WRITE_SEQ_TRIGGERS, *CHANGE_LOG_TRIGGERS)
+    ]
+
+def fts_match(query: str) -> str:
+    """FTS5 expression for a free-text query: every word must appear, the last one as a prefix
+    so partially typed input matches, e.g. 'airport ub' -> '"airport" "ub"*'.
+
+    Only the last word is a prefix term: FTS5 merges the doclists of every token a prefix
+    covers, so prefixes on every word would slow down common queries for little gain.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        raise InvalidSearchQueryError("Search query must contain at least one word")
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+# date.toordinal() computed in SQL: julianday('0001-01-01') is 1721425.5
+ORDINAL_DATE = "CAST(julianday(date) - 1721424.5 AS INTEGER)"
+
+def _row_to_expense(row: tuple) -> Expense:
+    return Expense.trusted(row[0], row[1], row[2], row[3], Date.fromisoformat(row[4]))
+
+def _rows_to_expenses(rows: Iterable[tuple], verify: bool = False) -> list[Expense]:
+    """Hydrate (id, amount, category, description, date) rows.
+
+    Rows were validated before they were written, so they skip Expense validation
+    unless `verify` is set. Each distinct date string is parsed once and the Date
+    shared between rows.
+    """
+    build = Expense if verify else Expense.trusted
+    dates: dict[str, Date] = {}
+    expenses = []
+    append = expenses.append
+    for expense_id, amount, category, description, day in rows:
+        try:
+            date = dates.get(day)
+            if date is None:
+                date = dates[day] = Date.fromisoformat(day)
+            append(build(expense_id, amount, category, description, date))
+        except (ValueError, InvalidExpenseIdError, InvalidExpenseDataError, InvalidCategoryError, InvalidExpenseDescriptionError) as e:
+            raise CorruptedDataError(f"Stored expense #{expense_id} is invalid: {e}") from e
+    return expenses
+
+def _last_change_seq(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'expense_changes'").fetchone()
+    return row[0] if row is not None else 0
+
+@contextmanager
+def _gc_paused():
+    """Suspend cyclic GC while a bulk load allocates millions of acyclic objects, which
+    would otherwise set off repeated full collections that find nothing to free"""
+    enabled = gc.isenabled()
+    gc.disable()
     try:
-        cursor.execute('SELECT * FROM expenses')
-        rows = cursor.fetchall()
-        expense_list = []
-        for row in rows:
-            expense_list.append(Expense(
-                row["id"],
-                row["amount"],
-                row["category"],
-                row["description"],
-                Date.fromisoformat(row["date"])
-            ))
-        return expense_list
-
-    except sqlite3.Error as e:
-        raise RuntimeError(f"Failed to load from database: {e}") from e
+        yield
     finally:
-        conn.close()
-
-def delete_expense(filepath, expense_id):
-    conn = sqlite3.connect(filepath)
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
-    conn.commit()
-    conn.close()
-
-def update_expense_amount(filepath, expense_id, new_value):
-    conn = sqlite3.connect(filepath)
-    cursor = conn.cursor()
-    cursor.execute('UPDATE expenses SET amount = ? WHERE id = ?', (new_value, expense_id))
-    conn.commit()
-    conn.close()
-
-def update_expense_category(filepath, expense_id, new_value):
-    conn = sqlite3.connect(filepath)
-    cursor = conn.cursor()
-    cursor.execute('UPDATE expenses SET category = ? WHERE id = ?', (new_value, expense_id))
-    conn.commit()
-    conn.close()
-
-def update_expense_description(filepath, expense_id, new_value):
-    conn = sqlite3.connect(filepath)
-    cursor = conn.cursor()
-    cursor.execute('UPDATE expenses SET description = ? WHERE id = ?', (new_value, expense_id))
-    conn.commit()
-    conn.close()
-
-def update_expense_date(filepath, expense_id, new_value):
-    conn = sqlite3.connect(filepath)
-    cursor = conn.cursor()
-    cursor.execute('UPDATE expenses SET date = ? WHERE id = ?',(new_value, expense_id))
-    conn.commit()
-    conn.close()
\ No newline at end of file
+        if enabled:
+            gc.enable()
+
+class StorageEngine:
+    """Owns the SQLite connections for one database file.
+
+    Connections are long-lived and pooled one per thread, so each thread reuses its
+    own connection (and its prepared statement cache) instead of reconnecting per call.
+    `synchronous` is NORMAL (fsync at WAL checkpoints) or FULL (fsync on every commit).
+    """
+    def __init__(
+        self,
+        filepath: str,
+        busy_timeout: float = 5.0,
+        cached_statements: int = 256,
+        synchronous: str = "NORMAL",
+        partition_by: str | None = None
+    ) -> None:
+        if synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Unknown synchronous mode: {synchronous}")
+        if partition_by is not None and partition_by not in PARTITION_WIDTHS:
+            raise ValueError(f"partition_by must be one of {', '.join(PARTITION_WIDTHS)}. Got {partition_by} instead")
+        self._partition_by = partition_by
+        self._filepath = filepath
+        self._synchronous = synchronous
+        self._busy_timeout = busy_timeout
+        self._cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._generation = 0
+        # Change-log ranges (first, last] committed through this engine, once follow_changes() is on
+        self._following = False
+        self._own_changes: list[tuple[int, int]] = []
+        self._follow_lock = threading.Lock()
+        # Partition key width read from the database (0 when unpartitioned), and partitions known to exist
+        self._width: int | None = None
+        self._partitions: set[str] = set()
+
+    @property
+    def filepath(self) -> str:
+        return self._filepath
+
+    @property
+    def generation(self) -> int:
+        """Number of write transactions committed through this engine; lets readers cache until the next write"""
+        return self._generation
+
+    @property
+    def connection_count(self) -> int:
+        """Number of pooled connections currently open"""
+        return len(self._connections)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._filepath,
+            timeout=self._busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self._cached_statements,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.execute(f"PRAGMA synchronous = {self._synchronous}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        # Partitions this transaction creates; they are only cached once it commits
+        self._local.new_partitions = []
+        following = self._following
+        try:
+            first = _last_change_seq(conn) if following else 0
+            yield conn
+            last = _last_change_seq(conn) if following else 0
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if following:
+            # Recorded under the lock foreign_changes() takes after opening its read
+            # snapshot, so a commit it can see is never mistaken for a foreign one
+            with self._follow_lock:
+                conn.execute("COMMIT")
+                if last != first:
+                    self._own_changes.append((first, last))
+        else:
+            conn.execute("COMMIT")
+        self._partitions.update(self._local.new_partitions)
+        with self._lock:
+            self._generation += 1
+
+    def close(self) -> None:
+        """Close every pooled connection"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def create_table(self) -> None:
+        """Create the schema, or bring an existing database up to date.
+
+        With `partition_by` set, an unpartitioned ledger is split into partitions here,
+        once. A partitioned database keeps its layout when `partition_by` is None;
+        asking for a different period raises ValueError.
+        """
+        if self._partition_by is not None:
+            self._enable_incremental_vacuum()
+        with self._transaction() as conn:
+            partitioned = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = 'expenses'"
+            ).fetchone()
+            if not partitioned:
+                self._create_expense_table(conn, "expenses")
+            rollups_exist = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expense_rollups'"
+            ).fetchone()
+            conn.execute('''CREATE TABLE IF NOT EXISTS expense_rollups(
+                granularity TEXT NOT NULL,
+                period TEXT NOT NULL,
+                category TEXT NOT NULL,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (granularity, period, category)
+                ) WITHOUT ROWID
+            ''')
+            if not rollups_exist:
+                self._rebuild_rollups(conn)
+            fts_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expenses_fts'"
+            ).fetchone()
+            conn.execute(FTS_TABLE)
+            if not fts_exists:
+                conn.execute("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')")
+            conn.execute('''CREATE TABLE IF NOT EXISTS ledger_meta(
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            # changes_horizon: newest change-log entry compaction dropped; changes_swept: how far it has looked.
+            # A partitioned ledger hands out ids from last_expense_id, since its tables cannot share an AUTOINCREMENT.
+            conn.execute('''INSERT OR IGNORE INTO ledger_meta(key, value) VALUES
+                ('ledger_id', random()), ('write_seq', 0), ('changes_horizon', 0), ('changes_swept', 0),
+                ('partition_width', 0), ('last_expense_id', 0)''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS expense_changes(
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                expense_id INTEGER NOT NULL
+                )
+            ''')
+            # Lets compaction find the other entries for the same expense
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_expense_changes_expense ON expense_changes(expense_id)')
+
+            width = conn.execute("SELECT value FROM ledger_meta WHERE key = 'partition_width'").fetchone()[0]
+            requested = PARTITION_WIDTHS[self._partition_by] if self._partition_by is not None else width
+            if width and requested != width:
+                period = next(name for name, size in PARTITION_WIDTHS.items() if size == width)
+                raise ValueError(f"Database is already partitioned by {period}")
+            if requested and not width:
+                self._split_into_partitions(conn, requested)
+            for table in self._partition_tables(conn) if requested else ["expenses"]:
+                for trigger in _expense_triggers(table):
+                    conn.execute(trigger)
+        self._width = requested
+
+    @staticmethod
+    def _create_expense_table(conn: sqlite3.Connection, table: str, schema: str = "main") -> None:
+        # Partitions take their ids from ledger_meta, so only a whole ledger uses AUTOINCREMENT
+        key = "INTEGER PRIMARY KEY AUTOINCREMENT" if table == "expenses" else "INTEGER PRIMARY KEY"
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS {schema}.{table}(
+            id {key},
+            amount REAL NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT NOT NULL,
+            date TEXT NOT NULL
+            )
+        ''')
+        # Keyset pagination by date walks this index; it implicitly ends in id (the rowid)
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_date ON {table}(date)')
+        # Serves category-filtered pages in date order (page_expenses with order="date")
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_category_date ON {table}(category, date)')
+
+    def _enable_incremental_vacuum(self) -> None:
+        # Only possible while the file has no tables yet, where VACUUM applies it at once.
+        # It lets compact_partition() give the pages it frees back to the filesystem.
+        conn = self.connection()
+        if not conn.execute("SELECT 1 FROM sqlite_master").fetchone():
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+
+    @staticmethod
+    def _partition_tables(conn: sqlite3.Connection, first: str = "") -> list[str]:
+        """Partition tables in date order, optionally only those from partition key `first` on"""
+        return [name for name, in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB 'expenses_[0-9]*' AND name >= ? ORDER BY name",
+            (_partition_table(first),)
+        )]
+
+    @staticmethod
+    def _create_view(conn: sqlite3.Connection) -> None:
+        conn.execute("DROP VIEW IF EXISTS expenses")
+        conn.execute("CREATE VIEW expenses AS " + " UNION ALL ".join(
+            f"SELECT {EXPENSE_COLUMNS} FROM {table}" for table in StorageEngine._partition_tables(conn)
+        ))
+
+    def _split_into_partitions(self, conn: sqlite3.Connection, width: int) -> None:
+        # Rows are copied before the partitions have triggers and DROP TABLE fires none,
+        # so rollups, the search index and the change log carry over untouched
+        last_id = conn.execute(
+            "SELECT coalesce((SELECT seq FROM sqlite_sequence WHERE name = 'expenses'), 0)"
+        ).fetchone()[0]
+        keys = {key for key, in conn.execute("SELECT DISTINCT substr(date, 1, ?) FROM expenses", (width,))}
+        keys.add(Date.today().isoformat()[:width])
+        for key in sorted(keys):
+            table = _partition_table(key)
+            self._create_expense_table(conn, table)
+            conn.execute(f"INSERT INTO {table} SELECT {EXPENSE_COLUMNS} FROM expenses WHERE date GLOB ?", (f"{key}*",))
+        conn.execute("DROP TABLE expenses")
+        conn.execute("UPDATE ledger_meta SET value = ? WHERE key = 'partition_width'", (width,))
+        conn.execute("UPDATE ledger_meta SET value = ? WHERE key = 'last_expense_id'", (last_id,))
+        self._create_view(conn)
+
+    def _partition_width(self, conn: sqlite3.Connection) -> int:
+        if self._width is None:
+            row = conn.execute("SELECT value FROM ledger_meta WHERE key = 'partition_width'").fetchone()
+            self._width = row[0] if row is not None else 0
+        return self._width
+
+    def _partition(self, conn: sqlite3.Connection, key: str) -> str:
+        """Table of partition `key`, created inside the caller's write transaction if it is new"""
+        table = _partition_table(key)
+        if key not in self._partitions and key not in self._local.new_partitions:
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+            if exists:
+                self._partitions.add(key)
+            else:
+                self._create_expense_table(conn, table)
+                for trigger in _expense_triggers(table):
+                    conn.execute(trigger)
+                self._create_view(conn)
+                # A rollback drops the table again, so _transaction caches the key only on commit
+                self._local.new_partitions.append(key)
+        return table
+
+    def _table_of(self, conn: sqlite3.Connection, expense_id: int) -> str | None:
+        """Table holding `expense_id`; None if a partitioned ledger has no such expense"""
+        width = self._partition_width(conn)
+        if not width:
+            return "expenses"
+        row = conn.execute("SELECT date FROM expenses WHERE id = ?", (expense_id,)).fetchone()
+        return self._partition(conn, row[0][:width]) if row is not None else None
+
+    def _insert(self, conn: sqlite3.Connection, rows: list[tuple]) -> int:
+        """Insert (amount, category, description, iso_date) rows and return the last id; the rows get consecutive ids"""
+        width = self._partition_width(conn)
+        if not width:
+            conn.executemany('''
+                INSERT INTO expenses(amount, category, description, date)
+                VALUES(?, ?, ?, ?)
+            ''', rows)
+            # The write lock is held for the whole transaction, so the batch got consecutive IDs
+            return conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        last_id = conn.execute(
+            "UPDATE ledger_meta SET value = value + ? WHERE key = 'last_expense_id' RETURNING value", (len(rows),)
+        ).fetchone()[0]
+        partitions: dict[str, list[tuple]] = {}
+        for expense_id, row in enumerate(rows, last_id - len(rows) + 1):
+            partitions.setdefault(row[3][:width], []).append((expense_id, *row))
+        for key, batch in partitions.items():
+            conn.executemany(f'INSERT INTO {self._partition(conn, key)}({EXPENSE_COLUMNS}) VALUES(?, ?, ?, ?, ?)', batch)
+        return last_id
+
+    def _rebuild_rollups(self, conn: sqlite3.Connection) -> None:
+        conn.execute('DELETE FROM expense_rollups')
+        for granularity, period in ROLLUP_PERIODS.items():
+            conn.execute(f'''
+                INSERT INTO expense_rollups(granularity, period, category, total, count)
+                SELECT ?, {period.format(date='date')}, category, sum(amount), count(*)
+                FROM expenses GROUP BY 2, 3
+            ''', (granularity,))
+
+    def rebuild_rollups(self) -> None:
+        """Recompute expense_rollups from scratch, e.g. after editing the database by hand"""
+        with self._transaction() as conn:
+            self._rebuild_rollups(conn)
+
+    def insert_expense(self, expense: ExpenseDraft) -> Expense:
+        try:
+            with self._transaction() as conn:
+                new_id = self._insert(conn, [(expense.amount, expense.category, expense.description, expense.date.isoformat())])
+            return Expense.trusted(new_id, expense.amount, expense.category, expense.description, expense.date)
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to insert expense: {e}") from e
+
+    def insert_expenses(self, expenses: list[ExpenseDraft]) -> list[Expense]:
+        """Insert a batch with one executemany in a single transaction; all rows commit or none do"""
+        if not expenses:
+            return []
+        try:
+            with self._transaction() as conn:
+                last_id = self._insert(conn, [
+                    (draft.amount, draft.category, draft.description, draft.date.isoformat()) for draft in expenses
+                ])
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to insert expenses: {e}") from e
+        first_id = last_id - len(expenses) + 1
+        return [
+            Expense.trusted(first_id + offset, draft.amount, draft.category, draft.description, draft.date)
+            for offset, draft in enumerate(expenses)
+        ]
+
+    def insert_rows(self, rows: list[tuple]) -> range:
+        """Insert pre-validated (amount, category, description, iso_date) rows in one transaction.
+
+        Returns the range of IDs the rows received, in order. Used by bulk imports
+        that validated their rows elsewhere and need no Expense objects back.
+        """
+        if not rows:
+            return range(0)
+        try:
+            with self._transaction() as conn:
+                last_id = self._insert(conn, rows)
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to insert expenses: {e}") from e
+        return range(last_id - len(rows) + 1, last_id + 1)
+
+    def load_expenses(self, verify: bool = False) -> list[Expense]:
+        """Every stored expense. `verify` re-runs full Expense validation on each row, for audits;
+        a row that fails it raises CorruptedDataError."""
+        try:
+            with _gc_paused():
+                return _rows_to_expenses(self.connection().execute(f'SELECT {EXPENSE_COLUMNS} FROM expenses ORDER BY id'), verify)
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+
+    def load_expense(self, expense_id: int) -> Expense | None:
+        try:
+            row = self.connection().execute(
+                f'SELECT {EXPENSE_COLUMNS} FROM expenses WHERE id = ?', (expense_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+        return _row_to_expense(row) if row is not None else None
+
+    def data_version(self) -> int:
+        """PRAGMA data_version of the calling thread's connection: it changes whenever
+        any other connection, in this process or another one, commits to the database"""
+        try:
+            return self.connection().execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+
+    def change_seq(self) -> int:
+        """Sequence number of the newest change-log entry"""
+        try:
+            return _last_change_seq(self.connection())
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+
+    def follow_changes(self) -> int:
+        """Start recording the change-log entries this engine writes, so foreign_changes()
+        can skip them; return the current end of the log to sync from"""
+        with self._follow_lock:
+            self._following = True
+        return self.change_seq()
+
+    @staticmethod
+    def _check_horizon(conn: sqlite3.Connection, since: int) -> None:
+        horizon = conn.execute("SELECT value FROM ledger_meta WHERE key = 'changes_horizon'").fetchone()[0]
+        if since < horizon:
+            raise ChangeLogExpiredError(f"Change log was compacted past #{since}; entries up to #{horizon} are gone")
+
+    @staticmethod
+    def _load_by_ids(conn: sqlite3.Connection, ids: Iterable[int]) -> dict[int, Expense]:
+        ids = sorted(ids)
+        expenses = {}
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            rows = conn.execute(f"SELECT {EXPENSE_COLUMNS} FROM expenses WHERE id IN ({', '.join('?' * len(batch))})", batch)
+            expenses.update((expense.id, expense) for expense in _rows_to_expenses(rows))
+        return expenses
+
+    def foreign_changes(self, since: int) -> tuple[int, dict[int, Expense | None]]:
+        """Expenses other engines (e.g. other API worker processes) changed after log entry `since`.
+
+        Returns the new end of the log and the current state of each changed expense,
+        None for deleted ones. Entries written through this engine since follow_changes()
+        are skipped, so a worker never reloads its own writes. Raises ChangeLogExpiredError
+        if compaction has dropped entries after `since`.
+        """
+        conn = self.connection()
+        try:
+            conn.execute("BEGIN")
+            try:
+                self._check_horizon(conn, since)
+                latest = _last_change_seq(conn)
+                with self._follow_lock:
+                    own = [(first, last) for first, last in self._own_changes if last > since]
+                    self._own_changes = [(first, last) for first, last in own if last > latest]
+                # Only the gaps between this engine's own ranges are read
+                ids = set()
+                low = since
+                for first, last in [*own, (latest, latest)]:
+                    if first > low:
+                        ids.update(expense_id for expense_id, in conn.execute(
+                            "SELECT expense_id FROM expense_changes WHERE seq > ? AND seq <= ?", (low, first)))
+                    low = max(low, last)
+                changed: dict[int, Expense | None] = dict.fromkeys(ids)
+                changed.update(self._load_by_ids(conn, ids))
+            finally:
+                conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+        return latest, changed
+
+    def read_changes(
+        self,
+        since: int,
+        limit: int,
+        after_id: int | None = None
+    ) -> tuple[list[tuple[int, int, Expense | None]], int, int | None]:
+        """Up to `limit` changes after change-log position `since`, as (seq, expense id, current expense or None).
+
+        Returns the changes, the position to continue from and, while a full resync is
+        in progress, the id to resume it after. An expense changed several times in the
+        window appears once, at its latest seq.
+
+        `since` 0 starts a full resync: every stored expense is returned in id order,
+        page by page (pass `after_id` back), all stamped with the log position taken
+        on the first page, which the log is then followed from. Raises
+        ChangeLogExpiredError when compaction has dropped entries after `since`.
+        """
+        conn = self.connection()
+        try:
+            conn.execute("BEGIN")
+            try:
+                if since == 0 and after_id is None:
+                    since, after_id = _last_change_seq(conn), 0
+                self._check_horizon(conn, since)
+                if after_id is not None:
+                    expenses = _rows_to_expenses(conn.execute(
+                        f"SELECT {EXPENSE_COLUMNS} FROM expenses WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit + 1)))
+                    next_after_id = expenses[limit - 1].id if len(expenses) > limit else None
+                    return [(since, expense.id, expense) for expense in expenses[:limit]], since, next_after_id
+                entries = conn.execute(
+                    "SELECT seq, expense_id FROM expense_changes WHERE seq > ? ORDER BY seq LIMIT ?", (since, limit)
+                ).fetchall()
+                latest = dict((expense_id, seq) for seq, expense_id in entries)
+                expenses = self._load_by_ids(conn, latest)
+            finally:
+                conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+        changes = sorted((seq, expense_id, expenses.get(expense_id)) for expense_id, seq in latest.items())
+        return changes, entries[-1][0] if entries else since, None
+
+    def compact_changes(self, retain: int) -> int:
+        """Drop change-log entries older than the newest `retain` that are tombstones or
+        superseded by a later entry for the same expense; return how many were dropped.
+
+        Readers positioned before the newest dropped entry (the horizon) get
+        ChangeLogExpiredError and must resync in full. Each run only looks at entries
+        that crossed the retention cutoff or were superseded since the last one.
+        """
+        try:
+            with self._transaction() as conn:
+                cutoff = _last_change_seq(conn) - retain
+                swept = conn.execute("SELECT value FROM ledger_meta WHERE key = 'changes_swept'").fetchone()[0]
+                if cutoff <= 0:
+                    return 0
+                dropped = [seq for seq, in conn.execute('''
+                    DELETE FROM expense_changes WHERE seq <= ? AND expense_id IN (
+                        SELECT expense_id FROM expense_changes WHERE seq > ?)
+                    RETURNING seq''', (min(swept, cutoff), swept))]
+                if cutoff > swept:
+                    dropped += [seq for seq, in conn.execute('''
+                        DELETE FROM expense_changes AS entry WHERE entry.seq > ? AND entry.seq <= ? AND (
+                            NOT EXISTS (SELECT 1 FROM expenses WHERE id = entry.expense_id)
+                            OR EXISTS (SELECT 1 FROM expense_changes AS later
+                                       WHERE later.expense_id = entry.expense_id AND later.seq > entry.seq))
+                        RETURNING seq''', (swept, cutoff))]
+                    conn.execute("UPDATE ledger_meta SET value = ? WHERE key = 'changes_swept'", (cutoff,))
+                if dropped:
+                    conn.execute("UPDATE ledger_meta SET value = max(value, ?) WHERE key = 'changes_horizon'", (max(dropped),))
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to compact change log: {e}") from e
+        return len(dropped)
+
+    def iter_expense_rows(self, batch_size: int = 1000) -> Iterator[tuple]:
+        """Yield raw (id, amount, category, description, date) rows in id order, batch by batch.
+
+        Uses its own connection rather than the thread's pooled one: a streaming response
+        may resume the generator on a different thread, and the open read transaction
+        gives the whole export one consistent snapshot.
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.execute(f'SELECT {EXPENSE_COLUMNS} FROM expenses ORDER BY id')
+            while rows := cursor.fetchmany(batch_size):
+                yield from rows
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+        finally:
+            conn.close()
+
+    def iter_analytics_rows(self, batch_size: int = 10000) -> Iterator[tuple]:
+        """Yield (amount, category, days since 1970-01-01) for every expense"""
+        try:
+            cursor = self.connection().execute(
+                "SELECT amount, category, CAST(julianday(date) - 2440587.5 AS INTEGER) FROM expenses"
+            )
+            while rows := cursor.fetchmany(batch_size):
+                yield from rows
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+
+    def ledger_stamp(self, conn: sqlite3.Connection | None = None) -> tuple[int, int]:
+        """(ledger_id, write_seq): changes whenever any expense row is inserted, updated or deleted"""
+        try:
+            values = dict((conn or self.connection()).execute(
+                "SELECT key, value FROM ledger_meta WHERE key IN ('ledger_id', 'write_seq')"
+            ).fetchall())
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+        return values["ledger_id"], values["write_seq"]
+
+    @contextmanager
+    def read_snapshot_source(self, batch_size: int = 10000):
+        """Yield (stamp, category totals, rows) all read from one consistent database snapshot.
+
+        Rows are (id, amount, category, description, date ordinal) in id order and are
+        fetched lazily, so they must be consumed inside the `with` block. Runs on its
+        own connection so a long read never ties up the thread's pooled one.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            stamp = self.ledger_stamp(conn)
+            totals = conn.execute("SELECT category, sum(amount), count(*) FROM expenses GROUP BY category").fetchall()
+            cursor = conn.execute(f"SELECT id, amount, category, description, {ORDINAL_DATE} FROM expenses ORDER BY id")
+
+            def rows() -> Iterator[tuple]:
+                while batch := cursor.fetchmany(batch_size):
+                    yield from batch
+
+            yield stamp, totals, rows()
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+        finally:
+            conn.close()
+
+    def page_expenses(
+        self,
+        limit: int,
+        cursor: str | None = None,
+        order: str = "id",
+        category: str | None = None,
+        start: Date | None = None
+    ) -> tuple[list[Expense], str | None]:
+        """Keyset page of expenses ordered by id or by (date, id), optionally narrowed to
+        one category and to dates on or after `start`.
+
+        Each page seeks straight to the cursor through an index, so it costs the
+        same wherever it falls in the ledger. Category filters are indexed for
+        order="date". A partitioned ledger reads only the partitions from `start` on.
+        """
+        after = decode_cursor(cursor, order)
+        if order == "date":
+            sort, seek = "date, id", "(date, id) > (?, ?)"
+        else:
+            sort, seek = "id", "id > ?"
+        conditions, params = [], []
+        if category is not None:
+            conditions.append("category = ?")
+            params.append(category)
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(start.isoformat())
+        if after is not None:
+            conditions.append(seek)
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        try:
+            conn = self.connection()
+            source = "expenses"
+            width = self._partition_width(conn) if start is not None else 0
+            if width:
+                # Rows dated before `start` can only be in earlier partitions, which are skipped
+                tables = self._partition_tables(conn, start.isoformat()[:width])
+                if not tables:
+                    return [], None
+                source = "(" + " UNION ALL ".join(f"SELECT {EXPENSE_COLUMNS} FROM {table}" for table in tables) + ")"
+            rows = conn.execute(
+                f'SELECT {EXPENSE_COLUMNS} FROM {source} {where} ORDER BY {sort} LIMIT ?', (*params, limit + 1)
+            ).fetchall()
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+        return build_page(_rows_to_expenses(rows), limit, order)
+
+    def search_expenses(self, query: str, limit: int, cursor: str | None = None, order: str = "rank") -> tuple[list[Expense], str | None]:
+        """Keyset page of expenses whose description contains every word of `query` (as a prefix).
+
+        `order` is "rank" (best bm25 match first) or "recent" (newest id first). "recent"
+        walks the index backwards and stops after `limit` rows; "rank" has to score every
+        match before it can return the best ones.
+        """
+        match = fts_match(query)
+        after = decode_cursor(cursor, order, SEARCH_ORDERS)
+        if order == "rank":
+            rank = "expenses_fts.rank"
+            sort, seek = "expenses_fts.rank, expenses_fts.rowid", "(expenses_fts.rank, expenses_fts.rowid) > (?, ?)"
+        else:
+            rank = "NULL"
+            sort, seek = "expenses_fts.rowid DESC", "expenses_fts.rowid < ?"
+        where = f"AND {seek}" if after is not None else ""
+        conn = self.connection()
+        try:
+            # The page of matches is fetched first and its rows looked up by id: joining the
+            # index to a partitioned ledger's view would read every partition
+            conn.execute("BEGIN")
+            try:
+                matches = conn.execute(f'''
+                    SELECT expenses_fts.rowid, {rank} FROM expenses_fts
+                    WHERE expenses_fts MATCH ? {where}
+                    ORDER BY {sort} LIMIT ?
+                ''', (match, *(after or ()), limit + 1)).fetchall()
+                expenses = self._load_by_ids(conn, [expense_id for expense_id, _ in matches[:limit]])
+            finally:
+                conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to search the database: {e}") from e
+        page = matches[:limit]
+        next_cursor = None
+        if len(matches) > limit:
+            last_id, last_rank = page[-1]
+            next_cursor = encode_cursor((last_rank, last_id) if order == "rank" else (last_id,), order)
+        return [expenses[expense_id] for expense_id, _ in page], next_cursor
+
+    def load_rollups(self, granularity: str, start: Date | None = None, end: Date | None = None) -> list[tuple]:
+        """(period, category, total, count) rows of one granularity, optionally limited to
+        the periods containing `start` through `end`"""
+        if granularity not in ROLLUP_PERIODS:
+            raise ValueError(f"Granularity must be one of {', '.join(ROLLUP_PERIODS)}. Got {granularity} instead")
+        period = ROLLUP_PERIODS[granularity].format(date="?")
+        where, params = "granularity = ?", [granularity]
+        if start is not None:
+            where += f" AND period >= {period}"
+            params.append(start.isoformat())
+        if end is not None:
+            where += f" AND period <= {period}"
+            params.append(end.isoformat())
+        try:
+            return self.connection().execute(
+                f'SELECT period, category, total, count FROM expense_rollups WHERE {where} ORDER BY period, category',
+                params
+            ).fetchall()
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+
+    def load_category_totals(self) -> list[tuple]:
+        """(category, total, count) for the whole ledger, summed from the monthly rollups"""
+        try:
+            return self.connection().execute('''
+                SELECT category, sum(total), sum(count) FROM expense_rollups
+                WHERE granularity = 'month' GROUP BY category
+            ''').fetchall()
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+
+    def delete_expense(self, expense_id: int) -> None:
+        with self._transaction() as conn:
+            table = self._table_of(conn, expense_id)
+            if table is not None:
+                conn.execute(f'DELETE FROM {table} WHERE id = ?', (expense_id,))
+
+    def update_expense_fields(self, expense_id: int, fields: dict) -> None:
+        """Write only the given columns of one expense with a single UPDATE in one transaction.
+
+        In a partitioned ledger a new date in another period moves the row: it is deleted
+        from its partition and inserted, with the same id, into the new one.
+        """
+        unknown = set(fields) - set(UPDATABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot update column(s): {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        values = {column: value.isoformat() if isinstance(value, Date) else value for column, value in fields.items()}
+        try:
+            with self._transaction() as conn:
+                table = self._table_of(conn, expense_id)
+                if table is None:
+                    return
+                width = self._partition_width(conn)
+                target = self._partition(conn, values["date"][:width]) if width and "date" in values else table
+                if target == table:
+                    conn.execute(f'UPDATE {table} SET {assignments} WHERE id = ?', (*values.values(), expense_id))
+                else:
+                    row = conn.execute(
+                        f'DELETE FROM {table} WHERE id = ? RETURNING {EXPENSE_COLUMNS}', (expense_id,)
+                    ).fetchone()
+                    moved = dict(zip(EXPENSE_COLUMNS.split(", "), row)) | values
+                    conn.execute(f'INSERT INTO {target}({EXPENSE_COLUMNS}) VALUES(?, ?, ?, ?, ?)', tuple(moved.values()))
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to update expense: {e}") from e
+
+    def update_expense_amount(self, expense_id: int, new_value: float) -> None:
+        self.update_expense_fields(expense_id, {"amount": new_value})
+
+    def update_expense_category(self, expense_id: int, new_value: str) -> None:
+        self.update_expense_fields(expense_id, {"category": new_value})
+
+    def update_expense_description(self, expense_id: int, new_value: str) -> None:
+        self.update_expense_fields(expense_id, {"description": new_value})
+
+    def update_expense_date(self, expense_id: int, new_value: Date) -> None:
+        self.update_expense_fields(expense_id, {"date": new_value})
+
+    def partitions(self) -> list[tuple[str, int]]:
+        """(key, row count) of every partition in date order, e.g. ('2025', 1200); empty when unpartitioned"""
+        conn = self.connection()
+        try:
+            return [
+                (table.removeprefix("expenses_").replace("_", "-"), conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0])
+                for table in self._partition_tables(conn)
+            ]
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to load from database: {e}") from e
+
+    def _existing_partition(self, conn: sqlite3.Connection, key: str) -> str:
+        table = _partition_table(key)
+        if not re.fullmatch(r"\d{4}(-\d{2})?", key) or table not in self._partition_tables(conn):
+            raise ValueError(f"No partition {key}")
+        return table
+
+    def archive_partition(self, key: str, path: str) -> int:
+        """Copy partition `key` into a standalone ledger file at `path` and return the number of rows.
+
+        Only that partition is read, so a settled period can be backed up once rather
+        than with every copy of the whole history. The file holds a plain expenses
+        table that StorageEngine(path).create_table() opens like any other ledger.
+        """
+        conn = self._connect()
+        try:
+            table = self._existing_partition(conn, key)
+            conn.execute("ATTACH DATABASE ? AS archive", (path,))
+            conn.execute("BEGIN")
+            self._create_expense_table(conn, "expenses", "archive")
+            copied = conn.execute(f"INSERT INTO archive.expenses SELECT {EXPENSE_COLUMNS} FROM {table}").rowcount
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to archive partition {key}: {e}") from e
+        finally:
+            conn.close()
+        return copied
+
+    def compact_partition(self, key: str) -> None:
+        """Rewrite partition `key` and its indexes onto densely packed pages, e.g. after heavy
+        edits to an old period, without vacuuming the rest of the ledger.
+
+        Databases created partitioned use incremental auto-vacuum, so the pages the old
+        copy occupied are handed back to the filesystem too.
+        """
+        try:
+            with self._transaction() as conn:
+                table = self._existing_partition(conn, key)
+                # Rows go back before the triggers do, so rollups, search and the change log are untouched
+                conn.execute(f"CREATE TEMP TABLE compacting AS SELECT {EXPENSE_COLUMNS} FROM {table}")
+                conn.execute(f"DROP TABLE {table}")
+                self._create_expense_table(conn, table)
+                conn.execute(f"INSERT INTO {table} SELECT {EXPENSE_COLUMNS} FROM temp.compacting ORDER BY id")
+                conn.execute("DROP TABLE temp.compacting")
+                for trigger in _expense_triggers(table):
+                    conn.execute(trigger)
+            # executescript steps the pragma to completion; execute() would free a single page
+            conn.executescript("PRAGMA incremental_vacuum")
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to compact partition {key}: {e}") from e
+
+
+class GroupCommitWriter:
+    """Write-behind queue that commits concurrent inserts in batches on one thread.
+
+    submit() returns a Future that resolves to the stored Expense (with its id) once
+    the transaction holding it has committed. The writer waits at most `max_delay`
+    seconds after the first queued draft, or until `max_batch` drafts are queued,
+    then inserts them all in one transaction, so one commit (and fsync) covers the
+    whole batch. If the batch fails, every caller in it gets the exception.
+    """
+    _STOP = object()
+
+    def __init__(self, storage: StorageEngine, max_batch: int = 500, max_delay: float = 0.005) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        if max_delay < 0:
+            raise ValueError("max_delay cannot be negative")
+        self._storage = storage
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="expense-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, draft: ExpenseDraft) -> Future:
+        """Queue one draft; the Future resolves to its Expense after commit"""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("GroupCommitWriter is closed")
+            self._queue.put((draft, future))
+        return future
+
+    def close(self) -> None:
+        """Commit everything already queued, then stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self._max_delay
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch: list[tuple[ExpenseDraft, Future]]) -> None:
+        # Callers that gave up (cancelled futures) are dropped before anything is written
+        batch = [(draft, future) for draft, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            expenses = self._storage.insert_expenses([draft for draft, _ in batch])
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), expense in zip(batch, expenses):
+            future.set_result(expense)
+
+
+class ChangeLogCompactor:
+    """Runs compact_changes() on a background thread every `interval` seconds"""
+    def __init__(self, storage: StorageEngine, retain: int, interval: float = 60.0) -> None:
+        self._storage = storage
+        self._retain = retain
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="expense-change-log", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self._storage.compact_changes(self._retain)
+            except Exception:
+                logger.exception("Failed to compact the change log")
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,88 @@
+# test_analytics.py
+import os
+import statistics
+import tempfile
+import unittest
+from datetime import date as Date, timedelta
+from expense import ExpenseDraft
+from expense_manager import ExpenseManager
+from expense_service import ExpenseService
+from storage import StorageEngine
+
+try:
+    from analytics import LedgerAnalytics
+except ImportError:
+    LedgerAnalytics = None
+
+@unittest.skipIf(LedgerAnalytics is None, "NumPy is not installed")
+class TestLedgerAnalytics(unittest.TestCase):
+    """Vectorized analytics agree with plain Python over the same ledger"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = StorageEngine(os.path.join(self._tmpdir.name, "test.db"))
+        self.engine.create_table()
+        self.drafts = [
+            ExpenseDraft(5 + (i * 7) % 40, ("Groceries", "Savings")[i % 2], f"Item {i}", Date(2026, 1, 1) + timedelta(days=i % 45))
+            for i in range(120)
+        ]
+        self.engine.insert_expenses(self.drafts)
+        self.analytics = LedgerAnalytics(self.engine)
+
+    def tearDown(self):
+        self.engine.close()
+        self._tmpdir.cleanup()
+
+    def test_amount_stats(self):
+        """Mean, median and percentiles match the statistics module"""
+        amounts = [draft.amount for draft in self.drafts]
+        stats = self.analytics.amount_stats()
+        self.assertEqual(stats["count"], 120)
+        self.assertAlmostEqual(stats["mean"], statistics.fmean(amounts))
+        self.assertAlmostEqual(stats["median"], statistics.median(amounts))
+        self.assertAlmostEqual(stats["percentiles"]["25"], statistics.quantiles(amounts, n=4, method="inclusive")[0])
+        groceries = [draft.amount for draft in self.drafts if draft.category == "Groceries"]
+        self.assertAlmostEqual(self.analytics.amount_stats("Groceries")["total"], sum(groceries))
+        self.assertEqual(self.analytics.amount_stats("Entertainment")["count"], 0)
+
+    def test_rolling_spend(self):
+        """Each day's value is the sum over the trailing window"""
+        window = 30
+        rolling = {entry["date"]: entry["total"] for entry in self.analytics.rolling_spend(window)}
+        for day in (Date(2026, 1, 1), Date(2026, 1, 20), Date(2026, 2, 14)):
+            expected = sum(draft.amount for draft in self.drafts if timedelta(0) <= day - draft.date < timedelta(days=window))
+            self.assertAlmostEqual(rolling[day.isoformat()], expected)
+        trimmed = self.analytics.rolling_spend(window, start=Date(2026, 2, 1), end=Date(2026, 2, 3))
+        self.assertEqual([entry["date"] for entry in trimmed], ["2026-02-01", "2026-02-02", "2026-02-03"])
+
+    def test_weekday_breakdown(self):
+        """Per-weekday counts match date.weekday()"""
+        breakdown = self.analytics.weekday_breakdown()
+        for index, name in enumerate(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]):
+            self.assertEqual(breakdown[name]["count"], sum(1 for draft in self.drafts if draft.date.weekday() == index))
+
+    def test_cache_invalidated_by_writes(self):
+        """Columns are reused between writes and rebuilt after one"""
+        self.analytics.amount_stats()
+        columns = self.analytics._amounts
+        self.analytics.weekday_breakdown()
+        self.assertIs(self.analytics._amounts, columns)
+        self.engine.insert_expense(ExpenseDraft(1000, "Savings", "Bonus", Date(2026, 3, 1)))
+        self.assertEqual(self.analytics.amount_stats()["max"], 1000)
+
+    def test_cache_invalidated_by_other_workers(self):
+        """A write another worker's engine commits, applied by sync(), reaches the cached columns"""
+        service = ExpenseService(ExpenseManager(self.engine.load_expenses()), self.engine, change_seq=self.engine.follow_changes())
+        self.assertEqual(service.get_amount_stats()["count"], 120)
+        other = StorageEngine(self.engine.filepath)
+        try:
+            other.insert_expense(ExpenseDraft(1000, "Savings", "Bonus", Date(2026, 3, 1)))
+        finally:
+            other.close()
+        self.assertEqual(service.sync(), 1)
+        stats = service.get_amount_stats()
+        self.assertEqual(stats["count"], 121)
+        self.assertEqual(stats["max"], 1000)
+
+if __name__ == "__main__":
+    unittest.main()
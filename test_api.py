@@ -0,0 +1,227 @@
+# test_api.py
+import json
+import os
+import tempfile
+import unittest
+from fastapi.testclient import TestClient
+from api.api import app, response_cache
+from api.dependencies import get_expense_service
+from expense_manager import ExpenseManager
+from async_service import AsyncExpenseService
+from storage import StorageEngine
+
+class TestExpenseAPI(unittest.TestCase):
+    """API tests against a throwaway database"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = StorageEngine(os.path.join(self._tmpdir.name, "test.db"))
+        self.engine.create_table()
+        self.service = AsyncExpenseService(ExpenseManager(None), self.engine)
+        app.dependency_overrides[get_expense_service] = lambda: self.service
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        response_cache.clear()
+        self.service.close()
+        self.engine.close()
+        self._tmpdir.cleanup()
+
+    def test_bulk_create(self):
+        """A valid batch is committed and all new IDs are returned"""
+        response = self.client.post("/expenses/bulk", json=[
+            {"amount": 10, "category": "Groceries", "description": "Bread", "date": "2026-01-01"},
+            {"amount": 20.5, "category": "Transportation", "description": "Taxi"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        ids = response.json()["ids"]
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(sorted(expense.id for expense in self.engine.load_expenses()), sorted(ids))
+        self.assertEqual(self.client.get(f"/expenses/{ids[1]}").json()["description"], "Taxi")
+
+    def test_bulk_create_rejects_whole_batch(self):
+        """One invalid row rejects the batch and every bad row is reported"""
+        response = self.client.post("/expenses/bulk", json=[
+            {"amount": 10, "category": "Groceries", "description": "Bread"},
+            {"amount": -1, "category": "Groceries", "description": "Refund"},
+            {"amount": 5, "category": "Nope", "description": "Mystery"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.json()["detail"]["errors"]], [1, 2])
+        self.assertEqual(self.engine.load_expenses(), [])
+
+    def test_bulk_create_reports_non_finite_amounts(self):
+        """NaN and Infinity amounts are per-row validation errors, not a failed insert"""
+        response = self.client.post("/expenses/bulk", content=(
+            '[{"amount": 10, "category": "Groceries", "description": "Bread"},'
+            ' {"amount": NaN, "category": "Groceries", "description": "Not a number"},'
+            ' {"amount": Infinity, "category": "Groceries", "description": "Infinite"}]'
+        ), headers={"Content-Type": "application/json"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.json()["detail"]["errors"]], [1, 2])
+        self.assertEqual(self.engine.load_expenses(), [])
+
+    def test_list_pagination(self):
+        """GET /expenses pages through the ledger with next_cursor"""
+        self.client.post("/expenses/bulk", json=[
+            {"amount": i + 1, "category": "Groceries", "description": f"Item {i}", "date": f"2026-01-{i + 1:02d}"}
+            for i in range(5)
+        ])
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, "order": "date"}
+            if cursor:
+                params["cursor"] = cursor
+            body = self.client.get("/expenses", params=params).json()
+            seen.extend(expense["description"] for expense in body["expenses"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f"Item {i}" for i in range(5)])
+        self.assertEqual(self.client.get("/expenses", params={"cursor": "garbage"}).status_code, 400)
+
+    def test_search(self):
+        """GET /expenses/search ranks matches and rejects queries without words"""
+        self.client.post("/expenses/bulk", json=[
+            {"amount": 1, "category": "Groceries", "description": "Bread"},
+            {"amount": 2, "category": "Transportation", "description": "Taxi home"},
+            {"amount": 3, "category": "Transportation", "description": "Taxi to the taxi rank"},
+        ])
+        body = self.client.get("/expenses/search", params={"q": "tax"}).json()
+        self.assertEqual([expense["description"] for expense in body["expenses"]], ["Taxi home", "Taxi to the taxi rank"])
+        self.assertIsNone(body["next_cursor"])
+        self.assertEqual(self.client.get("/expenses/search", params={"q": "***"}).status_code, 400)
+        self.assertEqual(self.client.get("/expenses/search", params={"q": "taxi", "cursor": "garbage"}).status_code, 400)
+
+    def test_change_feed(self):
+        """GET /expenses/changes resyncs from since=0, then returns upserts and tombstones; 410 once compacted past"""
+        ids = self.client.post("/expenses/bulk", json=[
+            {"amount": i + 1, "category": "Groceries", "description": f"Item {i}"} for i in range(3)
+        ]).json()["ids"]
+        body = self.client.get("/expenses/changes", params={"limit": 2}).json()
+        self.assertEqual([change["expense"]["id"] for change in body["changes"]], ids[:2])
+        self.assertEqual(body["next_after_id"], ids[1])
+        since = body["next_since"]
+        body = self.client.get("/expenses/changes", params={"since": since, "after_id": ids[1]}).json()
+        self.assertEqual(([change["expense"]["id"] for change in body["changes"]], body["next_after_id"]), ([ids[2]], None))
+        self.client.patch(f"/expenses/{ids[0]}", json={"amount": 9})
+        self.engine.delete_expense(ids[1])
+        body = self.client.get("/expenses/changes", params={"since": since}).json()
+        self.assertEqual([(change["op"], change.get("id")) for change in body["changes"]], [("upsert", None), ("delete", ids[1])])
+        self.assertEqual(body["changes"][0]["expense"]["amount"], 9)
+
+        self.engine.compact_changes(retain=0)
+        # The delete went around the service, so the ledger version (and cache key) did not move
+        response_cache.clear()
+        response = self.client.get("/expenses/changes", params={"since": since})
+        self.assertEqual(response.status_code, 410)
+        body = self.client.get("/expenses/changes").json()
+        self.assertEqual([change["expense"]["id"] for change in body["changes"]], [ids[0], ids[2]])
+
+    def test_metrics(self):
+        """GET /metrics reports requests per route template and status"""
+        self.client.get("/expenses/12345")
+        self.client.get("/no/such/path")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn('expense_http_requests_total{method="GET",route="/expenses/{expense_id}",status="404"}', response.text)
+        self.assertIn('expense_http_requests_total{method="GET",route="unmatched",status="404"}', response.text)
+        self.assertIn('expense_http_request_duration_seconds_bucket{method="GET",route="/expenses/{expense_id}",le="+Inf"}', response.text)
+
+    def test_export_streams_ndjson(self):
+        """GET /expenses/export streams one JSON object per line"""
+        self.client.post("/expenses/bulk", json=[
+            {"amount": i + 1, "category": "Savings", "description": f"Deposit {i}"} for i in range(3)
+        ])
+        response = self.client.get("/expenses/export")
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([line["description"] for line in lines], ["Deposit 0", "Deposit 1", "Deposit 2"])
+        self.assertEqual(len(self.client.get("/expenses/export", params={"format": "json"}).json()), 3)
+
+    def test_period_summary(self):
+        """GET /summary returns per-month category totals within the requested range"""
+        self.client.post("/expenses/bulk", json=[
+            {"amount": 10, "category": "Groceries", "description": "Bread", "date": "2025-12-30"},
+            {"amount": 5, "category": "Groceries", "description": "Milk", "date": "2026-01-02"},
+            {"amount": 7, "category": "Groceries", "description": "Eggs", "date": "2026-01-20"},
+        ])
+        body = self.client.get("/summary", params={"granularity": "month", "from": "2026-01-15"}).json()
+        self.assertEqual(body["periods"], [{"period": "2026-01", "category": "Groceries", "total": 12.0, "count": 2}])
+
+    def test_analytics_endpoints(self):
+        """Analytics endpoints reflect the current ledger"""
+        self.client.post("/expenses/bulk", json=[
+            {"amount": amount, "category": "Groceries", "description": "Item", "date": "2026-01-05"}
+            for amount in (10, 20, 60)
+        ])
+        stats = self.client.get("/analytics/stats").json()
+        self.assertEqual((stats["count"], stats["median"], stats["max"]), (3, 20.0, 60.0))
+        self.assertEqual(self.client.get("/analytics/weekdays").json()["Monday"]["total"], 90.0)
+        self.client.post("/expenses", json={"amount": 5, "category": "Savings", "description": "Coins", "date": "2026-01-06"})
+        days = self.client.get("/analytics/rolling", params={"window": 2}).json()["days"]
+        self.assertEqual(days, [{"date": "2026-01-05", "total": 90.0}, {"date": "2026-01-06", "total": 95.0}])
+
+    def test_conditional_get(self):
+        """ETags answer If-None-Match with 304 until the resource changes"""
+        expense_id = self.client.post("/expenses", json={"amount": 10, "category": "Groceries", "description": "Bread"}).json()["id"]
+        other_id = self.client.post("/expenses", json={"amount": 20, "category": "Savings", "description": "Coins"}).json()["id"]
+        for path in (f"/expenses/{expense_id}", "/expenses", "/summary"):
+            etag = self.client.get(path).headers["ETag"]
+            response = self.client.get(path, headers={"If-None-Match": etag})
+            self.assertEqual((response.status_code, response.content, response.headers["ETag"]), (304, b"", etag))
+        item_etag = self.client.get(f"/expenses/{expense_id}").headers["ETag"]
+        list_etag = self.client.get("/expenses").headers["ETag"]
+        self.client.patch(f"/expenses/{other_id}", json={"amount": 25})
+        self.assertEqual(self.client.get(f"/expenses/{expense_id}", headers={"If-None-Match": item_etag}).status_code, 304)
+        response = self.client.get("/expenses", headers={"If-None-Match": list_etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["expenses"][1]["amount"], 25)
+
+    def test_response_cache_reuses_bytes(self):
+        """Repeated reads at one version are served from cache; a write invalidates them"""
+        self.client.post("/expenses", json={"amount": 10, "category": "Groceries", "description": "Bread", "date": "2026-01-01"})
+        calls = []
+        page = self.service.list_expenses_page
+        async def counting_page(*args):
+            calls.append(args)
+            return await page(*args)
+        self.service.list_expenses_page = counting_page
+        first = self.client.get("/expenses").content
+        self.assertEqual(self.client.get("/expenses").content, first)
+        self.assertEqual(len(calls), 1)
+        self.client.post("/expenses", json={"amount": 5, "category": "Savings", "description": "Coins"})
+        self.assertEqual(len(self.client.get("/expenses").json()["expenses"]), 2)
+        self.assertEqual(len(calls), 2)
+
+    def test_large_responses_are_compressed(self):
+        """Bodies over the threshold are gzipped when accepted, and never otherwise"""
+        self.client.post("/expenses/bulk", json=[
+            {"amount": i + 1, "category": "Groceries", "description": f"Item {i}"} for i in range(50)
+        ])
+        gzipped = self.client.get("/expenses", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(gzipped.headers["Content-Encoding"], "gzip")
+        self.assertEqual(len(gzipped.json()["expenses"]), 50)
+        plain = self.client.get("/expenses", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertEqual(plain.json(), gzipped.json())
+        small = self.client.get("/expenses", params={"limit": 1}, headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", small.headers)
+
+    def test_csv_import_and_export(self):
+        """POST /expenses/import streams a CSV body in; format=csv streams the ledger back out"""
+        body = "amount,category,description,date\n10,Groceries,Bread,2026-01-01\n-1,Groceries,Bad,2026-01-01\n5,Savings,Coins,2026-01-02\n"
+        response = self.client.post("/expenses/import", content=body, headers={"Content-Type": "text/csv"})
+        self.assertEqual(response.json()["imported"], 2)
+        self.assertEqual(response.json()["errors"][0]["row"], 2)
+        self.assertEqual(self.client.get("/expenses").json()["expenses"][1]["description"], "Coins")
+        exported = self.client.get("/expenses/export", params={"format": "csv"}).text.splitlines()
+        self.assertEqual(exported[0], "id,amount,category,description,date")
+        self.assertEqual(exported[1:], ["1,10.0,Groceries,Bread,2026-01-01", "2,5.0,Savings,Coins,2026-01-02"])
+        bad = self.client.post("/expenses/import", content="amount\n1\n", headers={"Content-Type": "text/csv"})
+        self.assertEqual(bad.status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
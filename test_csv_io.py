@@ -0,0 +1,105 @@
+# test_csv_io.py
+import csv
+import io
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date as Date
+from csv_io import parse_chunk, iter_parsed_chunks
+from exceptions import CorruptedDataError
+from expense_manager import ExpenseManager, SqlExpenseManager, categories
+from expense_service import ExpenseService
+from export import csv_chunks
+from storage import StorageEngine
+
+# Size of the synthetic CSV for the memory ceiling test; override with CSV_TEST_ROWS
+IMPORT_ROWS = int(os.environ.get("CSV_TEST_ROWS", 200_000))
+# Ceiling on live Python allocations while importing. The peak depends on the chunks
+# in flight, not the file size; reading the whole file first would need several
+# blocks per row
+ALLOCATED_BLOCKS_CEILING = 250_000
+
+class TestCsvImport(unittest.TestCase):
+    """Streaming CSV import and export"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = StorageEngine(os.path.join(self._tmpdir.name, "test.db"))
+        self.engine.create_table()
+
+    def tearDown(self):
+        self.engine.close()
+        self._tmpdir.cleanup()
+
+    def test_parse_chunk_validation(self):
+        """Valid records become insertable rows; every invalid one is reported by row number"""
+        columns = {"amount": 0, "category": 1, "description": 2, "date": 3}
+        rows, errors = parse_chunk([
+            ["12.5", "Groceries", " Milk ", "2026-01-02"],
+            ["abc", "Groceries", "Bad amount", "2026-01-02"],
+            ["3", "Nope", "Bad category", ""],
+            ["4", "Savings", "Bad date", "02/01/2026"],
+            ["5", "Savings"],
+            ["6", "Savings", "No date", ""],
+            ["nan", "Savings", "Not a number", ""],
+            ["inf", "Savings", "Infinite", ""],
+        ], columns, 10, categories)
+        self.assertEqual(rows[0], (12.5, "Groceries", "Milk", "2026-01-02"))
+        self.assertEqual(rows[1][:3], (6.0, "Savings", "No date"))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual([row for row, _ in errors], [11, 12, 13, 14, 16, 17])
+
+    def test_header_is_required(self):
+        """Files without the required columns are rejected before anything is inserted"""
+        with self.assertRaises(CorruptedDataError):
+            list(iter_parsed_chunks(io.StringIO("amount,description\n1,x\n"), categories, workers=1))
+        with self.assertRaises(CorruptedDataError):
+            list(iter_parsed_chunks(io.StringIO(""), categories, workers=1))
+
+    def test_export_import_round_trip(self):
+        """A CSV export imported into another ledger reproduces every row, in order"""
+        source = ExpenseService(ExpenseManager(None), self.engine)
+        source.add_expenses([
+            (i + 0.25, categories[i % len(categories)], f'Item "{i}", with comma', Date(2026, 1, 1 + i % 28))
+            for i in range(250)
+        ])
+        exported = b"".join(csv_chunks(self.engine.iter_expense_rows(), chunk_rows=40)).decode()
+        target_engine = StorageEngine(os.path.join(self._tmpdir.name, "target.db"))
+        target_engine.create_table()
+        target = ExpenseService(ExpenseManager(None), target_engine)
+        report = target.import_csv(io.StringIO(exported, newline=""), chunk_rows=60, workers=2)
+        self.assertEqual(report, {"imported": 250, "skipped": 0, "errors": []})
+        self.assertEqual(list(target_engine.iter_expense_rows()), list(self.engine.iter_expense_rows()))
+        self.assertEqual(target.get_category_summary(), source.get_category_summary())
+        target_engine.close()
+
+    def test_import_memory_ceiling(self):
+        """Importing a large file keeps live allocations under the ceiling"""
+        path = os.path.join(self._tmpdir.name, "large.csv")
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["date", "description", "amount", "category", "reference"])
+            writer.writerows(
+                (f"2026-02-{1 + i % 28:02d}", f"Card payment #{i}", f"{1 + i % 5000 / 100:.2f}", "Groceries", f"REF{i}")
+                for i in range(IMPORT_ROWS)
+            )
+        service = ExpenseService(SqlExpenseManager(self.engine), self.engine)
+        baseline = sys.getallocatedblocks()
+        peak = 0
+
+        def sampled(lines):
+            nonlocal peak
+            for count, line in enumerate(lines):
+                if count % 1000 == 0:
+                    peak = max(peak, sys.getallocatedblocks() - baseline)
+                yield line
+
+        with open(path, newline="") as file:
+            report = service.import_csv(sampled(file), chunk_rows=5000, workers=2)
+        self.assertEqual((report["imported"], report["skipped"]), (IMPORT_ROWS, 0))
+        self.assertEqual(self.engine.load_category_totals()[0][2], IMPORT_ROWS)
+        self.assertLess(peak, ALLOCATED_BLOCKS_CEILING)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,9 @@
 # test_expense.py
+import json
 import unittest
 from datetime import date as Date
+from unittest import mock
+import serialization
 from expense import Expense
 from expense import (
     InvalidExpenseIdError,
@@ -55,5 +58,32 @@ class TestExpense(unittest.TestCase):
             with self.assertRaises(InvalidExpenseDescriptionError):
                 Expense(1, 10.0, "Food", desc, Date.today())
 
+    def test_to_json_cache(self):
+        """to_json matches to_dict and is re-encoded after every correction"""
+        exp = Expense(3, 9.5, "Groceries", "Café", Date(2026, 1, 2))
+        self.assertEqual(json.loads(exp.to_json()), exp.to_dict())
+        self.assertIs(exp.to_json(), exp.to_json())
+        exp.correct_amount(10)
+        exp.recategorize("Savings")
+        exp.correct_description("Tea")
+        exp.correct_date(Date(2026, 1, 3))
+        self.assertEqual(json.loads(exp.to_json()), exp.to_dict())
+
+    def test_trusted_constructor(self):
+        """Expense.trusted builds the same expense as __init__ without validating, and has no __dict__"""
+        trusted = Expense.trusted(4, 12.0, "Savings", "Deposit", Date(2026, 1, 4))
+        self.assertEqual(trusted.to_dict(), Expense(4, 12.0, "Savings", "Deposit", Date(2026, 1, 4)).to_dict())
+        self.assertEqual(Expense.trusted(0, -1.0, "", "", Date(2026, 1, 4)).amount, -1.0)
+        self.assertFalse(hasattr(trusted, "__dict__"))
+        trusted.correct_amount(13)
+        self.assertEqual(json.loads(trusted.to_json())["amount"], 13.0)
+
+    def test_stdlib_json_fallback(self):
+        """Without orjson, dumps produces the same compact JSON"""
+        value = {"id": 1, "amount": 0.1, "description": "Café", "date": Date(2026, 1, 2), "next": None}
+        fast = serialization.dumps(value)
+        with mock.patch.object(serialization, "orjson", None):
+            self.assertEqual(serialization.dumps(value), fast)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,170 @@
+# test_expense_manager.py
+import math
+import os
+import random
+import tempfile
+import unittest
+from collections import defaultdict
+from datetime import date as Date
+from expense import Expense, ExpenseDraft
+from expense_manager import ExpenseManager, SqlExpenseManager, ColumnarLedger, categories
+from expense_service import ExpenseService
+from exceptions import ExpenseNotFoundError
+from storage import StorageEngine
+
+class TestExpenseManager(unittest.TestCase):
+    """Unit tests for ExpenseManager"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = StorageEngine(os.path.join(self._tmpdir.name, "test.db"))
+        self.engine.create_table()
+        dates = [Date(2026, 1, day) for day in (5, 1, 3, 1, 2, 5, 4, 3, 1, 2)]
+        self.engine.insert_expenses([
+            ExpenseDraft(10 + i, "Groceries", f"Item {i}", day) for i, day in enumerate(dates)
+        ])
+        self.manager = ExpenseManager(self.engine.load_expenses())
+
+    def tearDown(self):
+        self.engine.close()
+        self._tmpdir.cleanup()
+
+    def test_versions_bump_on_mutation(self):
+        """Every mutation bumps the ledger version and stamps it on the changed expense only"""
+        first, second = self.engine.load_expenses()[:2]
+        self.assertEqual((self.manager.version, self.manager.expense_version(first.id)), (0, 0))
+        ledger_tag, second_tag = self.manager.version_tag(), self.manager.version_tag(second.id)
+        self.manager.correct_expense_amount(first.id, 99)
+        self.manager.recategorize_expense(first.id, "Savings")
+        self.assertEqual((self.manager.version, self.manager.expense_version(first.id)), (2, 2))
+        self.assertNotEqual(self.manager.version_tag(), ledger_tag)
+        self.assertEqual(self.manager.version_tag(second.id), second_tag)
+        self.manager.delete_expense(second.id)
+        self.assertEqual(self.manager.version, 3)
+        with self.assertRaises(ExpenseNotFoundError):
+            self.manager.expense_version(second.id)
+        self.assertNotEqual(ExpenseManager(None).version_tag(), ExpenseManager(None).version_tag())
+
+    def test_sync_expenses(self):
+        """Synced upserts and tombstones update totals; expenses that already match keep their version"""
+        first, second, third = self.engine.load_expenses()[:3]
+        for manager in (self.manager, ExpenseManager(None, ColumnarLedger.from_rows(self.engine.iter_expense_rows()))):
+            applied = manager.sync_expenses({
+                first.id: first,
+                second.id: Expense(second.id, 5, "Savings", "Moved", second.date),
+                third.id: None,
+                99: Expense(99, 7, "Savings", "New", Date(2026, 2, 1)),
+                100: None,
+            })
+            self.assertEqual(applied, 3)
+            self.assertEqual(manager.expense_version(first.id), 0)
+            self.assertNotEqual(manager.expense_version(second.id), 0)
+            self.assertEqual(manager.get_category_summary()["Savings"], 12)
+            self.assertEqual(manager.get_category_counts()["Groceries"], 8)
+            self.assertEqual(manager.get_expense(second.id).description, "Moved")
+            with self.assertRaises(ExpenseNotFoundError):
+                manager.get_expense(third.id)
+
+    def test_category_totals_match_recompute(self):
+        """Incremental totals and counts agree with a full recompute after many mutations"""
+        rng = random.Random(7)
+        manager = ExpenseManager(None)
+        next_id = 1
+        for _ in range(5000):
+            ids = list(manager._ledger)
+            operation = rng.random()
+            if operation < 0.5 or not ids:
+                manager.attach_expense(Expense(next_id, round(rng.uniform(0.01, 1000), 2), rng.choice(categories), "Item"))
+                next_id += 1
+            elif operation < 0.7:
+                manager.delete_expense(rng.choice(ids))
+            elif operation < 0.85:
+                manager.correct_expense_amount(rng.choice(ids), round(rng.uniform(0.01, 1000), 2))
+            else:
+                manager.recategorize_expense(rng.choice(ids), rng.choice(categories))
+
+        amounts = defaultdict(list)
+        for expense in manager.export_expense_list():
+            amounts[expense.category].append(expense.amount)
+        summary = manager.get_category_summary()
+        counts = manager.get_category_counts()
+        for category in categories:
+            self.assertAlmostEqual(summary[category], math.fsum(amounts[category]), places=9)
+            self.assertEqual(counts[category], len(amounts[category]))
+
+    def test_sql_manager_matches_memory_manager(self):
+        """The SQL-backed manager answers like the in-memory one after the same writes"""
+        sql_engine = StorageEngine(os.path.join(self._tmpdir.name, "sql.db"))
+        sql_engine.create_table()
+        sql_engine.insert_expenses([
+            ExpenseDraft(expense.amount, expense.category, expense.description, expense.date)
+            for expense in self.engine.load_expenses()
+        ])
+        sql_manager = SqlExpenseManager(sql_engine, cache_size=2)
+        memory = ExpenseService(self.manager, self.engine)
+        sql = ExpenseService(sql_manager, sql_engine)
+
+        for service in (memory, sql):
+            service.add_expense(99, "Savings", "Deposit", Date(2026, 1, 9))
+            service.correct_expense_amount(1, 50)
+            service.recategorize_expense(2, "Utilities")
+            service.delete_expense(3)
+
+        self.assertEqual(sql.get_category_summary(), memory.get_category_summary())
+        self.assertEqual(sql.get_category_counts(), memory.get_category_counts())
+        self.assertEqual(sql.get_expense(1).amount, 50)
+        self.assertEqual(sql.get_expense(2).category, "Utilities")
+        self.assertEqual(len(sql_manager._cache), 2)
+        with self.assertRaises(ExpenseNotFoundError):
+            sql.get_expense(3)
+        self.assertEqual(
+            [expense.id for expense in sql.list_expenses()],
+            sorted(expense.id for expense in memory.list_expenses())
+        )
+        sql_engine.close()
+
+    def test_sql_manager_deletes_uncached_expense(self):
+        """Deleting an expense the LRU does not hold succeeds, even with no cache at all"""
+        service = ExpenseService(SqlExpenseManager(self.engine, cache_size=0), self.engine)
+        version = service.get_version_tag()
+        service.delete_expense(4)
+        self.assertNotEqual(service.get_version_tag(), version)
+        with self.assertRaises(ExpenseNotFoundError):
+            service.get_expense(4)
+
+    def test_columnar_ledger_matches_dict_ledger(self):
+        """A columnar-backed manager stays identical to the dict-backed one under random mutations"""
+        rng = random.Random(11)
+        rows = list(self.engine.iter_expense_rows())
+        plain = ExpenseManager(self.engine.load_expenses())
+        columnar = ExpenseManager(None, ColumnarLedger.from_rows(rows))
+        next_id = 100
+        for _ in range(2000):
+            ids = list(plain._ledger)
+            operation = rng.random()
+            if operation < 0.3 or not ids:
+                expense = Expense(next_id, rng.uniform(1, 100), rng.choice(categories), f"Item {next_id}", Date(2026, 3, rng.randint(1, 28)))
+                for manager in (plain, columnar):
+                    manager.attach_expense(expense)
+                next_id += rng.choice((1, -150))
+                next_id = max(next_id, 11)
+            else:
+                expense_id = rng.choice(ids)
+                action, value = rng.choice([
+                    ("delete_expense", None),
+                    ("correct_expense_amount", rng.uniform(1, 100)),
+                    ("recategorize_expense", rng.choice(categories)),
+                    ("correct_expense_description", f"Renamed {rng.randint(1, 10**6)} é"),
+                    ("correct_expense_date", Date(2025, rng.randint(1, 12), 1)),
+                ])
+                for manager in (plain, columnar):
+                    getattr(manager, action)(expense_id, *(() if value is None else (value,)))
+
+        self.assertEqual(
+            [expense.to_dict() for expense in sorted(plain.export_expense_list(), key=lambda e: e.id)],
+            [expense.to_dict() for expense in columnar.export_expense_list()]
+        )
+        self.assertEqual(plain.get_category_counts(), columnar.get_category_counts())
+
+if __name__ == "__main__":
+    unittest.main()
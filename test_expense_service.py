@@ -0,0 +1,276 @@
+# test_expense_service.py
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import unittest
+from datetime import date as Date
+from async_service import AsyncExpenseService
+from expense import ExpenseDraft, ExpensePatch
+from expense_manager import ExpenseManager, SqlExpenseManager, categories
+from expense_service import ExpenseService
+from exceptions import ExpenseNotFoundError, InvalidCategoryError, InvalidExpenseDataError
+from storage import GroupCommitWriter, StorageEngine
+
+def run_worker(path: str, seed: int, rounds: int, barrier, results) -> None:
+    """One API worker process: random writes, each preceded by a sync as in get_expense_service"""
+    engine = StorageEngine(path)
+    change_seq = engine.follow_changes()
+    service = ExpenseService(ExpenseManager(engine.load_expenses()), engine, change_seq=change_seq)
+    rng = random.Random(seed)
+    for _ in range(rounds):
+        service.sync()
+        ids = [expense.id for expense in service.list_expenses()]
+        operation = rng.random()
+        if operation < 0.4 or not ids:
+            service.add_expense(rng.randint(1, 100), rng.choice(categories), f"Worker {seed}", Date(2026, 1, rng.randint(1, 28)))
+        elif operation < 0.85:
+            service.apply_patch(rng.choice(ids), ExpensePatch(amount=rng.randint(1, 100), category=rng.choice(categories)))
+        else:
+            service.delete_expense(rng.choice(ids))
+    barrier.wait()
+    service.sync()
+    results.put(({expense.id: expense.to_dict() for expense in service.list_expenses()}, service.get_category_summary()))
+    engine.close()
+
+class TestExpenseService(unittest.TestCase):
+    """Unit tests for ExpenseService write paths"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = StorageEngine(os.path.join(self._tmpdir.name, "test.db"))
+        self.engine.create_table()
+        self.service = ExpenseService(ExpenseManager(None), self.engine)
+        self.expense_id = self.service.add_expense(10, "Groceries", "Bread", Date(2026, 1, 1))
+
+    def tearDown(self):
+        self.engine.close()
+        self._tmpdir.cleanup()
+
+    def test_patch_is_one_transaction(self):
+        """A four-field patch commits once and lands in memory and on disk"""
+        generation = self.engine.generation
+        self.service.apply_patch(self.expense_id, ExpensePatch(12.5, " Savings ", " Bread and milk ", Date(2026, 2, 1)))
+        self.assertEqual(self.engine.generation, generation + 1)
+        expected = {"id": self.expense_id, "amount": 12.5, "category": "Savings",
+                    "description": "Bread and milk", "date": "2026-02-01"}
+        self.assertEqual(self.service.get_expense(self.expense_id).to_dict(), expected)
+        self.assertEqual(self.engine.load_expense(self.expense_id).to_dict(), expected)
+        self.assertEqual(self.service.get_category_summary()["Savings"], 12.5)
+
+    def test_invalid_patch_writes_nothing(self):
+        """Validation happens before any write"""
+        generation = self.engine.generation
+        with self.assertRaises(InvalidCategoryError):
+            self.service.apply_patch(self.expense_id, ExpensePatch(amount=99, category="Nope"))
+        self.assertEqual(self.engine.generation, generation)
+        self.assertEqual(self.service.get_expense(self.expense_id).amount, 10)
+
+    def test_non_finite_amounts_are_rejected(self):
+        """nan and inf never reach storage, so the row's rollups stay updatable and deletable"""
+        for amount in (float("inf"), float("nan"), "-inf"):
+            with self.assertRaises(InvalidExpenseDataError):
+                self.service.add_expense(amount, "Groceries", "Infinite", Date(2026, 1, 1))
+            with self.assertRaises(InvalidExpenseDataError):
+                self.service.apply_patch(self.expense_id, ExpensePatch(amount=amount))
+        self.service.apply_patch(self.expense_id, ExpensePatch(amount=7))
+        self.assertEqual(self.engine.load_expense(self.expense_id).amount, 7)
+        self.service.delete_expense(self.expense_id)
+        self.assertIsNone(self.engine.load_expense(self.expense_id))
+        self.assertEqual(self.service.get_category_summary()["Groceries"], 0)
+
+    def test_failed_commit_leaves_memory_untouched(self):
+        """If the UPDATE fails, the in-memory expense keeps its old values"""
+        def failing_update(expense_id, fields):
+            raise RuntimeError("disk full")
+        self.engine.update_expense_fields = failing_update
+        with self.assertRaises(RuntimeError):
+            self.service.apply_patch(self.expense_id, ExpensePatch(amount=50, description="Cake"))
+        expense = self.service.get_expense(self.expense_id)
+        self.assertEqual((expense.amount, expense.description), (10, "Bread"))
+        self.assertEqual(self.service.get_category_summary()["Groceries"], 10)
+
+class TestAsyncExpenseService(unittest.IsolatedAsyncioTestCase):
+    """The async service stays consistent under concurrent requests"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = StorageEngine(os.path.join(self._tmpdir.name, "test.db"))
+        self.engine.create_table()
+        self.service = AsyncExpenseService(ExpenseManager(None), self.engine)
+
+    def tearDown(self):
+        self.service.close()
+        self.engine.close()
+        self._tmpdir.cleanup()
+
+    async def test_concurrent_writes(self):
+        """Concurrent adds and patches all land, in memory and on disk"""
+        ids = await asyncio.gather(*(
+            self.service.add_expense(i + 1, "Groceries", f"Item {i}", Date(2026, 1, 1)) for i in range(200)
+        ))
+        self.assertEqual(len(set(ids)), 200)
+        await asyncio.gather(*(self.service.apply_patch(expense_id, ExpensePatch(category="Savings")) for expense_id in ids[:50]))
+        summary = self.service.get_category_summary()
+        self.assertEqual(summary["Savings"], sum(range(1, 51)))
+        self.assertEqual(summary["Groceries"], sum(range(51, 201)))
+        stored = {expense.id: expense.category for expense in self.engine.load_expenses()}
+        self.assertEqual(sum(1 for category in stored.values() if category == "Savings"), 50)
+        page, _ = await self.service.list_expenses_page(10)
+        self.assertEqual([expense.id for expense in page], sorted(ids)[:10])
+
+    async def test_concurrent_patches_of_one_expense(self):
+        """Concurrent PATCHes of one expense apply in order; none is diffed against a stale amount"""
+        expense_id = await self.service.add_expense(5, "Groceries", "Bread", Date(2026, 1, 1))
+        await asyncio.gather(
+            self.service.apply_patch(expense_id, ExpensePatch(amount=10)),
+            self.service.apply_patch(expense_id, ExpensePatch(amount=5)),
+        )
+        self.assertEqual((await self.service.get_expense(expense_id)).amount, 5)
+        self.assertEqual(self.engine.load_expense(expense_id).amount, 5)
+        self.assertEqual(self.service.get_category_summary()["Groceries"], 5)
+        self.assertEqual(self.service._expense_locks, {})
+
+    async def test_write_behind_mode(self):
+        """With a GroupCommitWriter, concurrent adds are acknowledged after a shared commit"""
+        service = AsyncExpenseService(ExpenseManager(None), self.engine, GroupCommitWriter(self.engine, max_delay=0.01))
+        generation = self.engine.generation
+        ids = await asyncio.gather(*(
+            service.add_expense(1, "Groceries", f"Item {i}", Date(2026, 1, 1)) for i in range(100)
+        ))
+        service.close()
+        self.assertLess(self.engine.generation - generation, 100)
+        self.assertEqual(sorted(ids), sorted(expense.id for expense in self.engine.load_expenses()))
+        self.assertEqual((await service.get_expense(ids[0])).description, "Item 0")
+
+    async def test_sync_applies_foreign_writes(self):
+        """Writes committed through another engine reach the manager on sync; the service's own do not reload"""
+        service = AsyncExpenseService(ExpenseManager(None), self.engine, change_seq=self.engine.follow_changes())
+        other = StorageEngine(self.engine.filepath)
+        try:
+            own_id = await service.add_expense(10, "Groceries", "Own", Date(2026, 1, 1))
+            self.assertEqual(await service.sync(), 0)
+            foreign = other.insert_expense(ExpenseDraft(3, "Savings", "Foreign", Date(2026, 1, 2)))
+            other.update_expense_amount(own_id, 4)
+            version_tag = await service.get_version_tag(own_id)
+            self.assertEqual(await service.sync(), 2)
+            self.assertEqual((await service.get_expense(foreign.id)).description, "Foreign")
+            self.assertEqual((await service.get_expense(own_id)).amount, 4)
+            self.assertNotEqual(await service.get_version_tag(own_id), version_tag)
+            self.assertEqual(service.get_category_summary()["Groceries"], 4)
+            other.delete_expense(foreign.id)
+            self.assertEqual(await service.sync(), 1)
+            self.assertEqual(service.get_category_counts()["Savings"], 0)
+        finally:
+            other.close()
+            service.close()
+
+    async def test_sync_resyncs_after_compaction(self):
+        """A worker whose position was compacted away reconciles its whole ledger"""
+        service = AsyncExpenseService(ExpenseManager(None), self.engine, change_seq=self.engine.follow_changes())
+        other = StorageEngine(self.engine.filepath)
+        try:
+            own_id = await service.add_expense(10, "Groceries", "Own", Date(2026, 1, 1))
+            other.delete_expense(own_id)
+            kept = other.insert_expense(ExpenseDraft(3, "Savings", "Foreign", Date(2026, 1, 2)))
+            other.compact_changes(retain=0)
+            self.assertEqual(await service.sync(), 2)
+            self.assertEqual([expense.id for expense in service.list_expenses()], [kept.id])
+            self.assertEqual(await service.sync(), 0)
+        finally:
+            other.close()
+            service.close()
+
+    async def test_ledger_tag_follows_the_database(self):
+        """The ledger tag moves on any commit, even one not synced yet, and is the same for every worker"""
+        other_engine = StorageEngine(self.engine.filepath)
+        other = AsyncExpenseService(ExpenseManager(None), other_engine)
+        try:
+            tag = await self.service.get_version_tag()
+            self.assertEqual(await other.get_version_tag(), tag)
+            await other.add_expense(5, "Savings", "Elsewhere", Date(2026, 1, 2))
+            self.assertNotEqual(await self.service.get_version_tag(), tag)
+            self.assertEqual(await self.service.get_version_tag(), await other.get_version_tag())
+        finally:
+            other.close()
+            other_engine.close()
+
+    async def test_workers_share_expense_tags(self):
+        """An unchanged expense gets the same tag from every worker; a change moves it everywhere"""
+        other_engine = StorageEngine(self.engine.filepath)
+        other = AsyncExpenseService(ExpenseManager(None), other_engine, change_seq=other_engine.follow_changes())
+        try:
+            expense_id = await self.service.add_expense(10, "Groceries", "Bread", Date(2026, 1, 1))
+            await other.sync()
+            tag = await self.service.get_version_tag(expense_id)
+            self.assertEqual(await other.get_version_tag(expense_id), tag)
+            await self.service.correct_expense_amount(expense_id, 12)
+            await other.sync()
+            self.assertNotEqual(await self.service.get_version_tag(expense_id), tag)
+            self.assertEqual(await other.get_version_tag(expense_id), await self.service.get_version_tag(expense_id))
+        finally:
+            other.close()
+            other_engine.close()
+
+    async def test_sql_lookups_stay_off_the_loop(self):
+        """In sql mode, cache misses and sync() read SQLite on pool threads, never on the event loop"""
+        ids = [expense.id for expense in self.engine.insert_expenses(
+            [ExpenseDraft(i + 1, "Groceries", f"Item {i}", Date(2026, 1, 1)) for i in range(4)])]
+        service = AsyncExpenseService(SqlExpenseManager(self.engine), self.engine, change_seq=self.engine.follow_changes())
+        other = StorageEngine(self.engine.filepath)
+        loop_thread = threading.current_thread()
+        reading_threads = []
+        for name in ("load_expense", "data_version", "foreign_changes"):
+            method = getattr(self.engine, name)
+            def traced(*args, method=method):
+                reading_threads.append(threading.current_thread())
+                return method(*args)
+            setattr(self.engine, name, traced)
+        try:
+            self.assertEqual((await service.get_expense(ids[0])).description, "Item 0")
+            await service.get_version_tag(ids[1])
+            await service.correct_expense_amount(ids[2], 50)
+            await service.delete_expense(ids[3])
+            with self.assertRaises(ExpenseNotFoundError):
+                await service.get_expense(ids[3])
+            other.update_expense_amount(ids[0], 7)
+            self.assertEqual(await service.sync(), 1)
+            self.assertEqual((await service.get_expense(ids[0])).amount, 7)
+            self.assertEqual((await service.get_expense(ids[2])).amount, 50)
+        finally:
+            other.close()
+            service.close()
+        self.assertTrue(reading_threads)
+        self.assertNotIn(loop_thread, reading_threads)
+
+class TestWorkerSync(unittest.TestCase):
+    """Several worker processes writing to one database keep coherent in-memory ledgers"""
+
+    def test_workers_converge(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.db")
+            engine = StorageEngine(path)
+            engine.create_table()
+            engine.insert_expenses([ExpenseDraft(i + 1, "Groceries", f"Seed {i}", Date(2026, 1, 1)) for i in range(20)])
+            context = multiprocessing.get_context("spawn")
+            workers = 3
+            barrier, results = context.Barrier(workers), context.Queue()
+            processes = [context.Process(target=run_worker, args=(path, seed, 60, barrier, results)) for seed in range(workers)]
+            for process in processes:
+                process.start()
+            states = [results.get(timeout=120) for _ in processes]
+            for process in processes:
+                process.join()
+                self.assertEqual(process.exitcode, 0)
+            stored = {expense.id: expense.to_dict() for expense in engine.load_expenses()}
+            totals = {category: total for category, total, _ in engine.load_category_totals()}
+            engine.close()
+        for expenses, summary in states:
+            self.assertEqual(expenses, stored)
+            for category, total in summary.items():
+                self.assertAlmostEqual(total, totals.get(category, 0))
+
+if __name__ == "__main__":
+    unittest.main()
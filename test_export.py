@@ -0,0 +1,60 @@
+# test_export.py
+import json
+import os
+import sys
+import tempfile
+import unittest
+from itertools import islice
+from export import ndjson_chunks, json_array_chunks
+from storage import StorageEngine
+
+# Synthetic ledger size for the memory ceiling test; override with EXPORT_TEST_ROWS
+STREAM_ROWS = int(os.environ.get("EXPORT_TEST_ROWS", 2_000_000))
+# Ceiling on live Python allocations (pymalloc blocks) while streaming; buffering the
+# result set instead of streaming it would need several blocks per row
+ALLOCATED_BLOCKS_CEILING = 100_000
+
+class TestStreamingExport(unittest.TestCase):
+    """Streaming exports stay within a fixed memory budget"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        cls.engine = StorageEngine(os.path.join(cls._tmpdir.name, "export.db"))
+        cls.engine.create_table()
+        with cls.engine._transaction() as conn:
+            conn.execute('''
+                WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+                INSERT INTO expenses(amount, category, description, date)
+                SELECT (i % 50000) / 100.0 + 1, 'Groceries', 'Synthetic #' || i, '2026-01-' || (10 + i % 20)
+                FROM n
+            ''', (STREAM_ROWS,))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.close()
+        cls._tmpdir.cleanup()
+
+    def test_ndjson_memory_ceiling(self):
+        """Streaming millions of rows as NDJSON keeps live allocations under the ceiling"""
+        rows = 0
+        last_chunk = b""
+        baseline = sys.getallocatedblocks()
+        peak = 0
+        for chunk in ndjson_chunks(self.engine.iter_expense_rows()):
+            rows += chunk.count(b"\n")
+            last_chunk = chunk
+            peak = max(peak, sys.getallocatedblocks() - baseline)
+        self.assertEqual(rows, STREAM_ROWS)
+        self.assertEqual(json.loads(last_chunk.splitlines()[-1])["id"], STREAM_ROWS)
+        self.assertLess(peak, ALLOCATED_BLOCKS_CEILING)
+
+    def test_json_array_is_valid(self):
+        """Chunked JSON concatenates into one valid array"""
+        rows = list(islice(self.engine.iter_expense_rows(), 2500))
+        decoded = json.loads(b"".join(json_array_chunks(rows)))
+        self.assertEqual([item["id"] for item in decoded], [row[0] for row in rows])
+        self.assertEqual(json.loads(b"".join(json_array_chunks([]))), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# test_main.py
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import date as Date
+from unittest import mock
+import main
+import tui_input
+from expense import ExpenseDraft
+from expense_manager import ExpenseManager
+from expense_service import ExpenseService
+from storage import StorageEngine
+
+class TestBrowseExpenses(unittest.TestCase):
+    """Paged listing and picking in the TUI controller"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = StorageEngine(os.path.join(self._tmpdir.name, "test.db"))
+        self.engine.create_table()
+        self.engine.insert_expenses([
+            ExpenseDraft(i + 1, "Groceries", f"Item {i}", Date(2026, 1, 1 + i)) for i in range(5)
+        ])
+        self.service = ExpenseService(ExpenseManager(self.engine.load_expenses()), self.engine)
+        patcher = mock.patch.object(main, "CLI_PAGE_SIZE", 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.engine.close()
+        self._tmpdir.cleanup()
+
+    def test_pick_across_pages(self):
+        """Picking fetches one page at a time and offers next/previous navigation"""
+        no_filter = {"category": None, "start": None}
+        picks = [tui_input.NEXT_PAGE, tui_input.NEXT_PAGE, tui_input.PREVIOUS_PAGE, 4]
+        with mock.patch.object(tui_input, "get_list_filter", return_value=no_filter), \
+             mock.patch.object(tui_input, "pick_expense", side_effect=picks) as pick:
+            self.assertEqual(main.browse_expenses(self.service, "delete"), 4)
+        pages = [[expense.id for expense in call.args[0]] for call in pick.call_args_list]
+        self.assertEqual(pages, [[1, 2], [3, 4], [5], [3, 4]])
+        self.assertEqual([call.args[2:] for call in pick.call_args_list],
+                         [(True, False), (True, True), (False, True), (True, True)])
+
+    def test_list_narrowed_to_start_date(self):
+        """A start date that leaves a single page lists it without a page prompt"""
+        with mock.patch.object(tui_input, "get_list_filter", return_value={"category": "Groceries", "start": Date(2026, 1, 4)}), \
+             mock.patch.object(tui_input, "get_page_action") as page_action, \
+             mock.patch("builtins.print") as printed:
+            self.assertIsNone(main.browse_expenses(self.service))
+        page_action.assert_not_called()
+        self.assertIn("Item 4", printed.call_args_list[0].args[0])
+        self.assertNotIn("Item 2", printed.call_args_list[0].args[0])
+
+class TestStartup(unittest.TestCase):
+    """CLI cold start stays free of the web stack"""
+
+    def test_main_does_not_import_web_or_prompt_libraries(self):
+        """Importing main loads neither FastAPI/pydantic nor inquirer"""
+        heavy = ("fastapi", "pydantic", "starlette", "inquirer", "multiprocessing")
+        result = subprocess.run(
+            [sys.executable, "-c", f"import sys, main; print([m for m in {heavy!r} if m in sys.modules])"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "[]")
+
+if __name__ == "__main__":
+    unittest.main()
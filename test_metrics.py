@@ -0,0 +1,85 @@
+# test_metrics.py
+import os
+import tempfile
+import threading
+import unittest
+from datetime import date as Date
+from expense import ExpenseDraft
+from expense_manager import ExpenseManager, SqlExpenseManager
+from metrics import Registry, instrument_storage, register_ledger_gauges
+from storage import StorageEngine
+
+class TestMetrics(unittest.TestCase):
+    """Metric types and their Prometheus text rendering"""
+
+    def test_counter_and_histogram_render(self):
+        """Counters sum per label set; histogram buckets are cumulative with +Inf, _sum and _count"""
+        registry = Registry()
+        requests = registry.counter("requests_total", "Requests", ("route",))
+        latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        requests.labels("/a").inc()
+        requests.labels("/a").inc(2)
+        requests.labels('/b"').inc()
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value)
+        text = registry.render()
+        self.assertIn("# TYPE requests_total counter", text)
+        self.assertIn('requests_total{route="/a"} 3.0', text)
+        self.assertIn('requests_total{route="/b\\""} 1.0', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn("latency_seconds_sum 3.65", text)
+        self.assertIn("latency_seconds_count 4", text)
+
+    def test_registration_is_idempotent(self):
+        """Registering a name again shares the series; a conflicting type is refused"""
+        registry = Registry()
+        first = registry.counter("events_total", "Events")
+        self.assertIs(registry.counter("events_total", "Events"), first)
+        with self.assertRaises(ValueError):
+            registry.histogram("events_total", "Events")
+        registry.gauge("size", "Size", lambda: 1)
+        registry.gauge("size", "Size", lambda: None)
+        self.assertNotIn("\nsize ", registry.render())
+
+    def test_concurrent_increments(self):
+        """No increment is lost when threads share a series"""
+        registry = Registry()
+        series = registry.counter("hits_total", "Hits").labels()
+        def work():
+            for _ in range(10000):
+                series.inc()
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(series.value, 40000)
+
+    def test_instrument_storage(self):
+        """Storage calls are timed per operation, errors and connections are counted"""
+        registry = Registry()
+        with tempfile.TemporaryDirectory() as directory:
+            engine = StorageEngine(os.path.join(directory, "test.db"))
+            instrument_storage(engine, registry)
+            engine.create_table()
+            engine.insert_expense(ExpenseDraft(10, "Groceries", "Bread", Date(2026, 1, 1)))
+            engine.load_expenses()
+            with self.assertRaises(Exception):
+                engine.search_expenses("!!", 10)
+            register_ledger_gauges(ExpenseManager(engine.load_expenses()), registry)
+            text = registry.render()
+            register_ledger_gauges(SqlExpenseManager(engine), registry)
+            sql_text = registry.render()
+            engine.close()
+        self.assertIn("expense_ledger_expenses 1.0", sql_text)
+        self.assertIn('expense_storage_operation_seconds_count{operation="insert_expense"} 1', text)
+        self.assertIn('expense_storage_operation_seconds_count{operation="load_expenses"} 2', text)
+        self.assertIn('expense_storage_errors_total{operation="search_expenses"} 1.0', text)
+        self.assertIn("expense_storage_connections_opened_total 1.0", text)
+        self.assertIn("expense_storage_connections 1.0", text)
+        self.assertIn("expense_ledger_expenses 1.0", text)
+
+if __name__ == "__main__":
+    unittest.main()
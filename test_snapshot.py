@@ -0,0 +1,100 @@
+# test_snapshot.py
+import os
+import tempfile
+import time
+import unittest
+from datetime import date as Date
+from expense import Expense, ExpenseDraft
+from expense_manager import ColumnarLedger, ExpenseManager, create_manager
+from snapshot import SnapshotWriter, load_snapshot, refresh_snapshot, snapshot_stamp, write_snapshot
+from storage import StorageEngine
+
+class TestSnapshot(unittest.TestCase):
+    """Binary ledger snapshots"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = StorageEngine(os.path.join(self._tmpdir.name, "test.db"))
+        self.engine.create_table()
+        self.engine.insert_expenses([
+            ExpenseDraft(i + 0.5, ("Groceries", "Savings", "Utilities")[i % 3], f"Item {i} – ü", Date(2025, 1, 1 + i % 28))
+            for i in range(300)
+        ])
+        self.engine.delete_expense(7)
+        self.path = os.path.join(self._tmpdir.name, "ledger.snapshot")
+
+    def tearDown(self):
+        self.engine.close()
+        self._tmpdir.cleanup()
+
+    def test_round_trip(self):
+        """A loaded snapshot holds exactly the rows and totals SQLite does"""
+        write_snapshot(self.engine, self.path)
+        ledger, totals = load_snapshot(self.engine, self.path)
+        expected = ColumnarLedger.from_rows(self.engine.iter_expense_rows())
+        self.assertEqual(list(ledger), list(expected))
+        for expense_id in (1, 8, 300):
+            self.assertEqual(ledger[expense_id].to_dict(), expected[expense_id].to_dict())
+        from_snapshot = ExpenseManager(None, ledger, totals)
+        from_rows = ExpenseManager(None, expected)
+        for category, total in from_rows.get_category_summary().items():
+            self.assertAlmostEqual(from_snapshot.get_category_summary()[category], total)
+        self.assertEqual(from_snapshot.get_category_counts(), from_rows.get_category_counts())
+        from_snapshot.correct_expense_description(8, "Rewritten")
+        self.assertEqual(ledger[8].description, "Rewritten")
+
+    def test_stale_or_damaged_snapshot_is_ignored(self):
+        """Any write, a different database or a truncated file makes the snapshot unusable"""
+        self.assertIsNone(load_snapshot(self.engine, self.path))
+        write_snapshot(self.engine, self.path)
+        self.engine.update_expense_description(1, "Changed")
+        self.assertIsNone(load_snapshot(self.engine, self.path))
+        self.assertTrue(refresh_snapshot(self.engine, self.path))
+        self.assertFalse(refresh_snapshot(self.engine, self.path))
+        self.assertEqual(load_snapshot(self.engine, self.path)[0][1].description, "Changed")
+
+        other = StorageEngine(os.path.join(self._tmpdir.name, "other.db"))
+        other.create_table()
+        self.assertIsNone(load_snapshot(other, self.path))
+        other.close()
+
+        with open(self.path, "r+b") as file:
+            file.truncate(os.path.getsize(self.path) - 1)
+        self.assertIsNone(load_snapshot(self.engine, self.path))
+
+    def test_create_manager_uses_snapshot(self):
+        """Columnar mode loads a current snapshot and falls back to SQLite otherwise"""
+        write_snapshot(self.engine, self.path)
+        manager = create_manager(self.engine, "columnar", snapshot_path=self.path)
+        self.assertEqual(manager.get_expense(300).description, "Item 299 – ü")
+        self.engine.insert_expense(ExpenseDraft(1, "Savings", "After snapshot", Date(2026, 1, 1)))
+        manager = create_manager(self.engine, "columnar", snapshot_path=self.path)
+        self.assertEqual(manager.get_expense(301).description, "After snapshot")
+
+    def test_memory_mode_uses_snapshot(self):
+        """Memory mode builds plain Expense objects from a current snapshot without reading rows from SQLite"""
+        expected = [expense.to_dict() for expense in self.engine.load_expenses()]
+        summary = create_manager(self.engine, "memory").get_category_summary()
+        write_snapshot(self.engine, self.path)
+        def no_rows():
+            raise AssertionError("rows were read from SQLite")
+        self.engine.load_expenses = no_rows
+        manager = create_manager(self.engine, "memory", snapshot_path=self.path)
+        self.assertEqual([expense.to_dict() for expense in manager.export_expense_list()], expected)
+        self.assertIs(type(manager.get_expense(300)), Expense)
+        for category, total in summary.items():
+            self.assertAlmostEqual(manager.get_category_summary()[category], total)
+        manager.correct_expense_amount(300, 1)
+        self.assertEqual(manager.get_expense(300).amount, 1)
+
+    def test_writer_refreshes_after_writes_settle(self):
+        """The background writer rewrites a stale snapshot once writes stop"""
+        writer = SnapshotWriter(self.engine, self.path, settle_seconds=0.05)
+        deadline = time.monotonic() + 5
+        while snapshot_stamp(self.path) != self.engine.ledger_stamp() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        writer.close()
+        self.assertEqual(snapshot_stamp(self.path), self.engine.ledger_stamp())
+
+if __name__ == "__main__":
+    unittest.main()
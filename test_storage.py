@@ -1,24 +1,386 @@
-from storage import save_expenses, load_expenses
-from expense import Expense
-from datetime import date
-
-# Test 1: Save and load
-expenses = [
-    Expense(1, 15.50, "Groceries", "Pizza", date(2026, 1, 27)),
-    Expense(2, 45.00, "Transportation", "Uber", date(2026, 1, 26))
-]
-
-save_expenses("test.csv", expenses, 3)
-print("✅ Saved")
-
-# Check the file manually
-with open("test.csv") as f:
-    print(f.read())
-
-# Load back
-loaded, next_id = load_expenses("test.csv")
-print(f"✅ Loaded {len(loaded)} expenses, next_id={next_id}")
-
-# Test 2: Load non-existent file
-loaded2, next_id2 = load_expenses("nonexistent.csv")
-print(f"✅ Non-existent file: {len(loaded2)} expenses, next_id={next_id2}")
\ No newline at end of file
+# test_storage.py
+import os
+import random
+import tempfile
+import threading
+import unittest
+from datetime import date as Date
+from expense import ExpenseDraft
+from exceptions import ChangeLogExpiredError, CorruptedDataError, InvalidCursorError, InvalidSearchQueryError
+from storage import GroupCommitWriter, StorageEngine
+
+class TestStorageEngine(unittest.TestCase):
+    """Unit tests for the pooled SQLite storage engine"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = StorageEngine(os.path.join(self._tmpdir.name, "test.db"))
+        self.engine.create_table()
+
+    def tearDown(self):
+        self.engine.close()
+        self._tmpdir.cleanup()
+
+    def test_insert_and_load(self):
+        """Inserted expenses come back with their IDs"""
+        first = self.engine.insert_expense(ExpenseDraft(15.50, "Groceries", "Pizza", Date(2026, 1, 27)))
+        second = self.engine.insert_expense(ExpenseDraft(45.00, "Transportation", "Uber", Date(2026, 1, 26)))
+        loaded = {expense.id: expense for expense in self.engine.load_expenses()}
+        self.assertEqual(set(loaded), {first.id, second.id})
+        self.assertEqual(loaded[first.id].description, "Pizza")
+        self.assertEqual(loaded[second.id].date, Date(2026, 1, 26))
+
+    def test_bulk_insert(self):
+        """A batch insert returns the IDs SQLite assigned, in order"""
+        self.engine.insert_expense(ExpenseDraft(1, "Savings", "Seed", Date(2026, 1, 1)))
+        drafts = [ExpenseDraft(i + 1, "Groceries", f"Item {i}", Date(2026, 1, 2)) for i in range(5)]
+        inserted = self.engine.insert_expenses(drafts)
+        loaded = {expense.id: expense for expense in self.engine.load_expenses()}
+        for expense in inserted:
+            self.assertEqual(loaded[expense.id].description, expense.description)
+        self.assertEqual(len(loaded), 6)
+
+    def test_updates_and_delete(self):
+        """Field updates and deletes are persisted"""
+        expense = self.engine.insert_expense(ExpenseDraft(10, "Groceries", "Bread", Date(2026, 1, 1)))
+        self.engine.update_expense_amount(expense.id, 12.5)
+        self.engine.update_expense_category(expense.id, "Savings")
+        self.engine.update_expense_description(expense.id, "Bread and milk")
+        self.engine.update_expense_date(expense.id, Date(2026, 2, 1))
+        [loaded] = self.engine.load_expenses()
+        self.assertEqual((loaded.amount, loaded.category, loaded.description, loaded.date),
+                         (12.5, "Savings", "Bread and milk", Date(2026, 2, 1)))
+        self.engine.delete_expense(expense.id)
+        self.assertEqual(self.engine.load_expenses(), [])
+
+    def test_load_verify(self):
+        """Loads share parsed dates; verify=True rejects rows that fail Expense validation"""
+        self.engine.insert_expenses([ExpenseDraft(i + 1, "Groceries", f"Item {i}", Date(2026, 1, 1)) for i in range(3)])
+        loaded = self.engine.load_expenses()
+        self.assertIs(loaded[0].date, loaded[2].date)
+        self.assertEqual([e.to_dict() for e in self.engine.load_expenses(verify=True)], [e.to_dict() for e in loaded])
+        # Storage writes whatever it is given; validation happens before it
+        self.engine.update_expense_amount(2, -5)
+        self.assertEqual(self.engine.load_expenses()[1].amount, -5)
+        with self.assertRaises(CorruptedDataError):
+            self.engine.load_expenses(verify=True)
+
+    def test_rollups_follow_writes(self):
+        """Trigger-maintained rollups match a recompute after inserts, updates and deletes"""
+        expenses = self.engine.insert_expenses([
+            ExpenseDraft(10, "Groceries", "Bread", Date(2026, 1, 4)),
+            ExpenseDraft(20, "Groceries", "Cheese", Date(2026, 1, 5)),
+            ExpenseDraft(30, "Savings", "Deposit", Date(2026, 2, 1)),
+        ])
+        self.engine.update_expense_amount(expenses[0].id, 15)
+        self.engine.update_expense_date(expenses[1].id, Date(2026, 2, 2))
+        self.engine.update_expense_category(expenses[2].id, "Utilities")
+        self.engine.delete_expense(expenses[0].id)
+
+        self.assertEqual(self.engine.load_rollups("month"), [
+            ("2026-02", "Groceries", 20.0, 1),
+            ("2026-02", "Utilities", 30.0, 1),
+        ])
+        # 2026-02-01 is a Sunday, so it belongs to the week starting Monday 2026-01-26
+        self.assertEqual(self.engine.load_rollups("week"), [
+            ("2026-01-26", "Utilities", 30.0, 1),
+            ("2026-02-02", "Groceries", 20.0, 1),
+        ])
+        self.assertEqual(self.engine.load_rollups("week", start=Date(2026, 2, 4)), [
+            ("2026-02-02", "Groceries", 20.0, 1),
+        ])
+        rollups = self.engine.load_rollups("week")
+        self.engine.rebuild_rollups()
+        self.assertEqual(self.engine.load_rollups("week"), rollups)
+
+    def test_page_filters(self):
+        """Date-ordered pages narrowed by category and start date page through every match"""
+        self.engine.insert_expenses([
+            ExpenseDraft(i + 1, ("Groceries", "Savings")[i % 2], f"Item {i}", Date(2026, 1, 1 + i))
+            for i in range(10)
+        ])
+        seen, cursor = [], None
+        while True:
+            page, cursor = self.engine.page_expenses(2, cursor, "date", "Groceries", Date(2026, 1, 4))
+            seen.extend(expense.description for expense in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, ["Item 4", "Item 6", "Item 8"])
+        page, _ = self.engine.page_expenses(10, start=Date(2026, 1, 9))
+        self.assertEqual([expense.id for expense in page], [9, 10])
+
+    def test_cursor_must_match_order(self):
+        """Date order breaks ties by id, and a cursor issued for one order is rejected for another"""
+        self.engine.insert_expenses([ExpenseDraft(i + 1, "Groceries", f"Item {i}", Date(2026, 1, 1 + i % 3)) for i in range(6)])
+        page, cursor = self.engine.page_expenses(10, None, "date")
+        keys = [(expense.date, expense.id) for expense in page]
+        self.assertEqual(keys, sorted(keys))
+        _, cursor = self.engine.page_expenses(2, None, "id")
+        with self.assertRaises(InvalidCursorError):
+            self.engine.page_expenses(2, cursor, "date")
+        with self.assertRaises(InvalidCursorError):
+            self.engine.page_expenses(2, "not-a-cursor", "id")
+
+    def test_search_follows_writes(self):
+        """The full-text index tracks inserts, description edits and deletes"""
+        expenses = self.engine.insert_expenses([
+            ExpenseDraft(10, "Groceries", "Café latte", Date(2026, 1, 1)),
+            ExpenseDraft(20, "Transportation", "Uber to the airport", Date(2026, 1, 2)),
+            ExpenseDraft(30, "Groceries", "Coffee beans", Date(2026, 1, 3)),
+        ])
+        search = lambda query: [expense.id for expense in self.engine.search_expenses(query, 10, order="recent")[0]]
+        self.assertEqual(search("cafe"), [expenses[0].id])
+        self.assertEqual(search("CO"), [expenses[2].id])
+        self.assertEqual(search("airport ub"), [expenses[1].id])
+        self.engine.update_expense_description(expenses[0].id, "Coffee to go")
+        self.assertEqual(search("cafe"), [])
+        self.assertEqual(search("coffee"), [expenses[2].id, expenses[0].id])
+        self.engine.delete_expense(expenses[2].id)
+        self.assertEqual(search("coffee"), [expenses[0].id])
+        with self.assertRaises(InvalidSearchQueryError):
+            search(" ?! ")
+
+    def test_search_pagination(self):
+        """Ranked and recent orders page through every match exactly once"""
+        self.engine.insert_expenses([
+            ExpenseDraft(1, "Groceries", "pizza" if i % 2 else "pizza pizza pizza night", Date(2026, 1, 1))
+            for i in range(7)
+        ])
+        for order in ("rank", "recent"):
+            seen, cursor = [], None
+            while True:
+                page, cursor = self.engine.search_expenses("pizza", 3, cursor, order)
+                seen.extend(expense.id for expense in page)
+                if cursor is None:
+                    break
+            self.assertEqual(sorted(seen), list(range(1, 8)))
+            if order == "recent":
+                self.assertEqual(seen, list(range(7, 0, -1)))
+
+    def test_foreign_changes(self):
+        """The change log reports another engine's writes as current rows or tombstones, and skips this engine's own"""
+        other = StorageEngine(self.engine.filepath)
+        try:
+            since = self.engine.follow_changes()
+            version = self.engine.data_version()
+            own = self.engine.insert_expense(ExpenseDraft(1, "Savings", "Own", Date(2026, 1, 1)))
+            self.assertEqual(self.engine.data_version(), version)
+            kept, gone = other.insert_expenses([
+                ExpenseDraft(2, "Groceries", "Kept", Date(2026, 1, 2)),
+                ExpenseDraft(3, "Groceries", "Gone", Date(2026, 1, 3)),
+            ])
+            other.update_expense_amount(kept.id, 7)
+            other.delete_expense(gone.id)
+            self.engine.update_expense_amount(own.id, 4)
+            self.assertNotEqual(self.engine.data_version(), version)
+            latest, changed = self.engine.foreign_changes(since)
+            self.assertEqual(set(changed), {kept.id, gone.id})
+            self.assertEqual(changed[kept.id].amount, 7)
+            self.assertIsNone(changed[gone.id])
+            self.assertEqual(self.engine.foreign_changes(latest), (latest, {}))
+            other.update_expense_amount(own.id, 5)
+            self.assertEqual(self.engine.foreign_changes(latest)[1][own.id].amount, 5)
+        finally:
+            other.close()
+
+    def replay(self, ledger: dict, since: int, limit: int = 7) -> int:
+        """Apply the change feed after `since` to a client-side {id: description} copy"""
+        after_id = None
+        while True:
+            changes, since, after_id = self.engine.read_changes(since, limit, after_id)
+            for _, expense_id, expense in changes:
+                if expense is None:
+                    ledger.pop(expense_id, None)
+                else:
+                    ledger[expense_id] = expense.description
+            if not changes and after_id is None:
+                return since
+
+    def test_change_feed_survives_compaction(self):
+        """Clients inside the retention window stay exact across compactions; older ones are told to resync"""
+        rng = random.Random(5)
+        client, position = {}, 0
+        stale_position = None
+        for round in range(30):
+            for _ in range(20):
+                ids = [expense.id for expense in self.engine.load_expenses()]
+                operation = rng.random()
+                if operation < 0.5 or not ids:
+                    self.engine.insert_expense(ExpenseDraft(1, "Groceries", f"Item {rng.random()}", Date(2026, 1, 1)))
+                elif operation < 0.8:
+                    self.engine.update_expense_description(rng.choice(ids), f"Renamed {rng.random()}")
+                else:
+                    self.engine.delete_expense(rng.choice(ids))
+            if round == 5:
+                stale_position = self.engine.change_seq()
+            position = self.replay(client, position)
+            self.engine.compact_changes(retain=25)
+            stored = {expense.id: expense.description for expense in self.engine.load_expenses()}
+            self.assertEqual(client, stored)
+            if round % 10 == 0:
+                # A full resync started now, with writes landing between its pages
+                fresh, since, after_id = {}, 0, None
+                while since == 0 or after_id is not None:
+                    changes, since, after_id = self.engine.read_changes(since, 5, after_id)
+                    fresh.update((expense_id, expense.description) for _, expense_id, expense in changes)
+                    self.engine.update_expense_description(rng.choice(list(stored)), "During resync")
+                self.replay(fresh, since)
+                self.assertEqual(fresh, {expense.id: expense.description for expense in self.engine.load_expenses()})
+        with self.assertRaises(ChangeLogExpiredError):
+            self.engine.read_changes(stale_position, 10)
+        total = self.engine.connection().execute("SELECT count(*) FROM expense_changes").fetchone()[0]
+        self.assertLessEqual(total, len(stored) + 25)
+
+    def test_connection_per_thread(self):
+        """Each thread reuses its own connection"""
+        main_conn = self.engine.connection()
+        self.assertIs(self.engine.connection(), main_conn)
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.engine.connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], main_conn)
+
+    def test_wal_mode(self):
+        """Connections run in WAL mode"""
+        mode = self.engine.connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+class TestPartitionedStorageEngine(TestStorageEngine):
+    """Runs every storage test against a ledger partitioned by month, plus partition-specific ones"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = StorageEngine(os.path.join(self._tmpdir.name, "test.db"), partition_by="month")
+        self.engine.create_table()
+
+    def test_date_update_moves_partition(self):
+        """Inserts land in their month's partition and a date correction moves the row, keeping its id"""
+        first, second = self.engine.insert_expenses([
+            ExpenseDraft(10, "Groceries", "Bread", Date(2024, 3, 5)),
+            ExpenseDraft(20, "Savings", "Deposit", Date(2024, 4, 1)),
+        ])
+        since = self.engine.change_seq()
+        self.engine.update_expense_date(first.id, Date(2025, 1, 9))
+        partitions = dict(self.engine.partitions())
+        self.assertEqual((partitions["2024-03"], partitions["2024-04"], partitions["2025-01"]), (0, 1, 1))
+        self.assertEqual(self.engine.load_expense(first.id).date, Date(2025, 1, 9))
+        self.assertEqual(self.engine.load_rollups("month", start=Date(2024, 3, 1), end=Date(2024, 3, 31)), [])
+        self.assertEqual([expense.id for expense in self.engine.search_expenses("bread", 10)[0]], [first.id])
+        self.assertEqual([change[1] for change in self.engine.read_changes(since, 10)[0]], [first.id])
+        page, _ = self.engine.page_expenses(10, order="date", start=Date(2024, 4, 1))
+        self.assertEqual([expense.id for expense in page], [second.id, first.id])
+        self.assertEqual(self.engine.page_expenses(10, start=Date(2030, 1, 1)), ([], None))
+        self.assertEqual(self.engine.insert_expense(ExpenseDraft(1, "Savings", "Next", Date(2023, 1, 1))).id, second.id + 1)
+
+    def test_failed_insert_does_not_cache_its_new_partition(self):
+        """A rolled-back insert that created a partition leaves later inserts into that period working"""
+        with self.assertRaises(RuntimeError):
+            self.engine.insert_rows([(float("nan"), "Groceries", "Not a number", "2031-05-01")])
+        self.assertNotIn("2031-05", dict(self.engine.partitions()))
+        expense = self.engine.insert_expense(ExpenseDraft(5, "Groceries", "Valid", Date(2031, 5, 2)))
+        self.assertEqual(self.engine.load_expense(expense.id).description, "Valid")
+        self.assertEqual(dict(self.engine.partitions())["2031-05"], 1)
+
+    def test_existing_ledger_is_partitioned(self):
+        """Opening a plain ledger with partition_by splits it in place; ids, rollups and search carry over"""
+        path = os.path.join(self._tmpdir.name, "plain.db")
+        plain = StorageEngine(path)
+        plain.create_table()
+        plain.insert_expenses([ExpenseDraft(i + 1, "Groceries", f"Item {i}", Date(2020 + i % 3, 1 + i % 12, 1)) for i in range(30)])
+        plain.delete_expense(30)
+        expenses, rollups = [expense.to_dict() for expense in plain.load_expenses()], plain.load_rollups("week")
+        plain.close()
+
+        engine = StorageEngine(path, partition_by="year")
+        try:
+            engine.create_table()
+            self.assertEqual([key for key, _ in engine.partitions()][:3], ["2020", "2021", "2022"])
+            self.assertEqual([expense.to_dict() for expense in engine.load_expenses()], expenses)
+            self.assertEqual(engine.load_rollups("week"), rollups)
+            self.assertEqual(len(engine.search_expenses("item", 50)[0]), 29)
+            self.assertEqual(engine.insert_expense(ExpenseDraft(1, "Savings", "New", Date(2021, 6, 1))).id, 31)
+        finally:
+            engine.close()
+        with self.assertRaises(ValueError):
+            StorageEngine(path, partition_by="month").create_table()
+
+    def test_archive_and_compact_partition(self):
+        """A partition is copied to its own file or rebuilt in place without touching the others"""
+        expenses = self.engine.insert_expenses([
+            ExpenseDraft(i + 1, "Groceries", f"Item {i}", Date(2024, 1 + i % 2, 1 + i)) for i in range(20)
+        ])
+        for expense in expenses[:10]:
+            self.engine.update_expense_description(expense.id, "Edited")
+        path = os.path.join(self._tmpdir.name, "2024-01.db")
+        self.assertEqual(self.engine.archive_partition("2024-01", path), 10)
+        archive = StorageEngine(path)
+        try:
+            archive.create_table()
+            self.assertEqual(
+                [expense.to_dict() for expense in archive.load_expenses()],
+                [expense.to_dict() for expense in self.engine.load_expenses() if expense.date.month == 1]
+            )
+        finally:
+            archive.close()
+
+        rollups = self.engine.load_rollups("month")
+        self.engine.compact_partition("2024-01")
+        self.assertEqual(self.engine.load_rollups("month"), rollups)
+        self.engine.update_expense_amount(expenses[0].id, 100)
+        self.assertEqual(self.engine.load_rollups("month")[0][2], rollups[0][2] + 99)
+        self.assertEqual(len(self.engine.search_expenses("edited", 50)[0]), 10)
+        with self.assertRaises(ValueError):
+            self.engine.compact_partition("1999-01")
+
+class TestGroupCommitWriter(unittest.TestCase):
+    """Unit tests for the write-behind group commit queue"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = StorageEngine(os.path.join(self._tmpdir.name, "test.db"))
+        self.engine.create_table()
+
+    def tearDown(self):
+        self.engine.close()
+        self._tmpdir.cleanup()
+
+    def test_concurrent_submits_share_commits(self):
+        """Every caller gets its own committed row, with fewer commits than rows"""
+        writer = GroupCommitWriter(self.engine, max_batch=50, max_delay=0.02)
+        generation = self.engine.generation
+        results = []
+        def submit(worker):
+            for i in range(25):
+                results.append(writer.submit(ExpenseDraft(i + 1, "Groceries", f"{worker}-{i}", Date(2026, 1, 1))).result())
+        threads = [threading.Thread(target=submit, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+        loaded = {expense.id: expense.description for expense in self.engine.load_expenses()}
+        self.assertEqual(len(results), 200)
+        self.assertEqual({expense.id: expense.description for expense in results}, loaded)
+        self.assertLess(self.engine.generation - generation, 200)
+
+    def test_batch_size_bound(self):
+        """No transaction holds more than max_batch rows"""
+        writer = GroupCommitWriter(self.engine, max_batch=4, max_delay=1)
+        generation = self.engine.generation
+        futures = [writer.submit(ExpenseDraft(1, "Savings", f"Item {i}", Date(2026, 1, 1))) for i in range(10)]
+        [future.result() for future in futures]
+        self.assertGreaterEqual(self.engine.generation - generation, 3)
+        writer.close()
+
+    def test_close_flushes_and_rejects(self):
+        """close() commits what is queued; later submits fail"""
+        writer = GroupCommitWriter(self.engine, max_delay=10)
+        future = writer.submit(ExpenseDraft(3, "Savings", "Queued", Date(2026, 1, 1)))
+        writer.close()
+        self.assertEqual(self.engine.load_expense(future.result(timeout=0).id).description, "Queued")
+        with self.assertRaises(RuntimeError):
+            writer.submit(ExpenseDraft(3, "Savings", "Late", Date(2026, 1, 1)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,19 +1,42 @@
 """User input handling using inquirer"""
 
-import inquirer
-from inquirer import errors
+import importlib
 from expense import Expense
 from expense_manager import categories
 import cli_view
 from datetime import date as Date
 
+class _LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    inquirer and the terminal libraries under it take ~150 ms to import; deferring
+    them keeps that off `main.py import/export` and off the TUI's first screen.
+    """
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+inquirer = _LazyModule("inquirer")
+errors = _LazyModule("inquirer.errors")
+
 ACTIONS = ["List Expenses",
+           "Search Expenses",
            "Add an Expense",
            "Delete an Expense",
            "Correct an Expense",
            "Show Summary",
            "Exit"
 ]
+# Choice values for moving between pages of the expense list
+NEXT_PAGE = "next_page"
+PREVIOUS_PAGE = "previous_page"
+ALL_CATEGORIES = "All categories"
+
 CORRECTION_ACTIONS = [
     ("Amount", "amount"),
     ("Description", "description"),
@@ -62,6 +85,16 @@ def validate_year(answer, current):
     except ValueError:
         raise errors.ValidationError("", reason="Year must be a valid number")
 
+def validate_start_date(answers, current):
+    """Validate an optional YYYY-MM-DD date"""
+    if not current or not current.strip():
+        return True
+    try:
+        Date.fromisoformat(current.strip())
+    except ValueError:
+        raise errors.ValidationError("", reason="Use the YYYY-MM-DD format, or leave it blank")
+    return True
+
 def get_main_action() -> str:
     """Display main menu and return selected action
     
@@ -97,6 +130,11 @@ def get_description() -> str | None:
     questions = [inquirer.Text("description", message="Please enter the correct description", validate=validate_description)]
     return float(inquirer.prompt(questions)["description"]) #type: ignore
 
+def get_search_query() -> str | None:
+    """Prompt for words to look for in expense descriptions"""
+    questions = [inquirer.Text("query", message="Search descriptions for", validate=validate_description)]
+    return inquirer.prompt(questions)["query"] #type: ignore
+
 def get_category() -> str | None:
     questions = [inquirer.List("category", message="Please select the correct category", choices=categories)]
     return inquirer.prompt(questions)["category"] #type: ignore
@@ -119,19 +157,53 @@ def get_date() -> Date | None:
         except ValueError:
             raise errors.ValidationError("", reason="Invalid calendar date")
 
-def pick_expense(expenses: list[Expense], action: str) -> int | None:
+def _page_choices(has_next: bool, has_previous: bool) -> list[tuple]:
+    choices = []
+    if has_next:
+        choices.append(("→ Next page", NEXT_PAGE))
+    if has_previous:
+        choices.append(("← Previous page", PREVIOUS_PAGE))
+    return choices
+
+def get_list_filter() -> dict:
+    """Narrow the expense list before paging through it
+
+    Returns:
+        dict: {'category': 'Groceries' or None, 'start': Date or None}
+    """
+    questions = [
+        inquirer.List("category", message="Which category?", choices=[ALL_CATEGORIES, *categories]),
+        inquirer.Text("start", message="Start from date (YYYY-MM-DD, blank for the oldest)", validate=validate_start_date),
+    ]
+    answers = inquirer.prompt(questions)
+    category = answers["category"] #type: ignore
+    start = answers["start"].strip() #type: ignore
+    return {
+        "category": None if category == ALL_CATEGORIES else category,
+        "start": Date.fromisoformat(start) if start else None,
+    }
+
+def get_page_action(has_next: bool, has_previous: bool) -> str | None:
+    """Move to the next or previous page, or None to go back to the menu"""
+    choices = [*_page_choices(has_next, has_previous), ("← Back", None)]
+    questions = [inquirer.List("page", message="Browse", choices=choices)]
+    return inquirer.prompt(questions)["page"] # type: ignore
+
+def pick_expense(expenses: list[Expense], action: str, has_next: bool = False, has_previous: bool = False) -> int | str | None:
     """Let user select an expense to process
     
     Args:
-        expenses: List of Expense objects
+        expenses: One page of Expense objects
+        has_next, has_previous: offer NEXT_PAGE / PREVIOUS_PAGE choices
     
     Returns:
-        int: Selected expense ID or None if cancelled
+        int: Selected expense ID, NEXT_PAGE or PREVIOUS_PAGE, or None if cancelled
     """
     
     message = f"Select an expense to {action}"
 
     final_expense_list = [(cli_view.format_expense_row(expense), expense.id) for expense in expenses]
+    final_expense_list.extend(_page_choices(has_next, has_previous))
     final_expense_list.append(("← Cancel", None)) # type: ignore
 
     questions = [inquirer.List("pick_expense", message=message, choices=final_expense_list)]